@@ -1,4 +1,9 @@
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache_usuarios import usuarios
 
 class CookiesJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
@@ -16,3 +21,32 @@ class CookiesJWTAuthentication(JWTAuthentication):
 
         return user, validated_token
 
+    def get_user(self, validated_token):
+        """
+        Igual que en simplejwt, pero el usuario y su empresa se leen de una
+        caché por id de usuario en lugar de consultarse en cada petición.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        user = usuarios.obtener(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('empresa').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            usuarios.guardar(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # usuarios entrega copias: cada petición tiene su propio usuario y empresa
+        return user
@@ -0,0 +1,80 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+def copiar_usuario(usuario):
+    """
+    Copia del usuario y de las relaciones que tiene cargadas. ``copy.copy``
+    de un modelo ya copia ``_state`` y su ``fields_cache``, pero no las
+    instancias relacionadas: sin esto la empresa sería la misma para todas
+    las peticiones.
+    """
+    copia = copy.copy(usuario)
+    cache_relaciones = copia._state.fields_cache
+    for nombre, relacionado in cache_relaciones.items():
+        if relacionado is not None:
+            cache_relaciones[nombre] = copy.copy(relacionado)
+    return copia
+
+
+class CacheUsuarios:
+    """
+    Caché LRU con expiración de los usuarios ya resueltos por la
+    autenticación JWT, junto con su empresa. Guarda y entrega copias, así
+    que lo que una petición modifique en su usuario no llega a las demás.
+
+    Vive en la memoria de cada proceso: las señales de ``accounts.signals``
+    la invalidan en el proceso donde ocurre el cambio y el TTL acota cuánto
+    puede tardar otro proceso en ver el cambio.
+    """
+
+    def __init__(self, tamano, ttl):
+        self.tamano = tamano
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, user_id):
+        # El claim del token trae el id como texto; se normaliza para que
+        # coincida con el pk que reciben las señales
+        user_id = str(user_id)
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                return None
+            usuario, expira = entrada
+            if expira <= time.monotonic():
+                del self._entradas[user_id]
+                return None
+            self._entradas.move_to_end(user_id)
+        return copiar_usuario(usuario)
+
+    def guardar(self, user_id, usuario):
+        user_id = str(user_id)
+        with self._lock:
+            self._entradas[user_id] = (copiar_usuario(usuario), time.monotonic() + self.ttl)
+            self._entradas.move_to_end(user_id)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, user_id):
+        with self._lock:
+            self._entradas.pop(str(user_id), None)
+
+    def invalidar_empresa(self, empresa_id):
+        with self._lock:
+            for user_id in [uid for uid, (usuario, _) in self._entradas.items() if usuario.empresa_id == empresa_id]:
+                del self._entradas[user_id]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+usuarios = CacheUsuarios(
+    tamano=getattr(settings, 'USUARIOS_CACHE_TAMANO', 1024),
+    ttl=getattr(settings, 'USUARIOS_CACHE_TTL', 60),
+)
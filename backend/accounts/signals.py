@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from config.models import Empresa
+from .cache_usuarios import usuarios
+from .models import Usuario
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_usuario(sender, instance, **kwargs):
+    # Cubre también los cambios de contraseña, que se guardan con save()
+    usuarios.invalidar(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Empresa)
+def invalidar_usuarios_de_empresa(sender, instance, **kwargs):
+    usuarios.invalidar_empresa(instance.pk)
@@ -1,3 +1,104 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.testing import crear_usuario_con_empresa
+from .cache_usuarios import usuarios
 
-# Create your tests here.
+
+class CacheUsuariosTests(TestCase):
+    def setUp(self):
+        usuarios.limpiar()
+        self.usuario = crear_usuario_con_empresa()
+        self.client = APIClient()
+        self.client.cookies['access_token'] = str(AccessToken.for_user(self.usuario))
+
+    def consultar(self):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.post('/api/is-authenticated/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['user'], len(contexto.captured_queries)
+
+    def test_usuario_y_empresa_sin_consultas_despues_de_la_primera(self):
+        usuario, consultas = self.consultar()
+        self.assertEqual((usuario['empresa']['rnc'], consultas), ('101000001', 1))
+        usuario, consultas = self.consultar()
+        self.assertEqual((usuario['username'], consultas), ('usuario', 0))
+
+    def test_cada_peticion_recibe_su_propia_empresa(self):
+        from .authentication import CookiesJWTAuthentication
+
+        token = AccessToken.for_user(self.usuario)
+        autenticacion = CookiesJWTAuthentication()
+        primero = autenticacion.get_user(token)
+        primero.empresa.nombre = 'Cambiado en otra petición'
+        primero.first_name = 'Cambiado'
+        segundo = autenticacion.get_user(token)
+        self.assertIsNot(segundo.empresa, primero.empresa)
+        self.assertEqual((segundo.empresa.nombre, segundo.first_name), (self.usuario.empresa.nombre, ''))
+        self.assertIsNot(autenticacion.get_user(token).empresa, segundo.empresa)
+
+    def test_se_invalida_al_cambiar_usuario_o_empresa(self):
+        self.consultar()
+        empresa = self.usuario.empresa
+        empresa.nombre = 'Nuevo nombre'
+        empresa.save()
+        usuario, consultas = self.consultar()
+        self.assertEqual((usuario['empresa']['nombre'], consultas), ('Nuevo nombre', 1))
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.post('/api/is-authenticated/').status_code, 401)
+
+
+class BootstrapTests(TestCase):
+    def setUp(self):
+        usuarios.limpiar()
+        self.usuario = crear_usuario_con_empresa()
+        self.client = APIClient()
+        self.client.cookies['access_token'] = str(AccessToken.for_user(self.usuario))
+
+    def test_una_respuesta_con_etag_y_304(self):
+        from clientes.models import Cliente
+        from comprobantes.models import TipoComprobante
+
+        TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='B01', id_empresa=self.usuario.empresa)
+        response = self.client.get('/api/bootstrap/')
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos['user']['empresa']['rnc'], '101000001')
+        self.assertEqual([t['tipo_comprobante'] for t in datos['tipos_comprobante']], ['B01'])
+        self.assertEqual(datos['catalogos']['clientes']['total'], 0)
+        self.assertIn('series_vigentes', datos['alertas_series'])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Cliente.objects.create(
+            nombre='Cliente', tipo_documento='1', numero_documento=1, tipo_ncf=1, id_empresa=self.usuario.empresa
+        )
+        response = self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()['catalogos']['clientes']['version'], datos['catalogos']['clientes']['version'])
+
+    def test_sin_empresa_no_incluye_series_ajenas(self):
+        from comprobantes.models import SerieComprobante, TipoComprobante
+        from .models import Usuario
+
+        tipo = TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='B01', id_empresa=self.usuario.empresa)
+        SerieComprobante.objects.create(
+            tipo_comprobante=tipo, desde=1, hasta=3, numero_actual=0,
+            fecha_vencimiento='2999-12-31', id_empresa=self.usuario.empresa
+        )
+        suelto = Usuario.objects.create_user(username='suelto', password='clave-segura')
+        self.client.cookies['access_token'] = str(AccessToken.for_user(suelto))
+        datos = self.client.get('/api/bootstrap/').json()
+        self.assertIsNone(datos['alertas_series'])
+        self.assertEqual(datos['tipos_comprobante'], [])
+
+    def test_login_devuelve_usuario_y_cookies(self):
+        response = APIClient().post('/api/token/', {'username': 'usuario', 'password': 'clave-segura'}, format='json')
+        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['user']['empresa']['rnc'], '101000001')
+        self.assertIn('access_token', response.cookies)
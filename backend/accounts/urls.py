@@ -8,7 +8,8 @@ from .views import (
     CustomRefreshTokenView, 
     logout, 
     is_authenticated, 
-    register)
+    register,
+    bootstrap)
     
 urlpatterns = [
     path('api/token/', customTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -16,4 +17,5 @@ urlpatterns = [
     path('api/logout/', logout, name='logout'),
     path('api/is-authenticated/', is_authenticated, name='is_authenticated'),
     path('api/register/', register, name='register'),
+    path('api/bootstrap/', bootstrap, name='bootstrap'),
 ]
\ No newline at end of file
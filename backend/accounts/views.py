@@ -1,75 +1,82 @@
-from django.shortcuts import render
-from django.contrib.auth import get_user_model
+import hashlib
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.decorators import api_view
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import permission_classes
+from clientes.models import Cliente
+from comprobantes.alertas import obtener_resumen
+from comprobantes.models import TipoComprobante
+from comprobantes.serializers import TipoComprobanteSerializer
+from core.catalogos import version_catalogo
+from productos.models import Producto
 from .serializer import RegisterSerializer
+
+
+def datos_usuario(user):
+    """Datos del usuario y su empresa que recibe el frontend al iniciar sesión"""
+    empresa = user.empresa
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'empresa': {
+            'id': empresa.id,
+            'nombre': empresa.nombre,
+            'rnc': empresa.rnc,
+            'telefono': empresa.telefono,
+            'direccion': empresa.direccion,
+            'logo': empresa.logo.url if empresa.logo else None,
+        } if empresa else None,
+    }
+
+
 class customTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
         try:
-            response = super().post(request, *args, **kwargs)
-            
-            if response.status_code == 200:
-                access_token = response.data.get('access')
-                refresh_token = response.data.get('refresh')
-                
-                # Obtener el usuario autenticado
-                token = AccessToken(access_token)
-                user_id = token['user_id']
-                
-                User = get_user_model()
-                user = User.objects.get(id=user_id)
-                
-                # Crear respuesta con datos del usuario
-                res = Response()
-                res.data = {
-                    'access': access_token,
-                    'refresh': refresh_token,
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email,
-                        'first_name': user.first_name,
-                        'last_name': user.last_name,
-                        'empresa': {
-                            'id': user.empresa.id if user.empresa else None,
-                            'nombre': user.empresa.nombre if user.empresa else None,
-                            'rnc': user.empresa.rnc if user.empresa else None,
-                            'telefono': user.empresa.telefono if user.empresa else None,
-                            'direccion': user.empresa.direccion if user.empresa else None,
-                            'logo': user.empresa.logo.url if user.empresa and user.empresa.logo else None,
-                        } if user.empresa else None,
-                    },
-                    'success': True,
-                }
-                
-                # Configurar cookies (httponly=False para que JavaScript pueda leerlas)
-                res.set_cookie(
-                    key='access_token', 
-                    value=access_token, 
-                    httponly=False, 
-                    secure=False,  # Cambiar a True en producción con HTTPS
-                    samesite='Lax',
-                    path='/'
-                )
-
-                res.set_cookie(
-                    key='refresh_token', 
-                    value=refresh_token, 
-                    httponly=False, 
-                    secure=False,  # Cambiar a True en producción con HTTPS
-                    samesite='Lax',
-                    path='/'
-                )
-                return res
-            else:
-                return response
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            access_token = serializer.validated_data.get('access')
+            refresh_token = serializer.validated_data.get('refresh')
+
+            # El serializer ya autenticó al usuario; no hace falta decodificar
+            # el token recién emitido ni volver a consultarlo
+            res = Response()
+            res.data = {
+                'access': access_token,
+                'refresh': refresh_token,
+                'user': datos_usuario(serializer.user),
+                'success': True,
+            }
+
+            # Configurar cookies (httponly=False para que JavaScript pueda leerlas)
+            res.set_cookie(
+                key='access_token', 
+                value=access_token, 
+                httponly=False, 
+                secure=False,  # Cambiar a True en producción con HTTPS
+                samesite='Lax',
+                path='/'
+            )
+
+            res.set_cookie(
+                key='refresh_token', 
+                value=refresh_token, 
+                httponly=False, 
+                secure=False,  # Cambiar a True en producción con HTTPS
+                samesite='Lax',
+                path='/'
+            )
+            return res
 
         except Exception as e:
             return Response({
@@ -128,21 +135,7 @@ def is_authenticated(request):
     user = request.user
     return Response({
         'is_authenticated': True,
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'empresa': {
-                'id': user.empresa.id if user.empresa else None,
-                'nombre': user.empresa.nombre if user.empresa else None,
-                'rnc': user.empresa.rnc if user.empresa else None,
-                'telefono': user.empresa.telefono if user.empresa else None,
-                'direccion': user.empresa.direccion if user.empresa else None,
-                'logo': user.empresa.logo.url if user.empresa and user.empresa.logo else None,
-            } if user.empresa else None,
-        }
+        'user': datos_usuario(request.user),
     })
 
 @api_view(['POST'])
@@ -152,4 +145,36 @@ def register(request):
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=201)
-    return Response(serializer.errors, status=400)
\ No newline at end of file
+    return Response(serializer.errors, status=400)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bootstrap(request):
+    """
+    Todo lo que el frontend necesita al abrir la aplicación en una sola
+    respuesta: usuario y empresa, tipos de comprobante, resumen de alertas de
+    series y la versión de los catálogos. Lleva un ETag fuerte calculado
+    sobre el contenido, así que un cliente con la respuesta en caché la
+    revalida con un 304.
+    """
+    user = request.user
+    datos = {
+        'user': datos_usuario(user),
+        'tipos_comprobante': TipoComprobanteSerializer(
+            TipoComprobante.objects.del_usuario(user).order_by('tipo_comprobante', 'id'), many=True
+        ).data,
+        # Sin empresa no hay series que resumir
+        'alertas_series': obtener_resumen(user.empresa_id) if user.empresa_id is not None else None,
+        'catalogos': {
+            'clientes': version_catalogo(Cliente, user),
+            'productos': version_catalogo(Producto, user),
+        },
+    }
+
+    contenido = JSONRenderer().render(datos)
+    etag = quote_etag(hashlib.sha256(contenido).hexdigest())
+    response = HttpResponse(contenido, content_type='application/json')
+    response['ETag'] = etag
+    # El navegador guarda la respuesta pero la revalida siempre
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
@@ -1,12 +1,17 @@
 from .models import Cliente
 from rest_framework import viewsets, permissions
-from .serializers import ClienteSerializer
+from core.api import BusquedaMixin, CatalogoCondicionalMixin, EmpresaViewSetMixin, ImportacionMixin
+from core.async_api import AsyncReadView
+from core.sincronizacion import SincronizacionMixin
+from .serializers import ClienteSerializer, ClienteImportacionSerializer
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(ImportacionMixin, BusquedaMixin, CatalogoCondicionalMixin, SincronizacionMixin, EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = ClienteSerializer
+    serializer_importacion = ClienteImportacionSerializer
 
 
-    
-
+class ClienteAsyncView(AsyncReadView):
+    queryset = Cliente.objects.all()
+    serializer_class = ClienteSerializer
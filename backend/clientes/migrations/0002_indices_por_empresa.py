@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['id_empresa', 'nombre'], name='cliente_emp_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['id_empresa', 'numero_documento'], name='cliente_emp_documento_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_indices_por_empresa'),
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['id_empresa', 'fecha_actualizacion'], name='cliente_emp_actualizacion_idx'),
+        ),
+    ]
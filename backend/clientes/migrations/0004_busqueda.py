@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:56
+
+from django.db import migrations, models
+from core.busqueda import borrar_indice_busqueda, crear_indice_busqueda, texto_busqueda
+
+TABLA = 'clientes_cliente'
+
+
+def llenar_busqueda(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+    filas = list(Cliente.objects.all())
+    for fila in filas:
+        fila.busqueda = texto_busqueda(fila.nombre, fila.numero_documento)
+    Cliente.objects.bulk_update(filas, ['busqueda'], batch_size=1000)
+
+
+def crear_indice(apps, schema_editor):
+    crear_indice_busqueda(schema_editor, TABLA)
+
+
+def borrar_indice(apps, schema_editor):
+    borrar_indice_busqueda(schema_editor, TABLA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_indice_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(llenar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from core.middleware import get_current_user
+from core.busqueda import texto_busqueda
+from core.models import EmpresaManager
 
 
 class Cliente(models.Model):
@@ -13,13 +15,29 @@ class Cliente(models.Model):
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='clientes', null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Campos normalizados para /search/; se indexan con crear_indice_busqueda
+    busqueda = models.TextField(blank=True, default='', editable=False)
+
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'nombre'], name='cliente_emp_nombre_idx'),
+            models.Index(fields=['id_empresa', 'numero_documento'], name='cliente_emp_documento_idx'),
+            models.Index(fields=['id_empresa', 'fecha_actualizacion'], name='cliente_emp_actualizacion_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
             if user and hasattr(user, 'empresa') and user.empresa:
                 self.id_empresa = user.empresa
+        self.busqueda = self.calcular_busqueda()
         super().save(*args, **kwargs)
 
+    def calcular_busqueda(self):
+        # También la usa la importación masiva, que no pasa por save()
+        return texto_busqueda(self.nombre, self.numero_documento)
+
     def __str__(self):
         return f"{self.nombre} ({self.numero_documento})"
\ No newline at end of file
@@ -20,6 +20,18 @@ class ClienteSerializer(serializers.ModelSerializer):
             attrs['email'] = None
         if 'direccion' not in attrs or not attrs['direccion']:
             attrs['direccion'] = None
-        return super().validate(attrs)    
-    
-    
\ No newline at end of file
+        return super().validate(attrs)
+
+
+class ClienteImportacionSerializer(ClienteSerializer):
+    """Reglas de ClienteSerializer para core.importacion, que inserta o actualiza por numero_documento"""
+    clave = 'numero_documento'
+
+    class Meta(ClienteSerializer.Meta):
+        extra_kwargs = {
+            # Un documento existente se actualiza en lugar de rechazarse
+            'numero_documento': {'validators': []},
+            # Si faltan, validate() les pone su valor por defecto
+            'tipo_documento': {'required': False},
+            'tipo_ncf': {'required': False},
+        }
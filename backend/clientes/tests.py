@@ -1,3 +1,75 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from core.testing import QueryBudgetMixin, consultas_de_datos, crear_usuario_con_empresa
+from .models import Cliente
 
-# Create your tests here.
+
+class ClienteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.client = self.get_budget_client(self.usuario)
+        self.siguiente = 0
+
+    def crear_clientes(self, n):
+        for _ in range(n):
+            self.siguiente += 1
+            Cliente.objects.create(
+                nombre=f'Cliente {self.siguiente}', tipo_documento='1',
+                numero_documento=self.siguiente, tipo_ncf=1, id_empresa=self.usuario.empresa
+            )
+
+    def test_listado_clientes(self):
+        # Dos agregaciones para el ETag del catálogo y una para el listado
+        self.assertQueryBudget(self.client, '/api/clientes/', 3, self.crear_clientes)
+
+
+class CatalogoCondicionalTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario_con_empresa()
+        self.client = self.get_budget_client(self.usuario)
+        self.clientes = [
+            Cliente.objects.create(
+                nombre=f'Cliente {n}', tipo_documento='1', numero_documento=n, tipo_ncf=1,
+                id_empresa=self.usuario.empresa
+            )
+            for n in (1, 2)
+        ]
+
+    def test_304_sin_serializar_y_etag_nuevo_al_cambiar(self):
+        response = self.client.get('/api/clientes/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get('/api/clientes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # Las dos agregaciones de la versión: filas del catálogo y tombstones
+        self.assertEqual(len(consultas_de_datos(contexto)), 2)
+
+        self.clientes[0].nombre = 'Otro nombre'
+        self.clientes[0].save()
+        response = self.client.get('/api/clientes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.clientes[1].delete()
+        response = self.client.get('/api/clientes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_la_version_no_depende_de_la_cache(self):
+        from core.catalogos import version_catalogo
+
+        antes = version_catalogo(Cliente, self.usuario)['version']
+        self.clientes[1].delete()
+        # Otro proceso, o el mismo después de reiniciar, ve la eliminación
+        cache.clear()
+        despues = version_catalogo(Cliente, self.usuario)['version']
+        self.assertNotEqual(antes, despues)
+        cache.clear()
+        self.assertEqual(version_catalogo(Cliente, self.usuario)['version'], despues)
@@ -1,9 +1,14 @@
+from django.urls import path
 from rest_framework import routers
-from .api import ClienteViewSet
+from .api import ClienteViewSet, ClienteAsyncView
 
 router = routers.DefaultRouter()
 
 router.register('api/clientes', ClienteViewSet, 'clientes')
 
-urlpatterns = router.urls
+# Lectura asíncrona nativa para servir bajo ASGI
+urlpatterns = router.urls + [
+    path('api/async/clientes/', ClienteAsyncView.as_view(), name='clientes-async-list'),
+    path('api/async/clientes/<int:pk>/', ClienteAsyncView.as_view(), name='clientes-async-detail'),
+]
 
@@ -0,0 +1,109 @@
+import datetime
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.cache import cache_compartida
+from .models import SerieComprobante
+
+# Las alertas se guardan por empresa bajo una versión; invalidar es subir la
+# versión, lo que descarta a la vez todas las combinaciones de parámetros.
+# Una caché local no recibiría la invalidación de los demás procesos, así
+# que sin caché compartida se calculan siempre
+CACHE_TIMEOUT = 300
+
+
+def obtener_alertas(empresa_id, limite=5, dias=None):
+    """
+    Series vigentes con ``limite`` o menos comprobantes restantes o, si se
+    indica ``dias``, que vencen dentro de ese plazo. El cálculo y el filtro
+    se hacen en la base de datos y el resultado queda en caché por empresa.
+    """
+    return _en_cache(empresa_id, 'alertas', _calcular_alertas, limite, dias)
+
+
+def obtener_resumen(empresa_id, limite=5, dias=30):
+    """Conteo de series vigentes, agotadas, por agotarse y por vencer de la empresa"""
+    return _en_cache(empresa_id, 'resumen', _calcular_resumen, limite, dias)
+
+
+def invalidar_alertas(empresa_id):
+    """Descarta las alertas en caché de la empresa cuando se confirme la transacción"""
+    transaction.on_commit(lambda: _subir_version(empresa_id))
+
+
+def _series_vigentes(empresa_id):
+    # Sin empresa no hay series; los restantes son los números que aún no se
+    # entregan del rango virtual
+    series = SerieComprobante.objects.de_empresa(empresa_id).filter(
+        desde__isnull=False,
+        hasta__isnull=False,
+        anulado=False,
+    )
+    return series.annotate(
+        restantes=F('hasta') - Coalesce('ultimo_generado', F('desde') - 1),
+    )
+
+
+def _en_cache(empresa_id, nombre, calcular, *parametros):
+    if not cache_compartida():
+        return calcular(empresa_id, *parametros)
+    clave = _clave(empresa_id, nombre, *parametros)
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular(empresa_id, *parametros)
+        cache.set(clave, valor, CACHE_TIMEOUT)
+    return valor
+
+
+def _calcular_resumen(empresa_id, limite, dias):
+    hoy = timezone.localdate()
+    return _series_vigentes(empresa_id).aggregate(
+        series_vigentes=Count('id'),
+        agotadas=Count('id', filter=Q(restantes__lte=0)),
+        por_agotarse=Count('id', filter=Q(restantes__gt=0, restantes__lte=limite)),
+        por_vencer=Count('id', filter=Q(fecha_vencimiento__lte=hoy + datetime.timedelta(days=dias))),
+    )
+
+
+def _calcular_alertas(empresa_id, limite, dias):
+    hoy = timezone.localdate()
+    filtro = Q(restantes__lte=limite)
+    if dias is not None:
+        filtro |= Q(fecha_vencimiento__lte=hoy + datetime.timedelta(days=dias))
+
+    series = _series_vigentes(empresa_id).filter(filtro).order_by('restantes', 'fecha_vencimiento').values(
+        'id', 'tipo_comprobante__tipo_comprobante', 'desde', 'hasta', 'numero_actual',
+        'restantes', 'fecha_vencimiento',
+    )
+    return [
+        {
+            'id': serie['id'],
+            'tipo_comprobante': serie['tipo_comprobante__tipo_comprobante'],
+            'desde': serie['desde'],
+            'hasta': serie['hasta'],
+            'numero_actual': serie['numero_actual'],
+            'comprobantes_restantes': max(0, serie['restantes']),
+            'esta_agotado': serie['restantes'] <= 0,
+            'esta_por_agotarse': 0 < serie['restantes'] <= limite,
+            'fecha_vencimiento': serie['fecha_vencimiento'],
+            'dias_para_vencer': (serie['fecha_vencimiento'] - hoy).days,
+        }
+        for serie in series
+    ]
+
+
+def _clave(empresa_id, nombre, *parametros):
+    # La fecha forma parte de la clave porque los días para vencer cambian con ella
+    parametros += (timezone.localdate(),)
+    version = cache.get_or_set(f'alertas_series:version:{empresa_id}', 1, None)
+    return f"alertas_series:{empresa_id}:{version}:{nombre}:{':'.join(str(p) for p in parametros)}"
+
+
+def _subir_version(empresa_id):
+    clave = f'alertas_series:version:{empresa_id}'
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 2, None)
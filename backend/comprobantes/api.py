@@ -1,40 +1,113 @@
-from .models import TipoComprobante, Comprobante, SerieComprobante
+from itertools import islice
+from .models import TipoComprobante, Comprobante, SerieComprobante, formatear_ncf
+from .ncf import (
+    comprobantes_libres, contar_disponibles, series_con_disponibles, siguientes_disponibles, numeros_virtuales
+)
+from .alertas import obtener_alertas, obtener_resumen, invalidar_alertas
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.api import CatalogoCondicionalMixin, EmpresaViewSetMixin
+from core.async_api import AsyncReadView
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Coalesce
 from .serializers import TipoComprobanteSerializer, ComprobanteSerializer, SerieComprobanteSerializer
 
-class TipoComprobanteViewSet(viewsets.ModelViewSet):
+# Tope de ?mode=next&n=K en disponibles
+MAXIMO_SIGUIENTES = 100
+# Tope del listado de disponibles sin mode; la cantidad total se obtiene con mode=count
+MAXIMO_DISPONIBLES = 500
+
+class TipoComprobanteViewSet(CatalogoCondicionalMixin, EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset = TipoComprobante.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TipoComprobanteSerializer
 
-class ComprobanteViewSet(viewsets.ModelViewSet):
-    queryset=Comprobante.objects.all()
+class ComprobanteViewSet(EmpresaViewSetMixin, viewsets.ModelViewSet):
+    queryset=Comprobante.objects.select_related('tipo_comprobante')
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ComprobanteSerializer
 
     @action(detail=False, methods=['get'])
     def disponibles(self, request):
-        """Obtener comprobantes disponibles para un tipo de comprobante"""
-        tipo_comprobante_id = request.query_params.get('tipo_comprobante')
-        
-        if not tipo_comprobante_id:
+        """
+        Obtener comprobantes disponibles para un tipo de comprobante.
+
+        ``?mode=count`` devuelve solo la cantidad y ``?mode=next&n=K`` los
+        próximos K números que se asignarían; sin ``mode`` se devuelven
+        serializados los primeros MAXIMO_DISPONIBLES.
+        """
+        if not request.query_params.get('tipo_comprobante'):
             return Response(
                 {'error': 'tipo_comprobante es requerido'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            tipo_comprobante_id = int(request.query_params['tipo_comprobante'])
+        except ValueError:
+            return Response(
+                {'error': 'tipo_comprobante debe ser un número'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        modo = request.query_params.get('mode')
+        if modo not in (None, 'count', 'next'):
+            return Response(
+                {'error': 'mode debe ser count o next'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not TipoComprobante.objects.del_usuario(request.user).filter(pk=tipo_comprobante_id).exists():
+            return Response(
+                {'error': 'Tipo de comprobante no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        empresa_id = request.user.empresa_id
+
+        if modo == 'count':
+            return Response({'disponibles': contar_disponibles(tipo_comprobante_id, empresa_id=empresa_id)})
+
+        if modo == 'next':
+            try:
+                cantidad = int(request.query_params.get('n', 1))
+            except ValueError:
+                cantidad = 0
+            if not 1 <= cantidad <= MAXIMO_SIGUIENTES:
+                return Response(
+                    {'error': f'n debe ser un número entre 1 y {MAXIMO_SIGUIENTES}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(siguientes_disponibles(tipo_comprobante_id, cantidad, empresa_id=empresa_id))
         
         try:
-            comprobantes_disponibles = Comprobante.objects.filter(
-                tipo_comprobante_id=tipo_comprobante_id,
-                cliente__isnull=True,
-                factura_asignada__isnull=True
-            ).order_by('numero_comprobante')
-            
-            serializer = self.get_serializer(comprobantes_disponibles, many=True)
-            return Response(serializer.data)
+            # Primero los comprobantes con fila que quedaron libres, en el
+            # mismo orden en que los asigna reclamar_ncf
+            comprobantes_disponibles = comprobantes_libres(tipo_comprobante_id, empresa_id=empresa_id).select_related(
+                'tipo_comprobante'
+            ).order_by('numero_comprobante')[:MAXIMO_DISPONIBLES]
+            disponibles = list(self.get_serializer(comprobantes_disponibles, many=True).data)
+
+            # Luego los números virtuales de las series, que aún no tienen fila
+            series = series_con_disponibles(tipo_comprobante_id, empresa_id=empresa_id).select_related('tipo_comprobante')
+            for serie in series:
+                if len(disponibles) >= MAXIMO_DISPONIBLES:
+                    break
+                tipo = TipoComprobanteSerializer(serie.tipo_comprobante).data
+                for numero in islice(numeros_virtuales(serie), MAXIMO_DISPONIBLES - len(disponibles)):
+                    disponibles.append({
+                        'id': None,
+                        'tipo_comprobante': tipo,
+                        'tipo_comprobante_obj': tipo,
+                        'numero_comprobante': numero,
+                        'numero_comprobante_completo': formatear_ncf(serie.tipo_comprobante.tipo_comprobante, numero),
+                        'fecha_emision': None,
+                        'fecha_vencimiento': serie.fecha_vencimiento,
+                        'anulado': False,
+                        'cliente': None,
+                        'factura_asignada': None,
+                        'id_empresa': serie.id_empresa_id,
+                    })
+            return Response(disponibles)
             
         except Exception as e:
             return Response(
@@ -42,10 +115,33 @@ class ComprobanteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-class SerieComprobanteViewSet(viewsets.ModelViewSet):
-    queryset=SerieComprobante.objects.all()
+class SerieComprobanteViewSet(EmpresaViewSetMixin, viewsets.ModelViewSet):
+    queryset=SerieComprobante.objects.select_related('tipo_comprobante')
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = SerieComprobanteSerializer
+
+    def get_queryset(self):
+        # Resolver tipo_comprobante y tiene_comprobantes_generados en la misma consulta
+        comprobantes_de_la_serie = Comprobante.objects.filter(
+            tipo_comprobante=OuterRef('tipo_comprobante'),
+            numero_comprobante__gte=Coalesce(OuterRef('desde'), Value(0)),
+            numero_comprobante__lte=Coalesce(OuterRef('hasta'), Value(0)),
+        )
+        return super().get_queryset().annotate(
+            comprobantes_generados=Exists(comprobantes_de_la_serie)
+        )
+
+    def perform_create(self, serializer):
+        serie = serializer.save()
+        invalidar_alertas(serie.id_empresa_id)
+
+    def perform_update(self, serializer):
+        serie = serializer.save()
+        invalidar_alertas(serie.id_empresa_id)
+
+    def perform_destroy(self, instance):
+        invalidar_alertas(instance.id_empresa_id)
+        instance.delete()
     
     @action(detail=True, methods=['post'])
     def anular(self, request, pk=None):
@@ -64,19 +160,27 @@ class SerieComprobanteViewSet(viewsets.ModelViewSet):
                 # Anular la serie
                 serie.anulado = True
                 serie.save()
+                invalidar_alertas(serie.id_empresa_id)
                 
-                # Anular todos los comprobantes no asignados de esta serie
-                comprobantes_a_anular = Comprobante.objects.filter(
+                # Anular los comprobantes con fila que quedaron sin asignar
+                cantidad_anulados = Comprobante.objects.filter(
                     tipo_comprobante=serie.tipo_comprobante,
                     numero_comprobante__gte=serie.desde if serie.desde else 0,
                     numero_comprobante__lte=serie.hasta if serie.hasta else 0,
                     cliente__isnull=True,
                     factura_asignada__isnull=True,
                     anulado=False
-                )
-                
-                cantidad_anulados = comprobantes_a_anular.count()
-                comprobantes_a_anular.update(anulado=True)
+                ).update(anulado=True)
+
+                # Los números que nunca se entregaron quedan anulados con la
+                # serie; se cuentan por aritmética de rango sin crear filas
+                if serie.ultimo_generado is not None and serie.hasta:
+                    con_fila = Comprobante.objects.filter(
+                        tipo_comprobante=serie.tipo_comprobante,
+                        numero_comprobante__gt=serie.ultimo_generado,
+                        numero_comprobante__lte=serie.hasta,
+                    ).count()
+                    cantidad_anulados += max(0, serie.hasta - serie.ultimo_generado - con_fila)
             
             return Response({
                 'message': 'Serie anulada exitosamente',
@@ -91,37 +195,34 @@ class SerieComprobanteViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def alertas(self, request):
-        """Obtener series de comprobante que están por agotarse o agotadas"""
-        limite = int(request.query_params.get('limite', 5))
-        
+        """Obtener series de comprobante que están por agotarse, agotadas o por vencer"""
         try:
-            # Obtener series que están por agotarse (excluyendo anuladas)
-            series_por_agotarse = SerieComprobante.objects.filter(
-                desde__isnull=False,
-                hasta__isnull=False,
-                anulado=False
-            ).exclude(desde__isnull=True, hasta__isnull=True)
-            
-            alertas = []
-            for serie in series_por_agotarse:
-                restantes = serie.comprobantes_restantes()
-                if restantes <= limite:
-                    alertas.append({
-                        'id': serie.id,
-                        'tipo_comprobante': serie.tipo_comprobante.tipo_comprobante,
-                        'desde': serie.desde,
-                        'hasta': serie.hasta,
-                        'numero_actual': serie.numero_actual,
-                        'comprobantes_restantes': restantes,
-                        'esta_agotado': serie.esta_agotado(),
-                        'esta_por_agotarse': serie.esta_por_agotarse(limite),
-                        'fecha_vencimiento': serie.fecha_vencimiento
-                    })
-            
-            return Response(alertas)
-            
-        except Exception as e:
+            limite = int(request.query_params.get('limite', 5))
+            dias = request.query_params.get('dias')
+            dias = int(dias) if dias is not None else None
+        except ValueError:
             return Response(
-                {'error': str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'limite y dias deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(obtener_alertas(request.user.empresa_id, limite, dias))
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """Conteo de series vigentes, agotadas, por agotarse y por vencer"""
+        try:
+            limite = int(request.query_params.get('limite', 5))
+            dias = int(request.query_params.get('dias', 30))
+        except ValueError:
+            return Response(
+                {'error': 'limite y dias deben ser números enteros'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+
+        return Response(obtener_resumen(request.user.empresa_id, limite, dias))
+
+
+class ComprobanteAsyncView(AsyncReadView):
+    queryset = Comprobante.objects.select_related('tipo_comprobante')
+    serializer_class = ComprobanteSerializer
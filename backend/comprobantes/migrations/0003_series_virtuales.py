@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:37
+
+from django.db import migrations, models
+from django.db.models import Max, Q
+
+
+def convertir_series_a_virtuales(apps, schema_editor):
+    """
+    Las series anteriores creaban una fila por número. Se conserva el último
+    número realmente usado como cursor y se eliminan las filas libres que
+    quedan por encima, que a partir de ahora existen solo virtualmente.
+    """
+    SerieComprobante = apps.get_model('comprobantes', 'SerieComprobante')
+    Comprobante = apps.get_model('comprobantes', 'Comprobante')
+
+    for serie in SerieComprobante.objects.filter(desde__isnull=False, hasta__isnull=False):
+        del_rango = Comprobante.objects.filter(
+            tipo_comprobante_id=serie.tipo_comprobante_id,
+            numero_comprobante__gte=serie.desde,
+            numero_comprobante__lte=serie.hasta,
+        )
+        usado = del_rango.filter(
+            Q(cliente__isnull=False) | Q(factura_asignada__isnull=False)
+        ).aggregate(ultimo=Max('numero_comprobante'))['ultimo']
+        serie.ultimo_generado = usado if usado is not None else serie.desde - 1
+        serie.save(update_fields=['ultimo_generado'])
+
+        del_rango.filter(
+            numero_comprobante__gt=serie.ultimo_generado,
+            cliente__isnull=True,
+            factura_asignada__isnull=True,
+            anulado=False,
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprobantes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seriecomprobante',
+            name='ultimo_generado',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(convertir_series_a_virtuales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('comprobantes', '0003_series_virtuales'),
+        ('config', '0001_initial'),
+        ('facturas', '0003_secuencias_por_empresa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(condition=models.Q(('anulado', False), ('cliente__isnull', True), ('factura_asignada__isnull', True)), fields=['id_empresa', 'tipo_comprobante', 'numero_comprobante', 'fecha_vencimiento'], name='comprobante_libre_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_indices_por_empresa'),
+        ('comprobantes', '0004_indice_comprobantes_libres'),
+        ('config', '0001_initial'),
+        ('facturas', '0003_secuencias_por_empresa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(fields=['id_empresa', 'tipo_comprobante', 'numero_comprobante'], name='comprobante_emp_tipo_num_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seriecomprobante',
+            index=models.Index(fields=['id_empresa', 'tipo_comprobante', 'desde'], name='serie_emp_tipo_desde_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seriecomprobante',
+            index=models.Index(fields=['id_empresa', 'anulado', 'fecha_vencimiento'], name='serie_emp_vencimiento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipocomprobante',
+            index=models.Index(fields=['id_empresa', 'tipo_comprobante'], name='tipocomprobante_emp_tipo_idx'),
+        ),
+    ]
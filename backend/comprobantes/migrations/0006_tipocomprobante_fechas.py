@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comprobantes', '0005_indices_por_empresa'),
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tipocomprobante',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tipocomprobante',
+            name='fecha_creacion',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='tipocomprobante',
+            index=models.Index(fields=['id_empresa', 'fecha_actualizacion'], name='tipocomprobante_emp_act_idx'),
+        ),
+    ]
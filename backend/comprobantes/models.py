@@ -1,12 +1,31 @@
 from django.db import models
 from clientes.models import Cliente
 from core.middleware import get_current_user
+from core.models import EmpresaManager
+
+# Longitud total de un NCF: serie y tipo (p. ej. "B01") más la secuencia con ceros
+LONGITUD_NCF = 11
+
+
+def formatear_ncf(tipo_texto, numero):
+    """Arma el NCF completo, p. ej. ('B01', 25) -> 'B0100000025'"""
+    return tipo_texto + str(numero).zfill(LONGITUD_NCF - len(tipo_texto))
 
 
 class TipoComprobante(models.Model):
     tipo_comprobante = models.CharField(max_length=50)
     descripcion = models.TextField()
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='tipos_comprobante', null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'tipo_comprobante'], name='tipocomprobante_emp_tipo_idx'),
+            models.Index(fields=['id_empresa', 'fecha_actualizacion'], name='tipocomprobante_emp_act_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
@@ -29,6 +48,22 @@ class Comprobante(models.Model):
     factura_asignada = models.ForeignKey('facturas.Factura', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Factura Asignada")
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='comprobantes', null=True, blank=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id_empresa', 'tipo_comprobante', 'numero_comprobante'], name='comprobante_emp_tipo_num_idx'
+            ),
+            # Solo los comprobantes libres; fecha_vencimiento va al final para
+            # que contar y buscar los siguientes no tengan que leer la tabla
+            models.Index(
+                fields=['id_empresa', 'tipo_comprobante', 'numero_comprobante', 'fecha_vencimiento'],
+                condition=models.Q(cliente__isnull=True, factura_asignada__isnull=True, anulado=False),
+                name='comprobante_libre_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
@@ -42,17 +77,29 @@ class SerieComprobante(models.Model):
     desde = models.IntegerField(verbose_name="Desde" , null=True, blank=True)
     hasta = models.IntegerField(verbose_name="Hasta" , null=True, blank=True)
     numero_actual = models.IntegerField()
+    # Último número del rango que ya se entregó; los posteriores solo existen virtualmente
+    ultimo_generado = models.IntegerField(null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     fecha_vencimiento = models.DateField()
     anulado = models.BooleanField(default=False, verbose_name="Anulado")
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='series_comprobante', null=True, blank=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'tipo_comprobante', 'desde'], name='serie_emp_tipo_desde_idx'),
+            models.Index(fields=['id_empresa', 'anulado', 'fecha_vencimiento'], name='serie_emp_vencimiento_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
             if user and hasattr(user, 'empresa') and user.empresa:
                 self.id_empresa = user.empresa
+        if self.ultimo_generado is None and self.desde is not None:
+            self.ultimo_generado = self.desde - 1
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -62,7 +109,8 @@ class SerieComprobante(models.Model):
         """Calcula cuántos comprobantes quedan disponibles"""
         if not self.desde or not self.hasta:
             return 0
-        return max(0, self.hasta - self.numero_actual)
+        ultimo = self.ultimo_generado if self.ultimo_generado is not None else self.desde - 1
+        return max(0, self.hasta - ultimo)
     
     def esta_por_agotarse(self, limite=5):
         """Verifica si quedan menos de 'limite' comprobantes"""
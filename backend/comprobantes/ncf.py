@@ -0,0 +1,350 @@
+from collections import namedtuple
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Comprobante, SerieComprobante, formatear_ncf
+from .alertas import invalidar_alertas
+
+NcfReclamado = namedtuple('NcfReclamado', ['id', 'numero_comprobante'])
+
+
+def reclamar_ncf(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha=None):
+    """
+    Asigna a la factura el NCF libre más bajo del tipo indicado en la empresa
+    y devuelve un ``NcfReclamado``, o None si no quedan comprobantes
+    disponibles. Solo se toman comprobantes y series de ``empresa_id``, así
+    que un tipo de otra empresa nunca entrega números.
+
+    Primero se reutilizan los comprobantes con fila propia que quedaron
+    libres (sin cliente ni factura, sin anular y sin vencer a la ``fecha``,
+    hoy por defecto), que siempre tienen números menores que los pendientes
+    de las series. La asignación es un UPDATE condicional, así que dos
+    activaciones concurrentes nunca reciben el mismo NCF: en PostgreSQL el
+    candidato se elige con ``FOR UPDATE SKIP LOCKED`` y en los demás motores
+    con un compare-and-set con reintentos.
+
+    Si no hay ninguno, se toma el siguiente número virtual de una serie
+    vigente avanzando su cursor con un UPDATE condicional y solo entonces se
+    crea la fila del comprobante.
+    """
+    if empresa_id is None:
+        return None
+    fecha = fecha or timezone.localdate()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            reclamado = _reclamar_skip_locked(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha)
+        else:
+            reclamado = _reclamar_compare_and_set(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha)
+
+        if reclamado is not None:
+            _avanzar_numero_actual(tipo_comprobante_id, empresa_id, reclamado.numero_comprobante)
+            return reclamado
+        return _reclamar_de_serie(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha)
+
+
+def reclamar_ncfs(tipo_comprobante_id, asignaciones, empresa_id, fecha=None):
+    """
+    Versión por lotes de reclamar_ncf. ``asignaciones`` son pares
+    ``(factura_id, cliente_id)`` y los números se entregan en el mismo orden
+    que darían otras tantas llamadas a reclamar_ncf, pero con una cantidad
+    de consultas que no depende del lote: los libres con fila se asignan con
+    un UPDATE condicional por ronda y los números virtuales de cada serie
+    con un solo avance del cursor y un bulk_create.
+
+    Devuelve ``{factura_id: NcfReclamado}``; si no alcanzan los comprobantes,
+    las últimas facturas quedan fuera.
+    """
+    reclamados = {}
+    if empresa_id is None:
+        return reclamados
+    fecha = fecha or timezone.localdate()
+    pendientes = list(asignaciones)
+    with transaction.atomic():
+        libres = comprobantes_libres(tipo_comprobante_id, fecha, empresa_id)
+        candidatos = libres.order_by('numero_comprobante')
+        if connection.vendor == 'postgresql':
+            candidatos = candidatos.select_for_update(skip_locked=True)
+        while pendientes:
+            ronda = dict(zip(candidatos.values_list('id', flat=True)[:len(pendientes)], pendientes))
+            if not ronda:
+                break
+            # Solo se asignan los que siguen libres; las facturas cuyo candidato
+            # tomó otra petición pasan a la ronda siguiente
+            libres.filter(pk__in=list(ronda)).update(
+                factura_asignada_id=Case(*[When(pk=c, then=Value(f)) for c, (f, _) in ronda.items()]),
+                cliente_id=Case(*[When(pk=c, then=Value(cliente)) for c, (_, cliente) in ronda.items()]),
+            )
+            for comprobante_id, numero, factura_id in Comprobante.objects.filter(pk__in=list(ronda)).values_list(
+                'id', 'numero_comprobante', 'factura_asignada_id'
+            ):
+                if ronda[comprobante_id][0] == factura_id:
+                    reclamados[factura_id] = NcfReclamado(comprobante_id, numero)
+            pendientes = [asignacion for asignacion in pendientes if asignacion[0] not in reclamados]
+        if reclamados:
+            _avanzar_numeros_actuales(tipo_comprobante_id, empresa_id, [r.numero_comprobante for r in reclamados.values()])
+
+        series = series_con_disponibles(tipo_comprobante_id, fecha, empresa_id).select_related('tipo_comprobante')
+        while pendientes:
+            serie = series.first()
+            if serie is None:
+                break
+            nuevos = _reclamar_bloque_de_serie(serie, pendientes, fecha)
+            for comprobante in nuevos:
+                reclamados[comprobante.factura_asignada_id] = NcfReclamado(comprobante.id, comprobante.numero_comprobante)
+            pendientes = pendientes[len(nuevos):]
+    return reclamados
+
+
+def hay_ncf_disponible(tipo_comprobante_id, empresa_id, fecha=None):
+    """Indica si una activación en la empresa encontraría un NCF para el tipo indicado"""
+    if empresa_id is None:
+        return False
+    return (comprobantes_libres(tipo_comprobante_id, fecha, empresa_id).exists()
+            or series_con_disponibles(tipo_comprobante_id, fecha, empresa_id).exists())
+
+
+def series_con_disponibles(tipo_comprobante_id, fecha=None, empresa_id=None):
+    """Series vigentes que aún tienen números virtuales sin entregar"""
+    series = SerieComprobante.objects.filter(
+        tipo_comprobante_id=tipo_comprobante_id,
+        anulado=False,
+        fecha_vencimiento__gte=fecha or timezone.localdate(),
+        ultimo_generado__lt=F('hasta'),
+    ).order_by('desde')
+    if empresa_id is not None:
+        series = series.filter(id_empresa_id=empresa_id)
+    return series
+
+
+def numeros_virtuales(serie):
+    """
+    Números de la serie que todavía no tienen fila. Las únicas filas por
+    encima del cursor son las anuladas o creadas a mano, que son pocas.
+    """
+    if serie.ultimo_generado is None or serie.hasta is None:
+        return
+    ocupados = set(Comprobante.objects.filter(
+        tipo_comprobante_id=serie.tipo_comprobante_id,
+        numero_comprobante__gt=serie.ultimo_generado,
+        numero_comprobante__lte=serie.hasta,
+    ).values_list('numero_comprobante', flat=True))
+    for numero in range(serie.ultimo_generado + 1, serie.hasta + 1):
+        if numero not in ocupados:
+            yield numero
+
+
+def comprobantes_libres(tipo_comprobante_id, fecha=None, empresa_id=None):
+    """Comprobantes que todavía pueden asignarse a una factura"""
+    libres = Comprobante.objects.filter(
+        tipo_comprobante_id=tipo_comprobante_id,
+        cliente__isnull=True,
+        factura_asignada__isnull=True,
+        anulado=False,
+        fecha_vencimiento__gte=fecha or timezone.localdate(),
+    )
+    if empresa_id is not None:
+        # Con la empresa el filtro coincide con comprobante_libre_idx
+        libres = libres.filter(id_empresa_id=empresa_id)
+    return libres
+
+
+def contar_disponibles(tipo_comprobante_id, fecha=None, empresa_id=None):
+    """
+    Cantidad de NCF que aún pueden asignarse: los libres con fila más los
+    números virtuales de las series, descontando los que ya tienen fila por
+    encima del cursor. Son dos consultas sin importar el tamaño de los rangos.
+    """
+    libres = comprobantes_libres(tipo_comprobante_id, fecha, empresa_id).count()
+    con_fila = Comprobante.objects.filter(
+        tipo_comprobante_id=OuterRef('tipo_comprobante_id'),
+        numero_comprobante__gt=OuterRef('ultimo_generado'),
+        numero_comprobante__lte=OuterRef('hasta'),
+    ).order_by().values('tipo_comprobante_id').annotate(total=Count('id')).values('total')
+    virtuales = series_con_disponibles(tipo_comprobante_id, fecha, empresa_id).annotate(
+        pendientes=F('hasta') - F('ultimo_generado') - Coalesce(Subquery(con_fila), 0),
+    ).aggregate(total=Sum('pendientes'))['total']
+    return libres + (virtuales or 0)
+
+
+def siguientes_disponibles(tipo_comprobante_id, cantidad, fecha=None, empresa_id=None):
+    """
+    Los próximos ``cantidad`` NCF en el orden en que los entregaría
+    reclamar_ncf, como diccionarios con ``id`` (None si el número todavía es
+    virtual), ``numero_comprobante``, ``numero_comprobante_completo`` y
+    ``fecha_vencimiento``.
+    """
+    siguientes = list(
+        comprobantes_libres(tipo_comprobante_id, fecha, empresa_id)
+        .order_by('numero_comprobante')
+        .values('id', 'numero_comprobante', 'numero_comprobante_completo', 'fecha_vencimiento')[:cantidad]
+    )
+    if len(siguientes) == cantidad:
+        return siguientes
+
+    for serie in series_con_disponibles(tipo_comprobante_id, fecha, empresa_id).select_related('tipo_comprobante'):
+        for numero in numeros_virtuales(serie):
+            siguientes.append({
+                'id': None,
+                'numero_comprobante': numero,
+                'numero_comprobante_completo': formatear_ncf(serie.tipo_comprobante.tipo_comprobante, numero),
+                'fecha_vencimiento': serie.fecha_vencimiento,
+            })
+            if len(siguientes) == cantidad:
+                return siguientes
+    return siguientes
+
+
+def _reclamar_skip_locked(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha):
+    tabla = connection.ops.quote_name(Comprobante._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            UPDATE {tabla} SET factura_asignada_id = %s, cliente_id = %s
+            WHERE id = (
+                SELECT id FROM {tabla}
+                WHERE id_empresa_id = %s
+                  AND tipo_comprobante_id = %s
+                  AND cliente_id IS NULL
+                  AND factura_asignada_id IS NULL
+                  AND NOT anulado
+                  AND fecha_vencimiento >= %s
+                ORDER BY numero_comprobante
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, numero_comprobante
+            ''',
+            [factura_id, cliente_id, empresa_id, tipo_comprobante_id, fecha],
+        )
+        fila = cursor.fetchone()
+    return NcfReclamado(*fila) if fila else None
+
+
+def _reclamar_compare_and_set(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha):
+    libres = comprobantes_libres(tipo_comprobante_id, fecha, empresa_id)
+    # Cada intento fallido significa que otra petición tomó ese candidato, así
+    # que el ciclo siempre avanza y termina cuando se agotan los libres
+    while True:
+        candidato = libres.order_by('numero_comprobante').values_list('id', 'numero_comprobante').first()
+        if candidato is None:
+            return None
+        # Solo gana quien encuentre el comprobante todavía libre
+        if libres.filter(pk=candidato[0]).update(factura_asignada_id=factura_id, cliente_id=cliente_id):
+            return NcfReclamado(*candidato)
+
+
+def _reclamar_de_serie(tipo_comprobante_id, factura_id, cliente_id, empresa_id, fecha):
+    series = series_con_disponibles(tipo_comprobante_id, fecha, empresa_id).select_related('tipo_comprobante')
+    while True:
+        serie = series.first()
+        if serie is None:
+            return None
+
+        # Avanza el cursor solo si la serie sigue teniendo números; si otra
+        # petición la agotó primero, se intenta con la siguiente
+        cursor = SerieComprobante.objects.filter(
+            pk=serie.pk, anulado=False, ultimo_generado__lt=F('hasta')
+        )
+        avanzadas = cursor.update(
+            ultimo_generado=F('ultimo_generado') + 1,
+            numero_actual=Greatest('numero_actual', F('ultimo_generado') + 1),
+            fecha_actualizacion=timezone.now(),
+        )
+        if not avanzadas:
+            continue
+        # Los restantes de la serie cambiaron, las alertas en caché ya no valen
+        invalidar_alertas(serie.id_empresa_id)
+        # El UPDATE deja la fila bloqueada hasta el final de la transacción
+        numero = SerieComprobante.objects.values_list('ultimo_generado', flat=True).get(pk=serie.pk)
+
+        # Un número anulado o creado a mano por encima del cursor ya tiene fila
+        if Comprobante.objects.filter(tipo_comprobante_id=tipo_comprobante_id, numero_comprobante=numero).exists():
+            continue
+
+        comprobante = Comprobante.objects.create(
+            tipo_comprobante_id=tipo_comprobante_id,
+            numero_comprobante=numero,
+            numero_comprobante_completo=formatear_ncf(serie.tipo_comprobante.tipo_comprobante, numero),
+            fecha_emision=fecha,
+            fecha_vencimiento=serie.fecha_vencimiento,
+            cliente_id=cliente_id,
+            factura_asignada_id=factura_id,
+            id_empresa_id=serie.id_empresa_id,
+        )
+        return NcfReclamado(comprobante.id, numero)
+
+
+def _reclamar_bloque_de_serie(serie, asignaciones, fecha):
+    """
+    Entrega de una vez a las ``asignaciones`` los siguientes números virtuales
+    de la serie y devuelve los comprobantes creados, que pueden ser menos si
+    la serie se agota. Otra petición pudo avanzar el cursor, así que se
+    relee después de bloquear la fila.
+    """
+    vigente = SerieComprobante.objects.filter(pk=serie.pk, anulado=False, ultimo_generado__lt=F('hasta'))
+    # El UPDATE bloquea la fila hasta el final de la transacción y el cursor ya no cambia
+    if not vigente.update(fecha_actualizacion=timezone.now()):
+        return []
+    ultimo, hasta = SerieComprobante.objects.values_list('ultimo_generado', 'hasta').get(pk=serie.pk)
+    fin = min(hasta, ultimo + len(asignaciones))
+    SerieComprobante.objects.filter(pk=serie.pk).update(
+        ultimo_generado=fin, numero_actual=Greatest('numero_actual', Value(fin)),
+    )
+    # Los restantes de la serie cambiaron, las alertas en caché ya no valen
+    invalidar_alertas(serie.id_empresa_id)
+
+    # Un número anulado o creado a mano por encima del cursor ya tiene fila
+    ocupados = set(Comprobante.objects.filter(
+        tipo_comprobante_id=serie.tipo_comprobante_id, numero_comprobante__gt=ultimo, numero_comprobante__lte=fin,
+    ).values_list('numero_comprobante', flat=True))
+    numeros = [numero for numero in range(ultimo + 1, fin + 1) if numero not in ocupados]
+    tipo = serie.tipo_comprobante.tipo_comprobante
+    nuevos = Comprobante.objects.bulk_create([
+        Comprobante(
+            tipo_comprobante_id=serie.tipo_comprobante_id,
+            numero_comprobante=numero,
+            numero_comprobante_completo=formatear_ncf(tipo, numero),
+            fecha_emision=fecha,
+            fecha_vencimiento=serie.fecha_vencimiento,
+            cliente_id=cliente_id,
+            factura_asignada_id=factura_id,
+            id_empresa_id=serie.id_empresa_id,
+        )
+        for numero, (factura_id, cliente_id) in zip(numeros, asignaciones)
+    ])
+    if nuevos and nuevos[0].pk is None:
+        # Sin RETURNING en el INSERT los ids se leen aparte
+        ids = dict(Comprobante.objects.filter(
+            tipo_comprobante_id=serie.tipo_comprobante_id, numero_comprobante__in=numeros,
+        ).values_list('numero_comprobante', 'id'))
+        for comprobante in nuevos:
+            comprobante.pk = ids[comprobante.numero_comprobante]
+    return nuevos
+
+
+def _avanzar_numeros_actuales(tipo_comprobante_id, empresa_id, numeros):
+    """Como _avanzar_numero_actual, con un UPDATE por serie que contiene alguno de los números"""
+    series = SerieComprobante.objects.filter(
+        id_empresa_id=empresa_id, tipo_comprobante_id=tipo_comprobante_id, desde__lte=max(numeros), hasta__gte=min(numeros),
+    ).values_list('id', 'desde', 'hasta')
+    for serie_id, desde, hasta in series:
+        usados = [numero for numero in numeros if desde <= numero <= hasta]
+        if usados:
+            SerieComprobante.objects.filter(pk=serie_id).update(
+                numero_actual=Greatest('numero_actual', Value(max(usados))),
+                fecha_actualizacion=timezone.now(),
+            )
+
+
+def _avanzar_numero_actual(tipo_comprobante_id, empresa_id, numero):
+    """Lleva numero_actual de la serie al número usado sin retroceder nunca"""
+    SerieComprobante.objects.filter(
+        id_empresa_id=empresa_id,
+        tipo_comprobante_id=tipo_comprobante_id,
+        desde__lte=numero,
+        hasta__gte=numero,
+    ).update(
+        numero_actual=Greatest('numero_actual', Value(numero)),
+        fecha_actualizacion=timezone.now(),
+    )
@@ -1,6 +1,5 @@
 from rest_framework import serializers
-from django.db import transaction
-from .models import TipoComprobante, Comprobante, SerieComprobante
+from .models import TipoComprobante, Comprobante, SerieComprobante, formatear_ncf
 
 class TipoComprobanteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,9 +18,9 @@ class ComprobanteSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Personalizar la representación para devolver el objeto completo del tipo de comprobante"""
         representation = super().to_representation(instance)
-        # Reemplazar el ID con el objeto completo en las respuestas
-        if instance.tipo_comprobante:
-            representation['tipo_comprobante'] = TipoComprobanteSerializer(instance.tipo_comprobante).data
+        # Reemplazar el ID con el objeto completo ya serializado en tipo_comprobante_obj
+        if instance.tipo_comprobante_id:
+            representation['tipo_comprobante'] = representation['tipo_comprobante_obj']
         return representation
 
     def create(self, validated_data):
@@ -35,10 +34,9 @@ class ComprobanteSerializer(serializers.ModelSerializer):
         return instance
 
     def _generar_numero_completo(self, instance):
-        longitud_total = 11
-        tipo_texto = instance.tipo_comprobante.tipo_comprobante
-        numero_con_ceros = str(instance.numero_comprobante).zfill(longitud_total - len(tipo_texto))
-        instance.numero_comprobante_completo = tipo_texto + numero_con_ceros
+        instance.numero_comprobante_completo = formatear_ncf(
+            instance.tipo_comprobante.tipo_comprobante, instance.numero_comprobante
+        )
         instance.save()
 
 class SerieComprobanteSerializer(serializers.ModelSerializer):
@@ -48,18 +46,21 @@ class SerieComprobanteSerializer(serializers.ModelSerializer):
     class Meta:
         model = SerieComprobante
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'anulado', 'id_empresa']
+        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'anulado', 'id_empresa', 'ultimo_generado']
     
     def to_representation(self, instance):
         """Personalizar la representación para devolver el objeto completo del tipo de comprobante"""
         representation = super().to_representation(instance)
-        # Reemplazar el ID con el objeto completo en las respuestas
-        if instance.tipo_comprobante:
-            representation['tipo_comprobante'] = TipoComprobanteSerializer(instance.tipo_comprobante).data
+        # Reemplazar el ID con el objeto completo ya serializado en tipo_comprobante_obj
+        if instance.tipo_comprobante_id:
+            representation['tipo_comprobante'] = representation['tipo_comprobante_obj']
         return representation
 
     def get_tiene_comprobantes_generados(self, obj):
         """Verifica si la serie ya tiene comprobantes generados"""
+        # Usar la anotación Exists del queryset del viewset cuando está disponible
+        if hasattr(obj, 'comprobantes_generados'):
+            return obj.comprobantes_generados
         if obj.id:
             return Comprobante.objects.filter(
                 tipo_comprobante=obj.tipo_comprobante,
@@ -73,6 +74,22 @@ class SerieComprobanteSerializer(serializers.ModelSerializer):
         if data.get('desde') and data.get('hasta'):
             if data['desde'] >= data['hasta']:
                 raise serializers.ValidationError("El campo 'desde' debe ser menor que 'hasta'")
+
+        # Los números se entregan por rango, así que dos series vigentes del
+        # mismo tipo no pueden compartir números
+        tipo = data.get('tipo_comprobante', getattr(self.instance, 'tipo_comprobante', None))
+        desde = data.get('desde', getattr(self.instance, 'desde', None))
+        hasta = data.get('hasta', getattr(self.instance, 'hasta', None))
+        if tipo and desde and hasta:
+            solapadas = SerieComprobante.objects.filter(
+                tipo_comprobante=tipo, anulado=False, desde__lte=hasta, hasta__gte=desde
+            )
+            if self.instance:
+                solapadas = solapadas.exclude(pk=self.instance.pk)
+            if solapadas.exists():
+                raise serializers.ValidationError(
+                    'El rango se solapa con otra serie vigente del mismo tipo de comprobante'
+                )
         
         # Si estamos actualizando (hay instancia), verificar si ya tiene comprobantes generados
         if self.instance:
@@ -97,30 +114,14 @@ class SerieComprobanteSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        # Usar transacción para asegurar atomicidad
-        with transaction.atomic():
-            # Crear la serie de comprobante
-            serie = super().create(validated_data)
-            
-            # Generar comprobantes individuales desde 'desde' hasta 'hasta'
-            for numero in range(serie.desde, serie.hasta + 1):
-                # Generar el número de comprobante completo
-                longitud_total = 10
-                tipo_texto = serie.tipo_comprobante.tipo_comprobante
-                numero_con_ceros = str(numero).zfill(longitud_total - len(tipo_texto))
-                numero_completo = tipo_texto + numero_con_ceros
-                
-                # Crear el comprobante directamente
-                Comprobante.objects.create(
-                    tipo_comprobante=serie.tipo_comprobante,
-                    numero_comprobante=numero,
-                    numero_comprobante_completo=numero_completo,
-                    fecha_emision=serie.fecha_creacion.date(),
-                    fecha_vencimiento=serie.fecha_vencimiento,
-                    anulado=False
-                )
-            
-            return serie
-
-
+        # La serie es un rango virtual: los comprobantes se crean solo cuando
+        # se asigna o se anula un número, por lo que crearla cuesta lo mismo
+        # sin importar el tamaño del rango. El cursor ultimo_generado parte de
+        # desde - 1 (ver SerieComprobante.save)
+        return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        # Mientras no se haya usado ningún número, cambiar 'desde' reinicia el cursor
+        if 'desde' in validated_data and validated_data['desde'] != instance.desde:
+            validated_data['ultimo_generado'] = validated_data['desde'] - 1 if validated_data['desde'] else None
+        return super().update(instance, validated_data)
@@ -1,3 +1,322 @@
+import datetime
+from django.core.cache import cache
 from django.test import TestCase
+from core.testing import QueryBudgetMixin, crear_usuario_con_empresa
+from .models import TipoComprobante, Comprobante, SerieComprobante
 
-# Create your tests here.
+
+class ComprobanteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.empresa = self.usuario.empresa
+        self.client = self.get_budget_client(self.usuario)
+        self.vencimiento = datetime.date.today() + datetime.timedelta(days=365)
+        self.siguiente = 0
+
+    def crear_tipo(self, nombre='B01'):
+        return TipoComprobante.objects.create(tipo_comprobante=nombre, descripcion=nombre, id_empresa=self.empresa)
+
+    def crear_comprobantes(self, n):
+        # Cada comprobante con su propio tipo para detectar cargas perezosas por fila
+        for _ in range(n):
+            self.siguiente += 1
+            Comprobante.objects.create(
+                tipo_comprobante=self.crear_tipo(f'B{self.siguiente:02d}'),
+                numero_comprobante=self.siguiente, fecha_emision=datetime.date.today(),
+                fecha_vencimiento=self.vencimiento, id_empresa=self.empresa
+            )
+
+    def crear_series(self, n):
+        for _ in range(n):
+            self.siguiente += 1
+            tipo = self.crear_tipo(f'B{self.siguiente:02d}')
+            SerieComprobante.objects.create(
+                tipo_comprobante=tipo, desde=1, hasta=3, numero_actual=1,
+                fecha_vencimiento=self.vencimiento, id_empresa=self.empresa
+            )
+            Comprobante.objects.create(
+                tipo_comprobante=tipo, numero_comprobante=1, fecha_emision=datetime.date.today(),
+                fecha_vencimiento=self.vencimiento, id_empresa=self.empresa
+            )
+
+    def test_listado_tipos_comprobante(self):
+        self.assertQueryBudget(
+            self.client, '/api/tipocomprobantes/', 3, lambda n: [self.crear_tipo() for _ in range(n)]
+        )
+
+    def test_listado_comprobantes(self):
+        self.assertQueryBudget(self.client, '/api/comprobantes/', 1, self.crear_comprobantes)
+
+    def test_comprobantes_disponibles(self):
+        tipo = self.crear_tipo()
+
+        def crear_disponibles(n):
+            for _ in range(n):
+                self.siguiente += 1
+                Comprobante.objects.create(
+                    tipo_comprobante=tipo, numero_comprobante=self.siguiente,
+                    fecha_emision=datetime.date.today(), fecha_vencimiento=self.vencimiento,
+                    id_empresa=self.empresa
+                )
+
+        # Cada modo verifica primero que el tipo sea de la empresa
+        self.assertQueryBudget(
+            self.client, f'/api/comprobantes/disponibles/?tipo_comprobante={tipo.id}', 3, crear_disponibles
+        )
+        self.assertQueryBudget(
+            self.client, f'/api/comprobantes/disponibles/?tipo_comprobante={tipo.id}&mode=count', 3, crear_disponibles
+        )
+        self.assertQueryBudget(
+            self.client, f'/api/comprobantes/disponibles/?tipo_comprobante={tipo.id}&mode=next&n=1', 2,
+            crear_disponibles
+        )
+
+    def test_listado_series(self):
+        self.assertQueryBudget(self.client, '/api/seriecomprobantes/', 1, self.crear_series)
+
+    def test_alertas_series(self):
+        # Se mide la consulta sin caché; las series se crean fuera de la API
+        def crear_series(n):
+            self.crear_series(n)
+            cache.clear()
+
+        self.assertQueryBudget(self.client, '/api/seriecomprobantes/alertas/?limite=5', 1, crear_series)
+        self.assertQueryBudget(self.client, '/api/seriecomprobantes/resumen/', 1, crear_series)
+
+
+class AlertasSeriesTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario_con_empresa()
+        self.empresa = self.usuario.empresa
+        self.client = self.get_budget_client(self.usuario)
+        self.hoy = datetime.date.today()
+
+    def crear_serie(self, nombre, hasta, vence_en=365, empresa=None):
+        empresa = empresa or self.empresa
+        tipo = TipoComprobante.objects.create(tipo_comprobante=nombre, descripcion=nombre, id_empresa=empresa)
+        return SerieComprobante.objects.create(
+            tipo_comprobante=tipo, desde=1, hasta=hasta, numero_actual=0,
+            fecha_vencimiento=self.hoy + datetime.timedelta(days=vence_en), id_empresa=empresa
+        )
+
+    def test_filtra_por_restantes_y_vencimiento(self):
+        agotada = self.crear_serie('B01', 3)
+        agotada.ultimo_generado = 3
+        agotada.save()
+        por_agotarse = self.crear_serie('B02', 4)
+        por_vencer = self.crear_serie('B14', 1000, vence_en=10)
+        self.crear_serie('B15', 1000)
+        self.crear_serie('B16', 2, empresa=crear_usuario_con_empresa('otro', '101000002').empresa)
+
+        response = self.client.get('/api/seriecomprobantes/alertas/?limite=5')
+        self.assertEqual([a['id'] for a in response.data], [agotada.id, por_agotarse.id])
+        self.assertTrue(response.data[0]['esta_agotado'])
+        self.assertEqual(response.data[1]['comprobantes_restantes'], 4)
+        self.assertTrue(response.data[1]['esta_por_agotarse'])
+
+        response = self.client.get('/api/seriecomprobantes/alertas/?limite=5&dias=30')
+        self.assertEqual([a['id'] for a in response.data], [agotada.id, por_agotarse.id, por_vencer.id])
+
+        response = self.client.get('/api/seriecomprobantes/resumen/?dias=30')
+        self.assertEqual(response.data, {'series_vigentes': 4, 'agotadas': 1, 'por_agotarse': 1, 'por_vencer': 1})
+
+        self.assertEqual(self.client.get('/api/seriecomprobantes/alertas/?limite=x').status_code, 400)
+
+    def test_sin_empresa_no_hay_alertas(self):
+        from rest_framework.test import APIClient
+        from accounts.models import Usuario
+
+        self.crear_serie('B01', 3)
+        client = APIClient()
+        client.force_authenticate(Usuario.objects.create_user(username='suelto', password='clave-segura'))
+        self.assertEqual(client.get('/api/seriecomprobantes/alertas/?limite=5').data, [])
+        self.assertEqual(client.get('/api/seriecomprobantes/resumen/').data['series_vigentes'], 0)
+
+    def test_sin_cache_compartida_no_se_guardan(self):
+        from django.test import override_settings
+
+        self.crear_serie('B01', 3)
+        url = '/api/seriecomprobantes/alertas/?limite=5'
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.client.get(url)
+            # La invalidación de otro proceso no llegaría a esta caché
+            consultas, _ = self.count_queries(self.client, url)
+            self.assertEqual(consultas, 1)
+
+    def test_cache_se_invalida_al_reclamar(self):
+        from clientes.models import Cliente
+        from facturas.models import Factura
+        from .ncf import reclamar_ncf
+
+        serie = self.crear_serie('B01', 3)
+        url = '/api/seriecomprobantes/alertas/?limite=2'
+        self.assertEqual(self.client.get(url).data, [])
+        consultas, _ = self.count_queries(self.client, url)
+        self.assertEqual(consultas, 0)
+
+        cliente = Cliente.objects.create(
+            nombre='Cliente', tipo_documento='1', numero_documento=1, tipo_ncf=1, id_empresa=self.empresa
+        )
+        factura = Factura.objects.create(
+            tipo_comprobante=serie.tipo_comprobante, cliente=cliente, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy, total=0, id_empresa=self.empresa
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            reclamar_ncf(serie.tipo_comprobante_id, factura.id, cliente.id, self.empresa.id)
+
+        response = self.client.get(url)
+        self.assertEqual([(a['id'], a['comprobantes_restantes']) for a in response.data], [(serie.id, 2)])
+
+
+class ReclamarNcfTests(TestCase):
+    def setUp(self):
+        from clientes.models import Cliente
+        self.empresa = crear_usuario_con_empresa().empresa
+        self.hoy = datetime.date.today()
+        self.tipo = TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='B01', id_empresa=self.empresa)
+        self.cliente = Cliente.objects.create(
+            nombre='Cliente', tipo_documento='1', numero_documento=1, tipo_ncf=1, id_empresa=self.empresa
+        )
+        self.serie = SerieComprobante.objects.create(
+            tipo_comprobante=self.tipo, desde=1, hasta=6, numero_actual=0,
+            fecha_vencimiento=self.hoy, id_empresa=self.empresa
+        )
+
+    def crear_comprobante(self, numero, **kwargs):
+        datos = {'fecha_emision': self.hoy, 'fecha_vencimiento': self.hoy, 'id_empresa': self.empresa}
+        datos.update(kwargs)
+        return Comprobante.objects.create(tipo_comprobante=self.tipo, numero_comprobante=numero, **datos)
+
+    def crear_factura(self):
+        from facturas.models import Factura
+        return Factura.objects.create(
+            tipo_comprobante=self.tipo, cliente=self.cliente, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy, total=0, id_empresa=self.empresa
+        )
+
+    def test_reclama_el_menor_libre_y_avanza_la_serie(self):
+        from .ncf import reclamar_ncf
+
+        self.crear_comprobante(1, anulado=True)
+        self.crear_comprobante(2, fecha_vencimiento=self.hoy - datetime.timedelta(days=1))
+        self.crear_comprobante(4)
+        tercero = self.crear_comprobante(3)
+
+        factura = self.crear_factura()
+        reclamado = reclamar_ncf(self.tipo.id, factura.id, self.cliente.id, self.empresa.id)
+        self.assertEqual(reclamado, (tercero.id, 3))
+        tercero.refresh_from_db()
+        self.assertEqual((tercero.factura_asignada_id, tercero.cliente_id), (factura.id, self.cliente.id))
+        self.serie.refresh_from_db()
+        self.assertEqual(self.serie.numero_actual, 3)
+
+        self.assertEqual(reclamar_ncf(self.tipo.id, self.crear_factura().id, self.cliente.id, self.empresa.id).numero_comprobante, 4)
+
+        # Agotadas las filas libres, se entregan los números virtuales de la
+        # serie saltando los que ya tienen fila
+        quinto = reclamar_ncf(self.tipo.id, self.crear_factura().id, self.cliente.id, self.empresa.id)
+        self.assertEqual(quinto.numero_comprobante, 5)
+        self.assertEqual(Comprobante.objects.get(pk=quinto.id).numero_comprobante_completo, 'B0100000005')
+        self.assertEqual(reclamar_ncf(self.tipo.id, self.crear_factura().id, self.cliente.id, self.empresa.id).numero_comprobante, 6)
+        self.assertIsNone(reclamar_ncf(self.tipo.id, self.crear_factura().id, self.cliente.id, self.empresa.id))
+        self.serie.refresh_from_db()
+        self.assertEqual((self.serie.ultimo_generado, self.serie.numero_actual), (6, 6))
+
+    def test_reclamar_en_lote_sigue_el_mismo_orden(self):
+        from .ncf import reclamar_ncfs
+
+        self.crear_comprobante(1, anulado=True)
+        self.crear_comprobante(4)
+        self.crear_comprobante(3)
+        # Creado a mano por encima del cursor: la serie lo salta
+        self.serie.ultimo_generado = 4
+        self.serie.save()
+        self.crear_comprobante(6, anulado=True)
+
+        facturas = [self.crear_factura() for _ in range(5)]
+        reclamados = reclamar_ncfs(self.tipo.id, [(factura.id, self.cliente.id) for factura in facturas], self.empresa.id)
+        self.assertEqual([reclamados[f.id].numero_comprobante for f in facturas if f.id in reclamados], [3, 4, 5])
+        self.assertEqual(
+            Comprobante.objects.get(numero_comprobante=5).factura_asignada_id, facturas[2].id
+        )
+        self.serie.refresh_from_db()
+        self.assertEqual((self.serie.ultimo_generado, self.serie.numero_actual), (6, 6))
+
+    def test_disponibles_count_y_next(self):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.empresa.usuarios.get())
+        url = f'/api/comprobantes/disponibles/?tipo_comprobante={self.tipo.id}'
+        # 2 libre con fila, 4 anulado con fila y 1, 3, 5, 6 virtuales
+        self.crear_comprobante(2)
+        self.crear_comprobante(4, anulado=True)
+        self.serie.ultimo_generado = 0
+        self.serie.save()
+
+        self.assertEqual(client.get(f'{url}&mode=count').data, {'disponibles': 5})
+        siguientes = client.get(f'{url}&mode=next&n=3').data
+        self.assertEqual([s['numero_comprobante'] for s in siguientes], [2, 1, 3])
+        self.assertEqual(siguientes[2]['numero_comprobante_completo'], 'B0100000003')
+        self.assertEqual(len(client.get(f'{url}&mode=next&n=100').data), 5)
+        self.assertEqual(
+            [d['numero_comprobante'] for d in client.get(url).data],
+            [s['numero_comprobante'] for s in client.get(f'{url}&mode=next&n=5').data],
+        )
+        self.assertEqual(client.get(f'{url}&mode=next&n=0').status_code, 400)
+        self.assertEqual(client.get(f'{url}&mode=otro').status_code, 400)
+
+    def test_disponibles_de_otra_empresa_y_parametros_invalidos(self):
+        from rest_framework.test import APIClient
+        from core.testing import crear_usuario_con_empresa
+
+        client = APIClient()
+        client.force_authenticate(crear_usuario_con_empresa('otro', '101000002'))
+        url = f'/api/comprobantes/disponibles/?tipo_comprobante={self.tipo.id}'
+        for modo in ('', '&mode=count', '&mode=next&n=3'):
+            self.assertEqual(client.get(url + modo).status_code, 404)
+        for modo in ('', '&mode=count', '&mode=next'):
+            self.assertEqual(client.get(f'/api/comprobantes/disponibles/?tipo_comprobante=abc{modo}').status_code, 400)
+        client.force_authenticate(self.empresa.usuarios.get())
+        self.assertEqual(client.get(f'{url}&mode=next&n=abc').status_code, 400)
+
+    def test_listado_de_disponibles_acotado(self):
+        from rest_framework.test import APIClient
+        from .api import MAXIMO_DISPONIBLES
+
+        client = APIClient()
+        client.force_authenticate(self.empresa.usuarios.get())
+        self.serie.ultimo_generado = 0
+        self.serie.hasta = MAXIMO_DISPONIBLES * 10
+        self.serie.save()
+        url = f'/api/comprobantes/disponibles/?tipo_comprobante={self.tipo.id}'
+        self.assertEqual(len(client.get(url).data), MAXIMO_DISPONIBLES)
+        self.assertEqual(client.get(f'{url}&mode=count').data, {'disponibles': MAXIMO_DISPONIBLES * 10})
+
+    def test_numero_actual_no_retrocede(self):
+        from .ncf import reclamar_ncf
+
+        self.serie.numero_actual = 8
+        self.serie.save()
+        self.crear_comprobante(5)
+        reclamar_ncf(self.tipo.id, self.crear_factura().id, self.cliente.id, self.empresa.id)
+        self.serie.refresh_from_db()
+        self.assertEqual(self.serie.numero_actual, 8)
+
+    def test_crear_serie_no_materializa_comprobantes(self):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.empresa.usuarios.get())
+        otro_tipo = TipoComprobante.objects.create(tipo_comprobante='B02', descripcion='B02', id_empresa=self.empresa)
+        response = client.post('/api/seriecomprobantes/', {
+            'tipo_comprobante': otro_tipo.id, 'desde': 1, 'hasta': 100000, 'numero_actual': 0,
+            'fecha_vencimiento': str(self.hoy),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertFalse(Comprobante.objects.filter(tipo_comprobante=otro_tipo).exists())
+
+        response = client.post(f"/api/seriecomprobantes/{response.data['id']}/anular/")
+        self.assertEqual(response.data['comprobantes_anulados'], 100000)
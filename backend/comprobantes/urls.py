@@ -1,5 +1,6 @@
+from django.urls import path
 from rest_framework import routers
-from .api import TipoComprobanteViewSet, ComprobanteViewSet, SerieComprobanteViewSet
+from .api import TipoComprobanteViewSet, ComprobanteViewSet, SerieComprobanteViewSet, ComprobanteAsyncView
 
 router = routers.DefaultRouter()
 
@@ -7,5 +8,9 @@ router.register('api/comprobantes', ComprobanteViewSet, 'comprobantes')
 router.register('api/seriecomprobantes', SerieComprobanteViewSet, 'seriecomprobantes')
 router.register('api/tipocomprobantes', TipoComprobanteViewSet, 'tipocomprobantes')
 
-urlpatterns = router.urls
+# Lectura asíncrona nativa para servir bajo ASGI
+urlpatterns = router.urls + [
+    path('api/async/comprobantes/', ComprobanteAsyncView.as_view(), name='comprobantes-async-list'),
+    path('api/async/comprobantes/<int:pk>/', ComprobanteAsyncView.as_view(), name='comprobantes-async-detail'),
+]
 
@@ -0,0 +1,125 @@
+import hashlib
+from rest_framework import permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .busqueda import LIMITE_BUSQUEDA, MAXIMO_BUSQUEDA, buscar
+from .catalogos import version_catalogo
+from .importacion import formato_de, importar_filas, leer_filas
+from .replicas import leer_de_replica, restaurar
+
+
+class ReplicaLecturaMixin:
+    """
+    Lee de la réplica (``settings.DB_LECTURA``) las acciones GET de
+    ``acciones_replica``, o todas con ``'__all__'``, salvo que la empresa del
+    usuario haya escrito hace poco. Ver ``core.replicas``.
+    """
+    acciones_replica = ('list',)
+
+    def lee_de_replica(self, request):
+        return request.method in permissions.SAFE_METHODS and (
+            self.acciones_replica == '__all__' or self.action in self.acciones_replica
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.lee_de_replica(request):
+            self._token_replica = leer_de_replica(getattr(request.user, 'empresa_id', None))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_token_replica', None)
+        if token is not None:
+            self._token_replica = None
+            restaurar(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class EmpresaViewSetMixin(ReplicaLecturaMixin):
+    """
+    Restringe el queryset del viewset a la empresa del usuario autenticado,
+    de modo que las consultas usen los índices que comienzan con
+    ``id_empresa`` y crezcan con los datos de una sola empresa. Los
+    listados se leen de la réplica.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().del_usuario(self.request.user)
+
+
+class CatalogoCondicionalMixin:
+    """
+    GET condicional para el listado de un catálogo. El ETag se calcula con
+    ``version_catalogo`` (cantidad de filas, última modificación y último
+    tombstone de la empresa) más la consulta de la URL, así que un
+    ``If-None-Match`` vigente responde 304 con dos agregaciones y sin
+    serializar nada. El modelo debe registrar ``registrar_eliminacion`` en
+    su post_delete.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version = version_catalogo(self.get_queryset().model, request.user)
+        firma = f"{version['version']}:{request.META.get('QUERY_STRING', '')}"
+        etag = quote_etag(hashlib.sha256(firma.encode('utf-8')).hexdigest()[:32])
+        ultima_modificacion = version['actualizado'].timestamp() if version['actualizado'] else None
+
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        response = no_modificado or super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        if ultima_modificacion is not None:
+            response['Last-Modified'] = http_date(ultima_modificacion)
+        # El navegador guarda el catálogo pero lo revalida en cada uso
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class BusquedaMixin:
+    """
+    Agrega ``GET <recurso>/search/?q=<texto>&limit=K`` para los selectores:
+    las K filas más relevantes cuyas palabras empiezan por las de ``q``, sin
+    distinguir acentos. El modelo debe mantener su columna ``busqueda`` y
+    tener el índice creado con ``crear_indice_busqueda``.
+    """
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            limite = int(request.query_params.get('limit', LIMITE_BUSQUEDA))
+        except ValueError:
+            return Response({'error': 'limit debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limite <= MAXIMO_BUSQUEDA:
+            return Response(
+                {'error': f'limit debe estar entre 1 y {MAXIMO_BUSQUEDA}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filas = buscar(
+            self.get_queryset(), request.query_params.get('q', ''),
+            getattr(request.user, 'empresa_id', None), limite,
+        )
+        return Response(self.get_serializer(filas, many=True).data)
+
+
+class ImportacionMixin:
+    """
+    Agrega ``POST <recurso>/importar/`` con un CSV o XLSX en el campo
+    ``archivo`` (multipart). Las filas se validan con
+    ``serializer_importacion`` y se insertan o actualizan por su clave en la
+    empresa del usuario; responde con lo creado, lo actualizado y los errores
+    por fila. Ver ``core.importacion``.
+    """
+    serializer_importacion = None
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        empresa_id = getattr(request.user, 'empresa_id', None)
+        if empresa_id is None:
+            return Response({'error': 'El usuario no tiene una empresa asignada'}, status=status.HTTP_403_FORBIDDEN)
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({'error': 'Debe enviar el archivo en el campo archivo'}, status=status.HTTP_400_BAD_REQUEST)
+        filas = leer_filas(archivo, formato_de(archivo.name))
+        informe = importar_filas(filas, self.serializer_importacion, empresa_id)
+        return Response(informe)
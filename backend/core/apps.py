@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .busqueda import asegurar_indices_busqueda
+        from .cache import crear_tablas_cache
+
+        # post_migrate se envía al final de cada migrate aunque core no tenga cambios
+        post_migrate.connect(asegurar_indices_busqueda, sender=self)
+        post_migrate.connect(crear_tablas_cache, sender=self)
@@ -0,0 +1,68 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+class AsyncReadView(View):
+    """
+    Listado y detalle de solo lectura como vista asíncrona nativa.
+
+    Bajo ASGI atiende muchas peticiones concurrentes sin ocupar un hilo por
+    cada una. Reutiliza la autenticación, los serializers y la paginación de
+    DRF; las consultas usan el ORM asíncrono, así que un serializer que
+    dispare una carga perezosa falla con ``SynchronousOnlyOperation`` en lugar
+    de bloquear el bucle de eventos. Siempre exige un usuario autenticado y
+    restringe el queryset a su empresa.
+    """
+    http_method_names = ['get', 'head', 'options']
+    queryset = None
+    serializer_class = None
+    pagination_class = None
+
+    def filtrar(self, queryset, request):
+        """Filtros adicionales del listado a partir de ``request.query_params``"""
+        return queryset
+
+    async def get(self, request, pk=None):
+        drf_request = Request(
+            request, authenticators=[autenticador() for autenticador in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        try:
+            # La autenticación de DRF resuelve al usuario con el ORM síncrono
+            user = await sync_to_async(lambda: drf_request.user)()
+            if not user or not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+
+            queryset = self.filtrar(self.queryset.all().del_usuario(user), drf_request)
+            if pk is not None:
+                datos = await self.detalle(queryset, pk, drf_request)
+            else:
+                datos = await self.listado(queryset, drf_request)
+        except exceptions.APIException as exc:
+            datos = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.responder(datos, exc.status_code)
+        return self.responder(datos)
+
+    async def listado(self, queryset, request):
+        if self.pagination_class is None:
+            filas = [fila async for fila in queryset]
+            return self.serializer_class(filas, many=True, context={'request': request}).data
+
+        paginator = self.pagination_class()
+        filas = await paginator.apaginate_queryset(queryset, request, self)
+        datos = self.serializer_class(filas, many=True, context={'request': request}).data
+        return paginator.get_paginated_response(datos).data
+
+    async def detalle(self, queryset, pk, request):
+        try:
+            instancia = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise exceptions.NotFound()
+        return self.serializer_class(instancia, context={'request': request}).data
+
+    def responder(self, datos, status=200):
+        return HttpResponse(JSONRenderer().render(datos), content_type='application/json', status=status)
@@ -0,0 +1,186 @@
+import re
+import unicodedata
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Case, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+# Búsqueda por prefijo de palabras, sin distinguir mayúsculas ni acentos, para
+# los selectores de clientes y productos. Cada modelo guarda en ``busqueda``
+# sus campos ya normalizados y la base de datos la indexa: en SQLite con una
+# tabla FTS5 mantenida por triggers y en PostgreSQL con un índice de trigramas.
+
+LIMITE_BUSQUEDA = 10
+MAXIMO_BUSQUEDA = 50
+# Palabras de la consulta que se consideran; el resto se ignora
+MAXIMO_PALABRAS = 8
+# En SQLite se toman las coincidencias mejor puntuadas por bm25, que con
+# prefijos favorece los textos más cortos, y solo esas se ordenan por
+# relevancia; así una coincidencia exacta antigua no queda fuera por haber
+# muchas más recientes que empiezan igual
+CANDIDATOS_POR_RESULTADO = 5
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """'  José PÉREZ-Núñez ' -> 'jose perez nunez'"""
+    texto = str(texto)
+    if not texto.isascii():
+        descompuesto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(' ', texto.lower()).strip()
+
+
+def compactar(texto):
+    """Quita los separadores para que 'AB-0012' también se encuentre con 'ab00'"""
+    return normalizar(texto).replace(' ', '')
+
+
+def texto_busqueda(*valores):
+    """Valor de la columna ``busqueda`` con los campos indicados"""
+    return ' '.join(normalizar(valor) for valor in valores if valor not in (None, ''))
+
+
+def tabla_fts(tabla):
+    return f'{tabla}_busqueda'
+
+
+def crear_indice_busqueda(schema_editor, tabla):
+    """
+    Crea el índice de ``busqueda`` según el motor. Para SQLite es una tabla
+    FTS5 sin contenido (solo guarda el índice y el rowid, que es el id de la
+    fila) con la empresa como columna propia, así que el filtro por empresa
+    se resuelve dentro del mismo índice.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        fts = tabla_fts(tabla)
+        # Sin posiciones (detail=column) el índice es más chico y las listas
+        # de coincidencias se recorren más rápido; no hay búsqueda de frases
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"empresa, busqueda, content='', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3', detail='column')"
+        )
+        nuevo = "new.id, COALESCE(new.id_empresa_id, ''), new.busqueda"
+        viejo = "'delete', old.id, COALESCE(old.id_empresa_id, ''), old.busqueda"
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+            f"INSERT INTO {fts}(rowid, empresa, busqueda) VALUES ({nuevo}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, empresa, busqueda) VALUES ({viejo}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF id_empresa_id, busqueda ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, empresa, busqueda) VALUES ({viejo}); "
+            f"INSERT INTO {fts}(rowid, empresa, busqueda) VALUES ({nuevo}); END"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {fts}(rowid, empresa, busqueda) "
+            f"SELECT id, COALESCE(id_empresa_id, ''), busqueda FROM {tabla}"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE INDEX {tabla}_busqueda_trgm ON {tabla} USING gin (busqueda gin_trgm_ops)'
+        )
+
+
+def borrar_indice_busqueda(schema_editor, tabla):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        fts = tabla_fts(tabla)
+        for sufijo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufijo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {tabla}_busqueda_trgm')
+
+
+def restaurar_indice_busqueda(schema_editor, tabla):
+    """
+    Vuelve a crear el índice después de una migración que altere la tabla.
+    SQLite aplica casi todos los cambios de esquema copiando la tabla a una
+    nueva y borrando la original, y con ella se pierden los triggers que
+    mantienen la tabla FTS5. En PostgreSQL el índice sobrevive y no se toca.
+    """
+    if schema_editor.connection.vendor == 'sqlite':
+        borrar_indice_busqueda(schema_editor, tabla)
+        crear_indice_busqueda(schema_editor, tabla)
+
+
+def asegurar_indices_busqueda(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Receptor de post_migrate: en SQLite vuelve a crear el índice de cada
+    tabla con ``busqueda`` cuya tabla FTS5 existe pero perdió alguno de sus
+    triggers, de modo que una migración futura que copie la tabla no deje
+    la búsqueda sin actualizar.
+    """
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return
+    for modelo in apps.get_models():
+        if not any(campo.name == 'busqueda' for campo in modelo._meta.concrete_fields):
+            continue
+        tabla = modelo._meta.db_table
+        fts = tabla_fts(tabla)
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                "SELECT type, name FROM sqlite_master WHERE (type = 'table' AND name = %s) "
+                "OR (type = 'trigger' AND tbl_name = %s)",
+                [fts, tabla],
+            )
+            existentes = set(cursor.fetchall())
+        if ('table', fts) not in existentes:
+            # La migración que crea el índice todavía no se aplicó
+            continue
+        if not {('trigger', f'{fts}_{sufijo}') for sufijo in ('ai', 'ad', 'au')} <= existentes:
+            with conexion.schema_editor() as schema_editor:
+                restaurar_indice_busqueda(schema_editor, tabla)
+
+
+def buscar(queryset, termino, empresa_id, limite=LIMITE_BUSQUEDA):
+    """
+    Hasta ``limite`` filas del queryset con palabras que empiezan por cada
+    palabra del término, primero las que empiezan por la primera palabra.
+    El queryset ya debe estar restringido a la empresa; ``empresa_id`` solo
+    sirve para que SQLite filtre dentro del índice.
+    """
+    palabras = normalizar(termino).split()[:MAXIMO_PALABRAS]
+    if not palabras:
+        return []
+
+    candidatos = limite * CANDIDATOS_POR_RESULTADO
+    if connection.vendor == 'sqlite':
+        ids = _consulta_fts(queryset.model._meta.db_table, palabras, empresa_id, candidatos)
+    else:
+        # Palabras que empiezan por cada término, como el prefijo de FTS5: al
+        # inicio de ``busqueda`` o después de un espacio. ``busqueda`` y las
+        # palabras ya están normalizadas en minúsculas, así que se compara
+        # sin UPPER() y el índice de trigramas de PostgreSQL resuelve ambos
+        # LIKE; sin recorte previo, el orden de relevancia de abajo se
+        # aplica a todas las coincidencias
+        ids = queryset.values('pk')
+        for palabra in palabras:
+            ids = ids.filter(Q(busqueda__startswith=palabra) | Q(busqueda__contains=f' {palabra}'))
+
+    # Primero las que empiezan por lo escrito, luego las de texto más corto
+    return list(queryset.filter(pk__in=ids).order_by(
+        Case(When(busqueda__startswith=palabras[0], then=Value(0)), default=Value(1)),
+        Length('busqueda'),
+        'pk',
+    )[:limite])
+
+
+def _consulta_fts(tabla, palabras, empresa_id, limite):
+    fts = tabla_fts(tabla)
+    # Las palabras normalizadas solo tienen letras y dígitos, así que
+    # entrecomillarlas basta para que FTS5 no las lea como operadores
+    consulta = ' AND '.join(f'busqueda : "{palabra}"*' for palabra in palabras)
+    if empresa_id is not None:
+        consulta = f'empresa : "{empresa_id}" AND {consulta}'
+    return RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s ORDER BY rank LIMIT %s', [consulta, limite])
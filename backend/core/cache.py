@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core import checks
+from django.core.management import call_command
+
+# La ventana de escritura de core.replicas y las alertas de series en caché
+# solo son correctas si todos los procesos de la aplicación ven la misma
+# caché: con una caché local, lo que un proceso marca o invalida no llega a
+# los demás. Con un backend local esas funciones se desactivan (las lecturas
+# van al primario y las alertas se calculan siempre) y el check lo advierte.
+
+BACKENDS_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_compartida(alias='default'):
+    """True si la caché ``alias`` es visible para todos los procesos"""
+    configuracion = settings.CACHES.get(alias)
+    return configuracion is not None and configuracion.get('BACKEND') not in BACKENDS_LOCALES
+
+
+def crear_tablas_cache(using='default', **kwargs):
+    """Receptor de post_migrate: crea la tabla de DatabaseCache si falta"""
+    call_command('createcachetable', database=using, verbosity=0)
+
+
+@checks.register(checks.Tags.caches)
+def revisar_cache_compartida(app_configs, **kwargs):
+    if cache_compartida():
+        return []
+    return [checks.Warning(
+        'La caché por defecto es local al proceso.',
+        hint=(
+            'Configure REDIS_URL o la caché en base de datos de settings.CACHES; mientras tanto las '
+            'lecturas no usan la réplica y las alertas de series no se guardan en caché.'
+        ),
+        id='core.W001',
+    )]
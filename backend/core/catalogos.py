@@ -0,0 +1,40 @@
+import hashlib
+from django.db.models import Count, Max
+from .models import Eliminacion
+from .sincronizacion import registrar_tombstone
+
+# Las eliminaciones no dejan rastro en MAX(fecha_actualizacion) ni siempre en
+# la cantidad de filas; se toman de los tombstones de Eliminacion, que son
+# los mismos para todos los procesos y sobreviven a un reinicio
+
+
+def version_catalogo(modelo, usuario, campo_actualizacion='fecha_actualizacion'):
+    """
+    Resumen compacto del catálogo que ve el usuario: cantidad de filas,
+    última modificación (incluida la última eliminación) y una versión
+    derivada de ambas y del último tombstone. El cliente conserva su copia
+    mientras la versión no cambie. Son dos consultas de agregación.
+    """
+    resumen = modelo.objects.del_usuario(usuario).order_by().aggregate(
+        total=Count('id'), actualizado=Max(campo_actualizacion),
+    )
+    # El id del último tombstone solo crece, incluso después de purgar los antiguos
+    eliminaciones = Eliminacion.objects.del_usuario(usuario).filter(
+        modelo=modelo._meta.label_lower,
+    ).order_by().aggregate(ultima=Max('id'), eliminado=Max('fecha_eliminacion'))
+
+    actualizado = max(filter(None, [resumen['actualizado'], eliminaciones['eliminado']]), default=None)
+    firma = f"{resumen['total']}:{actualizado.isoformat() if actualizado else None}:{eliminaciones['ultima']}"
+    return {
+        'version': hashlib.sha256(firma.encode('utf-8')).hexdigest()[:16],
+        'total': resumen['total'],
+        'actualizado': actualizado,
+    }
+
+
+def registrar_eliminacion(sender, instance, **kwargs):
+    """
+    Receptor de post_delete para los modelos de catálogo y de documentos:
+    el tombstone cambia su versión y lo entrega la sincronización incremental
+    """
+    registrar_tombstone(sender, instance)
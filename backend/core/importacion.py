@@ -0,0 +1,218 @@
+import codecs
+import csv
+import itertools
+import zipfile
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+try:
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:  # XLSX es opcional; CSV funciona sin dependencias
+    openpyxl = None
+
+# Importación masiva de catálogos desde CSV o XLSX. Las filas se leen del
+# archivo a medida que se procesan y se validan con las reglas del serializer
+# del catálogo en bloques de TAMANO_BLOQUE; cada bloque válido se inserta o
+# actualiza con un solo INSERT ... ON CONFLICT sobre la clave única del
+# modelo, así que la memoria depende del bloque y no del archivo.
+
+FORMATOS = ('csv', 'xlsx')
+# Cada bloque también consulta sus claves con un IN, y SQLite < 3.32 admite hasta 999 parámetros
+TAMANO_BLOQUE = 500
+# El informe detalla solo los primeros errores; el resto solo se cuenta
+MAXIMO_ERRORES = 1000
+
+
+def formato_de(nombre):
+    formato = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if formato not in FORMATOS:
+        raise ValidationError({'archivo': 'El archivo debe ser CSV o XLSX'})
+    return formato
+
+
+class FilasArchivo:
+    """
+    Iterador de ``(número de fila, {columna: valor})`` de un archivo.
+    ``columnas`` son las del encabezado y se conocen desde la primera fila.
+    """
+
+    def __init__(self, filas, columnas):
+        self._filas = filas
+        self.columnas = columnas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._filas)
+
+
+def leer_filas(archivo, formato):
+    """
+    Devuelve las filas del archivo binario (``FilasArchivo``) sin cargarlo
+    completo. La fila 1 es el encabezado; las columnas se comparan en
+    minúsculas y las celdas vacías se omiten, como si no se hubieran enviado.
+    """
+    columnas = set()
+    if formato == 'xlsx':
+        return FilasArchivo(_filas_xlsx(archivo, columnas), columnas)
+    return FilasArchivo(_filas_csv(archivo, columnas), columnas)
+
+
+def importar_filas(filas, serializer_class, empresa_id):
+    """
+    Valida las filas con ``serializer_class`` y las guarda en la empresa,
+    insertando las claves nuevas y actualizando las existentes según
+    ``serializer_class.clave``. En las existentes solo se actualizan las
+    columnas del encabezado, así que un archivo sin una columna opcional no
+    la borra. Cada bloque se guarda en su propia transacción; las filas con
+    errores se omiten y se reportan.
+
+    Si el archivo resulta ilegible a la mitad, lo ya guardado se conserva y
+    el informe lo indica en ``error_archivo`` con la fila donde se detuvo;
+    si falla antes de la primera fila, el error se propaga.
+    """
+    if empresa_id is None:
+        raise ValueError('La importación necesita la empresa de destino')
+    modelo = serializer_class.Meta.model
+    clave = serializer_class.clave
+    # Una sola instancia: los campos se construyen una vez para todo el archivo
+    validador = serializer_class()
+    campos = [nombre for nombre, campo in validador.fields.items() if not campo.read_only]
+
+    informe = {'creados': 0, 'actualizados': 0, 'con_errores': 0, 'errores': []}
+    ultima = 1
+    while True:
+        bloque = []
+        interrupcion = None
+        try:
+            for numero, fila in itertools.islice(filas, TAMANO_BLOQUE):
+                bloque.append((numero, fila))
+                ultima = numero
+        except ValidationError as error:
+            if ultima == 1:
+                raise
+            interrupcion = error
+
+        validas = {}
+        for numero, fila in bloque:
+            try:
+                datos = validador.run_validation(fila)
+            except ValidationError as error:
+                _agregar_error(informe, numero, error.detail)
+                continue
+            # Si la clave se repite en el bloque, vale la última fila
+            validas[datos[clave]] = (numero, datos)
+        if validas:
+            actualizables = [
+                campo for campo in campos if campo != clave and campo in filas.columnas
+            ] + ['busqueda', 'fecha_actualizacion']
+            _guardar_bloque(modelo, clave, actualizables, validas, empresa_id, informe)
+
+        if interrupcion is not None:
+            informe['error_archivo'] = {'fila': ultima + 1, 'errores': interrupcion.detail}
+            return informe
+        if len(bloque) < TAMANO_BLOQUE:
+            return informe
+
+
+def _guardar_bloque(modelo, clave, actualizables, validas, empresa_id, informe):
+    with transaction.atomic():
+        # Las filas existentes quedan bloqueadas hasta el final del bloque
+        existentes = dict(
+            modelo.objects.select_for_update().filter(**{f'{clave}__in': list(validas)})
+            .values_list(clave, 'id_empresa_id')
+        )
+        # La clave es única en toda la tabla: no se toca la fila de otra empresa
+        ajenas = {valor for valor, empresa in existentes.items() if empresa != empresa_id}
+        while True:
+            propias = [valor for valor in validas if valor not in ajenas]
+            punto = transaction.savepoint()
+            modelo.objects.bulk_create(
+                [_construir(modelo, validas[valor][1], empresa_id) for valor in propias],
+                update_conflicts=True, unique_fields=[clave], update_fields=actualizables,
+            )
+            # ON CONFLICT no puede limitarse a la empresa: si otra insertó una
+            # de las claves después de la consulta, el upsert la actualizó y se
+            # deshace para repetirlo sin ella
+            robadas = set(
+                modelo.objects.filter(**{f'{clave}__in': propias}).exclude(id_empresa_id=empresa_id)
+                .values_list(clave, flat=True)
+            )
+            if not robadas:
+                transaction.savepoint_commit(punto)
+                break
+            transaction.savepoint_rollback(punto)
+            ajenas |= robadas
+
+    for valor, (numero, datos) in validas.items():
+        if valor in ajenas:
+            _agregar_error(informe, numero, {clave: [f'Ya existe un {modelo._meta.verbose_name} con este valor en otra empresa']})
+        else:
+            informe['actualizados' if valor in existentes else 'creados'] += 1
+
+
+def _construir(modelo, datos, empresa_id):
+    objeto = modelo(**datos, id_empresa_id=empresa_id)
+    # bulk_create no llama a save(), así que la columna busqueda se arma aquí
+    objeto.busqueda = objeto.calcular_busqueda()
+    return objeto
+
+
+def _agregar_error(informe, numero, detalle):
+    informe['con_errores'] += 1
+    if len(informe['errores']) < MAXIMO_ERRORES:
+        informe['errores'].append({'fila': numero, 'errores': detalle})
+
+
+def _filas_csv(archivo, columnas):
+    lineas = codecs.iterdecode(archivo, 'utf-8-sig')
+    try:
+        primera = next(lineas, '')
+        try:
+            # Excel en español exporta con punto y coma
+            dialecto = csv.Sniffer().sniff(primera, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        yield from _con_encabezado(csv.reader(itertools.chain([primera], lineas), dialecto), columnas)
+    except UnicodeDecodeError:
+        raise ValidationError({'archivo': 'El CSV debe estar codificado en UTF-8'})
+    except csv.Error as error:
+        raise ValidationError({'archivo': f'CSV inválido: {error}'})
+
+
+def _filas_xlsx(archivo, columnas):
+    if openpyxl is None:
+        raise ValidationError({'archivo': 'Para importar archivos XLSX el servidor necesita openpyxl'})
+    try:
+        # read_only recorre la hoja sin construirla en memoria
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError):
+        raise ValidationError({'archivo': 'XLSX inválido'})
+    try:
+        yield from _con_encabezado(libro.active.iter_rows(values_only=True), columnas)
+    finally:
+        libro.close()
+
+
+def _con_encabezado(filas, columnas):
+    encabezado = [str(columna).strip().lower() if columna is not None else '' for columna in next(filas, ())]
+    columnas.update(columna for columna in encabezado if columna)
+    for numero, fila in enumerate(filas, start=2):
+        valores = {}
+        for columna, valor in zip(encabezado, fila):
+            valor = _valor(valor)
+            if columna and valor not in (None, ''):
+                valores[columna] = valor
+        if valores:
+            yield numero, valores
+
+
+def _valor(valor):
+    if isinstance(valor, str):
+        return valor.strip()
+    # Las celdas numéricas de Excel llegan como float: 1001.0 es el código o documento 1001
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
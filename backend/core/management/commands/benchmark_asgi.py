@@ -0,0 +1,104 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de un endpoint de lectura servido por un pool de hilos (WSGI) '
+        'contra su versión asíncrona (ASGI) con la misma carga y clientes lentos simulados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuario con cuya empresa se hacen las peticiones')
+        parser.add_argument('--sync-url', default='/api/facturas/')
+        parser.add_argument('--async-url', default='/api/async/facturas/')
+        parser.add_argument('--peticiones', type=int, default=200)
+        parser.add_argument('--concurrencia', type=int, default=50, help='Clientes simultáneos')
+        parser.add_argument('--hilos', type=int, default=4, help='Hilos del servidor WSGI')
+        parser.add_argument(
+            '--latencia-ms', type=int, default=50,
+            help='Tiempo que cada cliente tarda en recibir la respuesta; bajo WSGI retiene el hilo',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        token = str(AccessToken.for_user(usuario))
+        latencia = options['latencia_ms'] / 1000
+
+        # El cliente de pruebas usa el host "testserver", que solo se admite así
+        setup_test_environment()
+        try:
+            wsgi = self.medir_wsgi(options['sync_url'], token, options['peticiones'], options['hilos'], latencia)
+            asgi = asyncio.run(self.medir_asgi(
+                options['async_url'], token, options['peticiones'], options['concurrencia'], latencia
+            ))
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'modo':<22}{'peticiones':>11}{'segundos':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        self.reportar(f"WSGI ({options['hilos']} hilos)", wsgi)
+        self.reportar(f"ASGI ({options['concurrencia']} clientes)", asgi)
+
+    def medir_wsgi(self, url, token, peticiones, hilos, latencia):
+        locales = threading.local()
+
+        def peticion(_):
+            if not hasattr(locales, 'cliente'):
+                locales.cliente = Client()
+                locales.cliente.cookies['access_token'] = token
+            inicio = time.perf_counter()
+            response = locales.cliente.get(url)
+            # Un cliente lento mantiene ocupado el hilo hasta terminar de recibir
+            time.sleep(latencia)
+            self.verificar(url, response)
+            return time.perf_counter() - inicio
+
+        def cerrar_conexiones():
+            connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(hilos) as pool:
+            tiempos = list(pool.map(peticion, range(peticiones)))
+            pool.map(lambda _: cerrar_conexiones(), range(hilos))
+        return tiempos, time.perf_counter() - inicio
+
+    async def medir_asgi(self, url, token, peticiones, concurrencia, latencia):
+        cliente = AsyncClient()
+        cliente.cookies['access_token'] = token
+        semaforo = asyncio.Semaphore(concurrencia)
+
+        async def peticion():
+            async with semaforo:
+                inicio = time.perf_counter()
+                response = await cliente.get(url)
+                await asyncio.sleep(latencia)
+                self.verificar(url, response)
+                return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        tiempos = await asyncio.gather(*(peticion() for _ in range(peticiones)))
+        return tiempos, time.perf_counter() - inicio
+
+    def verificar(self, url, response):
+        if response.status_code != 200:
+            raise CommandError(f'{url} respondió {response.status_code}: {response.content[:200]!r}')
+
+    def reportar(self, modo, resultado):
+        tiempos, total = resultado
+        cuantiles = statistics.quantiles(tiempos, n=20)
+        self.stdout.write(
+            f'{modo:<22}{len(tiempos):>11}{total:>10.2f}{len(tiempos) / total:>9.1f}'
+            f'{cuantiles[9] * 1000:>9.1f}{cuantiles[18] * 1000:>9.1f}'
+        )
@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import Usuario
+from clientes.models import Cliente
+from core.busqueda import compactar, texto_busqueda
+from productos.models import Producto
+
+NOMBRES = ['José', 'María', 'Ramón', 'Íñigo', 'Altagracia', 'Juan', 'Ana', 'Pedro', 'Lucía', 'Andrés', 'Rosa', 'Félix']
+APELLIDOS = ['Núñez', 'Peña', 'Pérez', 'Almánzar', 'Rodríguez', 'De la Cruz', 'Martínez', 'Báez', 'Santana', 'Reyes']
+ARTICULOS = ['Cable', 'Cámara', 'Tornillo', 'Válvula', 'Batería', 'Bombillo', 'Tubería', 'Martillo', 'Pintura', 'Cerámica']
+DETALLES = ['eléctrico', 'galvanizado', 'acrílica', 'de seguridad', 'industrial', 'pequeño', 'grande', 'mate', 'PVC']
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia de /api/clientes/search/ y /api/productos/search/ con un catálogo '
+        'sintético en la empresa del usuario. Los datos se crean en una transacción que se '
+        'revierte al terminar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuario con cuya empresa se hacen las búsquedas')
+        parser.add_argument('--filas', type=int, default=200000, help='Clientes y productos a crear de cada uno')
+        parser.add_argument('--consultas', type=int, default=1000)
+        parser.add_argument('--limite', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        if not usuario.empresa_id:
+            raise CommandError('El usuario debe pertenecer a una empresa')
+        azar = random.Random(options['semilla'])
+
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Creando {options['filas']} clientes y {options['filas']} productos...")
+                self.crear_catalogo(usuario.empresa_id, options['filas'], azar)
+
+                cliente = Client()
+                cliente.cookies['access_token'] = str(AccessToken.for_user(usuario))
+                self.stdout.write(f"{'endpoint':<26}{'consultas':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+                for url, palabras in (
+                    ('/api/clientes/search/', NOMBRES + APELLIDOS),
+                    ('/api/productos/search/', ARTICULOS + DETALLES),
+                ):
+                    tiempos = self.medir(cliente, url, palabras, options['consultas'], options['limite'], azar)
+                    self.reportar(url, tiempos)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def crear_catalogo(self, empresa_id, filas, azar):
+        # bulk_create no llama a save(), así que la columna busqueda se arma aquí
+        base = (Cliente.objects.aggregate(maximo=Max('numero_documento'))['maximo'] or 0) + 1
+        clientes = []
+        for n in range(filas):
+            nombre = f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}'
+            clientes.append(Cliente(
+                nombre=nombre, tipo_documento='1', numero_documento=base + n, tipo_ncf=1,
+                id_empresa_id=empresa_id, busqueda=texto_busqueda(nombre, base + n),
+            ))
+        Cliente.objects.bulk_create(clientes, batch_size=5000)
+
+        prefijo = f'BENCH{base}'
+        productos = []
+        for n in range(filas):
+            codigo = f'{prefijo}-{n:06d}'
+            nombre = f'{azar.choice(ARTICULOS)} {azar.choice(DETALLES)}'
+            productos.append(Producto(
+                codigo=codigo, nombre=nombre, descripcion='', precio_compra=Decimal('1.00'),
+                precio_venta=Decimal('2.00'), id_empresa_id=empresa_id,
+                busqueda=texto_busqueda(codigo, compactar(codigo), nombre),
+            ))
+        Producto.objects.bulk_create(productos, batch_size=5000)
+
+    def medir(self, cliente, url, palabras, consultas, limite, azar):
+        tiempos = []
+        for _ in range(consultas):
+            # Lo que escribe alguien en un selector: una o dos palabras a medias
+            termino = ' '.join(
+                palabra[:azar.randint(1, len(palabra))] for palabra in azar.sample(palabras, azar.randint(1, 2))
+            )
+            inicio = time.perf_counter()
+            response = cliente.get(url, {'q': termino, 'limit': limite})
+            tiempos.append(time.perf_counter() - inicio)
+            if response.status_code != 200:
+                raise CommandError(f'{url} respondió {response.status_code}: {response.content[:200]!r}')
+        return tiempos
+
+    def reportar(self, url, tiempos):
+        cuantiles = statistics.quantiles(tiempos, n=100)
+        self.stdout.write(
+            f'{url:<26}{len(tiempos):>10}{cuantiles[49] * 1000:>9.1f}'
+            f'{cuantiles[94] * 1000:>9.1f}{cuantiles[98] * 1000:>9.1f}'
+        )
@@ -0,0 +1,31 @@
+import sqlite3
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la base SQLite principal sobre el archivo de la réplica de lectura (DB_LECTURA), '
+        'para probar el enrutamiento de lecturas con dos archivos'
+    )
+
+    def handle(self, *args, **options):
+        alias = settings.DB_LECTURA
+        if not alias or alias not in connections:
+            raise CommandError('No hay un alias de lectura configurado en DB_LECTURA')
+        primario, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primario.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Solo para SQLite; en PostgreSQL la réplica se mantiene con la replicación del servidor')
+        origen, destino = str(primario.settings_dict['NAME']), str(replica.settings_dict['NAME'])
+        if origen == destino:
+            raise CommandError('La réplica usa el mismo archivo que default; defina DB_LECTURA con la ruta de la copia')
+
+        primario.ensure_connection()
+        copia = sqlite3.connect(destino)
+        try:
+            # La API de respaldo de SQLite copia una instantánea consistente aunque haya escrituras
+            primario.connection.backup(copia)
+        finally:
+            copia.close()
+        self.stdout.write(f'{origen} copiado a {destino}')
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from clientes.serializers import ClienteImportacionSerializer
+from config.models import Empresa
+from core.importacion import FORMATOS, formato_de, importar_filas, leer_filas
+from productos.serializers import ProductoImportacionSerializer
+
+CATALOGOS = {
+    'clientes': ClienteImportacionSerializer,
+    'productos': ProductoImportacionSerializer,
+}
+# Errores que se muestran en la consola; el resto solo se cuenta
+ERRORES_MOSTRADOS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa clientes o productos desde un CSV o XLSX a una empresa, insertando los nuevos '
+        'y actualizando los existentes por numero_documento o codigo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalogo', choices=CATALOGOS)
+        parser.add_argument('archivo', help='Archivo CSV (UTF-8) o XLSX con encabezado en la primera fila')
+        parser.add_argument('empresa', type=int, help='ID de la empresa')
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto, según la extensión del archivo')
+
+    def handle(self, *args, **options):
+        if not Empresa.objects.filter(pk=options['empresa']).exists():
+            raise CommandError(f"No existe la empresa {options['empresa']}")
+        inicio = time.perf_counter()
+        try:
+            formato = options['formato'] or formato_de(options['archivo'])
+            with open(options['archivo'], 'rb') as archivo:
+                informe = importar_filas(
+                    leer_filas(archivo, formato), CATALOGOS[options['catalogo']], options['empresa'],
+                )
+        except OSError as error:
+            raise CommandError(str(error))
+        except ValidationError as error:
+            raise CommandError(str(error.detail.get('archivo', error.detail)))
+
+        for error in informe['errores'][:ERRORES_MOSTRADOS]:
+            self.stderr.write(f"Fila {error['fila']}: {_mensajes(error['errores'])}")
+        if 'error_archivo' in informe:
+            error = informe['error_archivo']
+            self.stderr.write(f"Lectura detenida en la fila {error['fila']}: {_mensajes(error['errores'])}")
+        self.stdout.write(
+            f"{informe['creados']} creados, {informe['actualizados']} actualizados, "
+            f"{informe['con_errores']} con errores en {time.perf_counter() - inicio:.1f} s"
+        )
+
+
+def _mensajes(detalle):
+    if isinstance(detalle, dict):
+        return '; '.join(f'{campo}: {_mensajes(errores)}' for campo, errores in detalle.items())
+    if isinstance(detalle, list):
+        return ' '.join(str(error) for error in detalle)
+    return str(detalle)
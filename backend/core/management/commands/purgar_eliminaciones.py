@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Eliminacion
+from core.sincronizacion import RETENCION
+
+
+class Command(BaseCommand):
+    help = 'Elimina los tombstones más antiguos que la retención de la sincronización incremental'
+
+    def handle(self, *args, **options):
+        eliminados, _ = Eliminacion.objects.filter(fecha_eliminacion__lt=timezone.now() - RETENCION).delete()
+        self.stdout.write(f'{eliminados} tombstones purgados')
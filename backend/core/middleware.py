@@ -1,21 +1,45 @@
-from threading import local
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
-_user = local()
+# Un ContextVar, a diferencia de threading.local, es propio de cada petición
+# también bajo ASGI, donde varias corutinas comparten el mismo hilo
+_request = ContextVar('request_actual', default=None)
 
 
 class CurrentUserMiddleware:
-    """Middleware para almacenar el usuario actual en threading local"""
-    
+    """Middleware para almacenar la petición actual en el contexto de ejecución"""
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _user.value = getattr(request, 'user', None)
-        response = self.get_response(request)
-        return response
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Se guarda la petición y no request.user: DRF autentica el JWT dentro de
+        # la vista y reemplaza request.user después de que corre este middleware
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
 
 
 def get_current_user():
     """Obtiene el usuario actual del contexto"""
-    return getattr(_user, 'value', None)
+    return getattr(_request.get(), 'user', None)
+
 
+def get_current_request():
+    """Obtiene la petición actual del contexto, o None fuera de una petición"""
+    return _request.get()
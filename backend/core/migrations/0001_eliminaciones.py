@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100)),
+                ('objeto_id', models.BigIntegerField()),
+                ('fecha_eliminacion', models.DateTimeField(auto_now_add=True)),
+                ('id_empresa', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='config.empresa')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['id_empresa', 'modelo', 'fecha_eliminacion'], name='eliminacion_emp_modelo_idx'), models.Index(fields=['fecha_eliminacion'], name='eliminacion_fecha_idx')],
+            },
+        ),
+    ]
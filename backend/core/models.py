@@ -1,3 +1,54 @@
 from django.db import models
 
-# Create your models here.
+
+class EmpresaQuerySet(models.QuerySet):
+    """QuerySet de los modelos de negocio que pertenecen a una empresa"""
+
+    def de_empresa(self, empresa_id):
+        """Filtra por empresa; sin empresa no devuelve nada"""
+        if empresa_id is None:
+            return self.none()
+        return self.filter(id_empresa_id=empresa_id)
+
+    def del_usuario(self, user):
+        """
+        Filtra por la empresa del usuario indicado. Solo un superusuario sin
+        empresa ve todas las filas; un anónimo o un usuario sin empresa, ninguna.
+        """
+        empresa_id = getattr(user, 'empresa_id', None)
+        if empresa_id is None and getattr(user, 'is_superuser', False):
+            return self
+        return self.de_empresa(empresa_id)
+
+
+class EmpresaManager(models.Manager.from_queryset(EmpresaQuerySet)):
+    """
+    Manager por defecto de los modelos con ``id_empresa``. No filtra por sí
+    solo para que el admin, las migraciones y los procesos internos vean
+    todas las filas; los viewsets lo restringen con ``EmpresaViewSetMixin``.
+    """
+
+
+class Eliminacion(models.Model):
+    """
+    Registro compacto de filas eliminadas, para que la sincronización
+    incremental entregue sus ids como tombstones. Las filas más antiguas
+    que la retención se purgan con ``purgar_eliminaciones``.
+    """
+    # Sin restricción de llave foránea: al eliminar una empresa en cascada
+    # se registran sus filas antes de que desaparezca la propia empresa
+    id_empresa = models.ForeignKey(
+        'config.Empresa', on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', null=True, blank=True,
+    )
+    modelo = models.CharField(max_length=100)
+    objeto_id = models.BigIntegerField()
+    fecha_eliminacion = models.DateTimeField(auto_now_add=True)
+
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'modelo', 'fecha_eliminacion'], name='eliminacion_emp_modelo_idx'),
+            models.Index(fields=['fecha_eliminacion'], name='eliminacion_fecha_idx'),
+        ]
@@ -0,0 +1,132 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre una clave de orden compuesta.
+
+    El cursor guarda los valores de la última fila entregada, y la siguiente
+    página se obtiene con un filtro ``WHERE (a, b) < (x, y)`` en lugar de un
+    OFFSET, por lo que el costo de cada página es el mismo sin importar qué
+    tan profundo se navegue. El último campo de ``ordering`` debe ser único.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._recortar(list(self._consulta_pagina(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Igual que ``paginate_queryset`` pero con el ORM asíncrono"""
+        return self._recortar([fila async for fila in self._consulta_pagina(queryset, request)])
+
+    def _consulta_pagina(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        posicion = self.decode_cursor(request, queryset.model)
+        if posicion is not None:
+            queryset = queryset.filter(self._filtro_siguiente(posicion))
+
+        # Se pide una fila extra para saber si existe una página siguiente
+        return queryset[:self.page_size + 1]
+
+    def _recortar(self, filas):
+        self.has_next = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        self.ultima_fila = filas[-1] if filas else None
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or self.ultima_fila is None:
+            return None
+        valores = [
+            self._serializar_valor(getattr(self.ultima_fila, campo.lstrip('-')))
+            for campo in self.ordering
+        ]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(valores))
+
+    def encode_cursor(self, valores):
+        contenido = json.dumps(valores, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(contenido).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(valores, list) or len(valores) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(self.ordering, valores)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _filtro_siguiente(self, posicion):
+        """
+        Construye la comparación lexicográfica ``(a, b, c) > (x, y, z)`` como
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``, con el
+        sentido de cada comparación según el orden del campo.
+        """
+        filtro = Q()
+        iguales = {}
+        for campo, valor in zip(self.ordering, posicion):
+            nombre = campo.lstrip('-')
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            filtro |= Q(**iguales, **{f'{nombre}__{lookup}': valor})
+            iguales[nombre] = valor
+
+        # Acota el primer campo para que el planificador use el índice como rango
+        primero = self.ordering[0]
+        limite = 'lte' if primero.startswith('-') else 'gte'
+        return Q(**{f'{primero.lstrip("-")}__{limite}': posicion[0]}) & filtro
+
+    @staticmethod
+    def _serializar_valor(valor):
+        if hasattr(valor, 'isoformat'):
+            return valor.isoformat()
+        if valor is not None and not isinstance(valor, (int, float, str, bool)):
+            return str(valor)
+        return valor
@@ -0,0 +1,302 @@
+import functools
+import hashlib
+import unicodedata
+import zlib
+
+# Generador de PDF de facturas y cotizaciones sin dependencias externas. Usa
+# las fuentes estándar Helvetica del visor (no se incrustan) y no importa
+# Django: las funciones de este módulo corren también en los procesos del
+# pool de facturas.pdf, que solo reciben datos ya formateados como texto.
+
+ANCHO, ALTO = 595.28, 841.89  # A4 en puntos
+MARGEN = 50
+DERECHA = ANCHO - MARGEN
+
+# Colores de pdfGenerator.js del frontend
+PRIMARIO = '#059669'
+TEXTO = '#334155'
+CLARO = '#f0fdf4'
+BORDE = '#d1d5db'
+BLANCO = '#ffffff'
+
+# Caja del logo y columnas de la tabla de líneas (x inicial, x final)
+LOGO = (MARGEN, 40, 160, 80)
+COLUMNAS = ((MARGEN, 300), (300, 370), (370, 460), (460, DERECHA))
+ENCABEZADOS = ('Concepto', 'Cantidad', 'Precio Unit.', 'Total')
+ALTO_ENCABEZADO = 20
+ALTO_FILA = 18
+INICIO_TABLA = 270
+INICIO_TABLA_CONTINUACION = 60
+FIN_TABLA = ALTO - 60
+ALTO_TOTALES = 90
+
+# Anchos AFM de Helvetica y Helvetica-Bold para los caracteres 32 a 126
+_ANCHOS = {
+    False: (
+        '278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 '
+        '556 556 278 278 584 584 584 556 1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 '
+        '667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556 333 556 556 500 556 556 278 556 '
+        '556 222 222 500 222 833 556 556 556 556 333 500 278 556 500 722 500 500 500 334 260 334 584'
+    ),
+    True: (
+        '278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 556 556 556 556 556 556 556 556 '
+        '556 556 333 333 584 584 584 611 975 722 722 722 722 667 611 778 722 278 556 722 611 833 722 778 '
+        '667 778 722 667 611 722 667 944 667 667 611 333 278 333 584 556 333 556 611 556 611 556 333 611 '
+        '611 278 278 556 278 889 611 611 611 611 389 556 333 611 556 778 556 556 500 389 280 389 584'
+    ),
+}
+_ANCHOS = {negrita: dict(zip(map(chr, range(32, 127)), map(int, valores.split())))
+           for negrita, valores in _ANCHOS.items()}
+
+
+@functools.lru_cache(maxsize=1024)
+def _ancho_caracter(caracter, negrita):
+    anchos = _ANCHOS[negrita]
+    # Las letras acentuadas miden lo mismo que su letra base
+    return anchos.get(caracter) or anchos.get(unicodedata.normalize('NFD', caracter)[0], 556)
+
+
+def ancho_texto(texto, tamano, negrita=False):
+    return sum(_ancho_caracter(caracter, negrita) for caracter in texto) * tamano / 1000
+
+
+def recortar(texto, ancho, tamano, negrita=False):
+    """Recorta el texto con '...' para que quepa en el ancho dado"""
+    if ancho_texto(texto, tamano, negrita) <= ancho:
+        return texto
+    disponible = ancho * 1000 / tamano - 3 * _ancho_caracter('.', negrita)
+    usado = 0
+    for posicion, caracter in enumerate(texto):
+        usado += _ancho_caracter(caracter, negrita)
+        if usado > disponible:
+            return texto[:posicion].rstrip() + '...'
+    return texto
+
+
+def _rgb(color):
+    return ' '.join(f'{int(color[i:i + 2], 16) / 255:.3f}' for i in (1, 3, 5))
+
+
+def _cadena(texto):
+    texto = ' '.join(str(texto).split())
+    datos = texto.encode('cp1252', errors='replace')
+    return b'(' + datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class Lienzo:
+    """Operadores de contenido de una página, con ``y`` medida desde el borde superior"""
+
+    def __init__(self):
+        self.partes = []
+
+    def texto(self, x, y, texto, tamano=10, negrita=False, color=TEXTO, alinear='izquierda'):
+        texto = str(texto)
+        if alinear == 'derecha':
+            x -= ancho_texto(texto, tamano, negrita)
+        elif alinear == 'centro':
+            x -= ancho_texto(texto, tamano, negrita) / 2
+        fuente = 'F2' if negrita else 'F1'
+        self.partes.append(
+            b'BT %s rg /%s %g Tf %.2f %.2f Td %s Tj ET' % (
+                _rgb(color).encode(), fuente.encode(), tamano, x, ALTO - y, _cadena(texto)
+            )
+        )
+
+    def rectangulo(self, x, y, ancho, alto, relleno=None, borde=None):
+        operador = b'B' if relleno and borde else b'f' if relleno else b'S'
+        colores = (b'%s rg ' % _rgb(relleno).encode() if relleno else b'') + \
+                  (b'%s RG ' % _rgb(borde).encode() if borde else b'')
+        self.partes.append(b'%s%.2f %.2f %.2f %.2f re %s' % (colores, x, ALTO - y - alto, ancho, alto, operador))
+
+    def linea(self, x1, y1, x2, y2, color=BORDE):
+        self.partes.append(b'%s RG %.2f %.2f m %.2f %.2f l S' % (_rgb(color).encode(), x1, ALTO - y1, x2, ALTO - y2))
+
+    def imagen(self, nombre, x, y, ancho, alto):
+        self.partes.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q' % (ancho, alto, x, ALTO - y - alto, nombre.encode()))
+
+    def contenido(self):
+        # Cada flujo deja el estado gráfico como lo encontró
+        return b'q 0.8 w\n' + b'\n'.join(self.partes) + b'\nQ\n'
+
+
+class Plantilla:
+    """
+    Partes fijas del documento de una empresa, compiladas una sola vez: la
+    cabecera de la primera página (logo, título, datos de la empresa y
+    encabezado de la tabla) y la de las páginas siguientes quedan como
+    flujos ya comprimidos que cada PDF incluye tal cual, así que por
+    documento solo se dibujan los datos variables.
+
+    ``empresa`` tiene nombre, rnc, telefono y direccion; ``logo`` es
+    ``(jpeg, ancho, alto)`` ya escalado o None. Es picklable para enviarla
+    a los procesos del pool.
+    """
+
+    def __init__(self, titulo, empresa, logo=None, con_ncf=False):
+        self.titulo = titulo
+        self.con_ncf = con_ncf
+        self.logo = logo
+        self.cabecera = zlib.compress(self._cabecera(empresa).contenido())
+        self.continuacion = zlib.compress(self._encabezado_tabla(Lienzo(), INICIO_TABLA_CONTINUACION).contenido())
+        huella = hashlib.sha256(self.cabecera + self.continuacion)
+        if logo:
+            huella.update(logo[0])
+        self.huella = huella.hexdigest()
+
+    def _cabecera(self, empresa):
+        lienzo = Lienzo()
+        x, y, ancho, alto = LOGO
+        if self.logo:
+            # Se ajusta a la caja conservando la proporción
+            escala = min(ancho / self.logo[1], alto / self.logo[2])
+            lienzo.imagen('Im1', x, y, self.logo[1] * escala, self.logo[2] * escala)
+        else:
+            lienzo.rectangulo(x, y, ancho, alto, borde=BORDE)
+            lienzo.texto(x + ancho / 2, y + alto / 2 + 4, 'LOGO', alinear='centro')
+
+        lienzo.texto(DERECHA, 60, self.titulo, tamano=18, negrita=True, color=PRIMARIO, alinear='derecha')
+
+        lienzo.texto(310, 160, 'DATOS DE LA EMPRESA', tamano=11, negrita=True)
+        lienzo.texto(MARGEN, 160, 'DATOS DEL CLIENTE', tamano=11, negrita=True)
+        for fila, (etiqueta, valor) in enumerate((
+            ('Nombre', empresa.get('nombre')), ('Dirección', empresa.get('direccion')),
+            ('RNC', empresa.get('rnc')), ('Teléfono', empresa.get('telefono')),
+        )):
+            lienzo.texto(310, 178 + 14 * fila, recortar(f'{etiqueta}: {valor or "N/A"}', DERECHA - 310, 9), tamano=9)
+        return self._encabezado_tabla(lienzo, INICIO_TABLA)
+
+    def _encabezado_tabla(self, lienzo, y):
+        lienzo.rectangulo(MARGEN, y, DERECHA - MARGEN, ALTO_ENCABEZADO, relleno=PRIMARIO)
+        for (inicio, fin), encabezado in zip(COLUMNAS, ENCABEZADOS):
+            if inicio == MARGEN:
+                lienzo.texto(inicio + 4, y + 14, encabezado, negrita=True, color=BLANCO)
+            else:
+                lienzo.texto(fin - 4, y + 14, encabezado, negrita=True, color=BLANCO, alinear='derecha')
+        return lienzo
+
+
+def paginar(lineas):
+    """Reparte las líneas en páginas dejando lugar para los totales en la última"""
+    paginas, inicio = [], INICIO_TABLA + ALTO_ENCABEZADO
+    while True:
+        caben = int((FIN_TABLA - inicio) // ALTO_FILA)
+        caben_con_totales = int((FIN_TABLA - ALTO_TOTALES - inicio) // ALTO_FILA)
+        if len(lineas) <= caben_con_totales:
+            paginas.append(lineas)
+            return paginas
+        paginas.append(lineas[:caben])
+        lineas = lineas[caben:]
+        inicio = INICIO_TABLA_CONTINUACION + ALTO_ENCABEZADO
+
+
+def renderizar(plantilla, documento):
+    """
+    PDF de un documento. ``documento`` tiene numero, fecha, vencimiento,
+    ncf, cliente (nombre, documento, direccion, telefono), lineas
+    ``[concepto, cantidad, precio, subtotal]``, subtotal, tasa_itbis, itbis
+    y total, todos como texto ya formateado.
+    """
+    paginas = paginar(documento['lineas'])
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Pages, cuando se conocen las páginas
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        _flujo(plantilla.cabecera),
+        _flujo(plantilla.continuacion),
+    ]
+    recursos = b'/Font << /F1 3 0 R /F2 4 0 R >>'
+    if plantilla.logo:
+        jpeg, ancho, alto = plantilla.logo
+        objetos.append(
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+            b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n%s\nendstream' % (ancho, alto, len(jpeg), jpeg)
+        )
+        recursos += b' /XObject << /Im1 %d 0 R >>' % len(objetos)
+
+    hojas = []
+    for numero, lineas in enumerate(paginas, 1):
+        lienzo = Lienzo()
+        if numero == 1:
+            _datos(lienzo, plantilla, documento)
+        inicio = (INICIO_TABLA if numero == 1 else INICIO_TABLA_CONTINUACION) + ALTO_ENCABEZADO
+        y = _filas(lienzo, lineas, inicio)
+        if numero == len(paginas):
+            _totales(lienzo, documento, y + 20)
+        lienzo.texto(ANCHO / 2, ALTO - 30, f'Página {numero} de {len(paginas)}', tamano=8, alinear='centro')
+
+        objetos.append(_flujo(zlib.compress(lienzo.contenido())))
+        fijo = 5 if numero == 1 else 6
+        objetos.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << %s >> /Contents [%d 0 R %d 0 R] >>'
+            % (ANCHO, ALTO, recursos, fijo, len(objetos))
+        )
+        hojas.append(len(objetos))
+
+    objetos[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(b'%d 0 R' % h for h in hojas), len(hojas))
+    return _archivo(objetos)
+
+
+def renderizar_lote(plantilla, documentos):
+    """Tarea del pool: varios documentos de la misma plantilla en un solo envío"""
+    return [renderizar(plantilla, documento) for documento in documentos]
+
+
+def _datos(lienzo, plantilla, documento):
+    y = 82
+    for etiqueta, valor in (
+        ('No.', documento['numero']), ('Fecha', documento['fecha']), ('Vence', documento['vencimiento']),
+    ) + ((('NCF', documento['ncf']),) if plantilla.con_ncf else ()):
+        lienzo.texto(DERECHA, y, f'{etiqueta}: {valor or "N/A"}', tamano=10, negrita=etiqueta == 'No.', alinear='derecha')
+        y += 14
+
+    cliente = documento['cliente']
+    for fila, (etiqueta, valor) in enumerate((
+        ('Nombre', cliente.get('nombre')), ('Dirección', cliente.get('direccion')),
+        ('RNC/Cédula', cliente.get('documento')), ('Teléfono', cliente.get('telefono')),
+    )):
+        lienzo.texto(MARGEN, 178 + 14 * fila, recortar(f'{etiqueta}: {valor or "N/A"}', 300 - MARGEN - 10, 9), tamano=9)
+
+
+def _filas(lienzo, lineas, y):
+    (concepto_x, concepto_fin), *numericas = COLUMNAS
+    for indice, linea in enumerate(lineas):
+        if indice % 2 == 0:
+            lienzo.rectangulo(MARGEN, y, DERECHA - MARGEN, ALTO_FILA, relleno=CLARO)
+        lienzo.texto(concepto_x + 4, y + 12, recortar(linea[0], concepto_fin - concepto_x - 8, 9), tamano=9)
+        for (_, fin), valor in zip(numericas, linea[1:]):
+            lienzo.texto(fin - 4, y + 12, valor, tamano=9, alinear='derecha')
+        y += ALTO_FILA
+    lienzo.linea(MARGEN, y, DERECHA, y)
+    return y
+
+
+def _totales(lienzo, documento, y):
+    x = DERECHA - 200
+    itbis = f"ITBIS {documento['tasa_itbis']}%:" if documento['tasa_itbis'] else 'ITBIS:'
+    for etiqueta, valor in (('Subtotal:', documento['subtotal']), (itbis, documento['itbis'])):
+        lienzo.texto(x, y, etiqueta, tamano=10)
+        lienzo.texto(DERECHA - 6, y, f'RD$ {valor}', tamano=10, alinear='derecha')
+        y += 16
+    lienzo.linea(x, y - 8, DERECHA, y - 8)
+    lienzo.rectangulo(x, y, DERECHA - x, 24, relleno=PRIMARIO)
+    lienzo.texto(x + 6, y + 16, 'TOTAL:', tamano=12, negrita=True, color=BLANCO)
+    lienzo.texto(DERECHA - 6, y + 16, f"RD$ {documento['total']}", tamano=12, negrita=True, color=BLANCO, alinear='derecha')
+
+
+def _flujo(comprimido):
+    return b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(comprimido), comprimido)
+
+
+def _archivo(objetos):
+    salida = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    posiciones = []
+    for numero, cuerpo in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += b'%d 0 obj\n%s\nendobj\n' % (numero, cuerpo)
+    xref = len(salida)
+    salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b'%010d 00000 n \n' % posicion
+    salida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, xref)
+    return bytes(salida)
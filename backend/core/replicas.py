@@ -0,0 +1,105 @@
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from .cache import cache_compartida
+from .middleware import get_current_request
+
+# Enrutamiento de lecturas a una réplica. Los reportes, las exportaciones y
+# los listados marcan su petición con ``leer_de_replica`` y sus consultas
+# van a ``settings.DB_LECTURA``; todo lo demás, y cualquier lectura dentro de
+# una transacción del primario (reclamo de NCF, select_for_update, la
+# relectura de lo recién guardado), queda en ``default``. Cuando una empresa
+# escribe, sus lecturas vuelven al primario durante
+# ``settings.LECTURA_VENTANA_ESCRITURA`` segundos para que vea sus propios
+# cambios aunque la réplica vaya atrasada. La marca vive en la caché, así que
+# sin una caché compartida entre procesos no se usa la réplica.
+
+# Modelo de las entradas de DatabaseCache
+APP_CACHE = 'django_cache'
+
+# Alias de lectura de la petición o del streaming en curso; None es el primario
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+
+def _clave_escritura(empresa_id):
+    return f'replicas:escritura:{empresa_id}'
+
+
+def marcar_escritura(empresa_id):
+    """Fija las lecturas de la empresa al primario durante la ventana de escritura"""
+    if empresa_id is not None:
+        cache.set(_clave_escritura(empresa_id), True, settings.LECTURA_VENTANA_ESCRITURA)
+
+
+def alias_lectura(empresa_id):
+    """Alias al que van las lecturas de la empresa, o None si deben ir al primario"""
+    alias = getattr(settings, 'DB_LECTURA', None)
+    if not alias or alias == DEFAULT_DB_ALIAS or alias not in settings.DATABASES:
+        return None
+    # Otro proceso no vería la marca de escritura de este
+    if not cache_compartida():
+        return None
+    if empresa_id is not None and cache.get(_clave_escritura(empresa_id)):
+        return None
+    return alias
+
+
+def leer_de_replica(empresa_id):
+    """Dirige a la réplica las lecturas siguientes del contexto; devuelve el token para ``restaurar``"""
+    return _alias_lectura.set(alias_lectura(empresa_id))
+
+
+def restaurar(token):
+    _alias_lectura.reset(token)
+
+
+def en_replica(iterable):
+    """
+    Mantiene las lecturas de un StreamingHttpResponse en el alias de la
+    petición: el contenido se genera después de que la vista terminó y el
+    contexto de la petición ya se restauró.
+    """
+    return _generar_en(_alias_lectura.get(), iter(iterable))
+
+
+def _generar_en(alias, iterador):
+    while True:
+        token = _alias_lectura.set(alias)
+        try:
+            parte = next(iterador)
+        except StopIteration:
+            return
+        finally:
+            _alias_lectura.reset(token)
+        yield parte
+
+
+class ReplicaLecturaRouter:
+    """Router de ``settings.DATABASE_ROUTERS``; las escrituras siempre van al primario"""
+
+    def db_for_read(self, model, **hints):
+        # La caché en base de datos no puede ir atrasada
+        if model._meta.app_label == APP_CACHE:
+            return DEFAULT_DB_ALIAS
+        alias = _alias_lectura.get()
+        # Dentro de una transacción del primario se lee lo que ella ve
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        request = get_current_request()
+        if model._meta.app_label == APP_CACHE:
+            # Guardar en la caché no es una escritura de la empresa
+            return DEFAULT_DB_ALIAS
+        if request is not None and not getattr(request, '_escritura_marcada', False):
+            # Una marca por petición, y solo si la escritura se confirma
+            request._escritura_marcada = True
+            empresa_id = getattr(getattr(request, 'user', None), 'empresa_id', None)
+            transaction.on_commit(lambda: marcar_escritura(empresa_id), using=DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene las mismas filas que el primario
+        return True
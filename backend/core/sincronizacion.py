@@ -0,0 +1,120 @@
+import base64
+import datetime
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Eliminacion
+from .pagination import KeysetPagination
+
+# Las filas se releen desde un poco antes del cursor: una transacción que
+# confirma tarde puede guardar una fecha_actualizacion anterior al cursor
+MARGEN = datetime.timedelta(seconds=getattr(settings, 'SINCRONIZACION_MARGEN_SEGUNDOS', 30))
+RETENCION = datetime.timedelta(days=getattr(settings, 'SINCRONIZACION_RETENCION_DIAS', 30))
+
+
+class CursorExpirado(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'El cursor es anterior a la retención de eliminaciones; sincronice desde el inicio'
+    default_code = 'cursor_expirado'
+
+
+def codificar_cursor(momento):
+    return base64.urlsafe_b64encode(momento.isoformat().encode('ascii')).decode('ascii')
+
+
+def decodificar_cursor(cursor, parametro='updated_since'):
+    """Devuelve el momento del cursor, o None para una sincronización inicial"""
+    if not cursor:
+        return None
+    try:
+        momento = datetime.datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii'))
+    except (ValueError, UnicodeError):
+        raise ValidationError({parametro: 'Cursor inválido'})
+    if timezone.is_naive(momento):
+        raise ValidationError({parametro: 'Cursor inválido'})
+    return momento
+
+
+class SincronizacionPagination(KeysetPagination):
+    """
+    Páginas de una sincronización en orden de modificación: una fila que
+    cambia mientras el cliente recorre las páginas pasa al final y se
+    entrega en una página posterior.
+    """
+    page_size = getattr(settings, 'SINCRONIZACION_PAGINA', 500)
+    max_page_size = 1000
+    ordering = ('fecha_actualizacion', 'id')
+
+
+class SincronizacionMixin:
+    """
+    Sincronización incremental del listado con ``?updated_since=<cursor>``.
+
+    Devuelve ``{'cursor', 'next', 'results', 'deleted'}`` con las filas
+    modificadas desde el cursor (según ``fecha_actualizacion``) y los ids
+    eliminados desde entonces. Con el parámetro vacío se entrega todo el
+    listado y el cursor inicial. Las filas llegan en páginas de
+    ``SincronizacionPagination``: el cliente sigue ``next`` hasta que sea
+    null y guarda ``cursor``, que es el mismo en todas las páginas (el
+    momento en que empezó la sincronización), así los cambios hechos
+    mientras recorría las páginas vuelven en la siguiente. El cliente aplica
+    los cambios por id, así que releer las filas del margen no duplica nada.
+    """
+    parametro_sincronizacion = 'updated_since'
+    # Momento en que empezó la sincronización, en los enlaces ``next``
+    parametro_inicio = 'inicio'
+
+    def lee_de_replica(self, request):
+        # El cursor es la hora del primario: una réplica atrasada perdería los cambios del margen
+        if self.parametro_sincronizacion in request.query_params:
+            return False
+        return super().lee_de_replica(request)
+
+    def list(self, request, *args, **kwargs):
+        if self.parametro_sincronizacion not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        desde = decodificar_cursor(request.query_params[self.parametro_sincronizacion])
+        # El nuevo cursor se toma antes de leer la primera página para no
+        # perder cambios concurrentes
+        inicio = decodificar_cursor(request.query_params.get(self.parametro_inicio), self.parametro_inicio)
+        primera_pagina = inicio is None
+        ahora = inicio or timezone.now()
+        queryset = self.filter_queryset(self.get_queryset())
+        eliminados = []
+        if desde is not None:
+            if desde < ahora - RETENCION:
+                raise CursorExpirado()
+            queryset = queryset.filter(fecha_actualizacion__gte=desde - MARGEN)
+            if primera_pagina:
+                # Mismo criterio de empresa que las filas vivas
+                eliminados = list(
+                    Eliminacion.objects.del_usuario(request.user).filter(
+                        modelo=queryset.model._meta.label_lower,
+                        fecha_eliminacion__gte=desde - MARGEN,
+                    ).values_list('objeto_id', flat=True).distinct()
+                )
+
+        paginador = SincronizacionPagination()
+        filas = paginador.paginate_queryset(queryset, request, view=self)
+        siguiente = paginador.get_next_link()
+        if siguiente:
+            siguiente = replace_query_param(siguiente, self.parametro_inicio, codificar_cursor(ahora))
+        serializer = self.get_serializer(filas, many=True)
+        return Response({
+            'cursor': codificar_cursor(ahora),
+            'next': siguiente,
+            'results': serializer.data,
+            'deleted': eliminados,
+        })
+
+
+def registrar_tombstone(modelo, instancia):
+    Eliminacion.objects.create(
+        id_empresa_id=instancia.id_empresa_id,
+        modelo=modelo._meta.label_lower,
+        objeto_id=instancia.pk,
+    )
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+class QueryBudgetMixin:
+    """
+    Utilidades de prueba para fijar un presupuesto de consultas por endpoint.
+
+    ``assertQueryBudget`` ejecuta el mismo GET con dos tamaños de datos
+    distintos y exige que el número de consultas sea igual en ambos casos
+    (es decir, que no dependa de la cantidad de filas) y que no supere el
+    presupuesto indicado. Las consultas a la tabla de la caché no cuentan:
+    con Redis no llegan a la base de datos.
+    """
+
+    def get_budget_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as contexto:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        return len(consultas_de_datos(contexto)), contexto
+
+    def assertQueryBudget(self, client, url, budget, crear_filas, filas=(2, 20)):
+        """
+        ``crear_filas(n)`` debe agregar ``n`` filas nuevas al conjunto que
+        devuelve ``url``; se mide antes y después de crecer los datos.
+        """
+        crear_filas(filas[0])
+        pocas, _ = self.count_queries(client, url)
+        crear_filas(filas[1] - filas[0])
+        muchas, contexto = self.count_queries(client, url)
+
+        consultas = '\n'.join(q['sql'] for q in consultas_de_datos(contexto))
+        self.assertEqual(
+            pocas, muchas,
+            f'{url}: el número de consultas crece con las filas ({pocas} -> {muchas}):\n{consultas}'
+        )
+        self.assertLessEqual(
+            muchas, budget,
+            f'{url}: {muchas} consultas superan el presupuesto de {budget}:\n{consultas}'
+        )
+
+
+def consultas_de_datos(contexto):
+    """
+    Consultas capturadas por ``contexto`` sin las de la caché en base de
+    datos, incluidos los savepoints con que DatabaseCache guarda.
+    """
+    cache = settings.CACHES['default']
+    if cache['BACKEND'] != 'django.core.cache.backends.db.DatabaseCache':
+        return contexto.captured_queries
+    tabla = connection.ops.quote_name(cache['LOCATION'])
+    return [
+        consulta for consulta in contexto.captured_queries
+        if tabla not in consulta['sql'] and 'SAVEPOINT' not in consulta['sql']
+    ]
+
+
+def crear_usuario_con_empresa(username='usuario', rnc='101000001'):
+    """Crea una empresa y un usuario asociado para las pruebas"""
+    from accounts.models import Usuario
+    from config.models import Empresa
+
+    empresa = Empresa.objects.create(nombre=f'Empresa {rnc}', rnc=rnc)
+    usuario = Usuario.objects.create_user(username=username, password='clave-segura', empresa=empresa)
+    return usuario
@@ -1,3 +1,89 @@
-from django.test import TestCase
+import asyncio
+from types import SimpleNamespace
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from .middleware import CurrentUserMiddleware, get_current_user
+from .testing import consultas_de_datos, crear_usuario_con_empresa
 
-# Create your tests here.
+
+class CurrentUserMiddlewareTests(SimpleTestCase):
+    def test_el_usuario_no_se_mezcla_entre_corutinas(self):
+        async def vista(request):
+            # Cede el control para que las peticiones se intercalen
+            await asyncio.sleep(0.01)
+            return get_current_user()
+
+        middleware = CurrentUserMiddleware(vista)
+
+        async def concurrentes():
+            peticiones = [SimpleNamespace(user=f'usuario{i}') for i in range(5)]
+            return await asyncio.gather(*(middleware(p) for p in peticiones))
+
+        self.assertEqual(asyncio.run(concurrentes()), [f'usuario{i}' for i in range(5)])
+        self.assertIsNone(get_current_user())
+
+    def test_modo_sincrono(self):
+        middleware = CurrentUserMiddleware(lambda request: get_current_user())
+        self.assertEqual(middleware(SimpleNamespace(user='usuario')), 'usuario')
+        self.assertIsNone(get_current_user())
+
+
+class ReplicaLecturaTests(TransactionTestCase):
+    # En las pruebas 'lectura' es un espejo de default en otra conexión
+    databases = {'default', 'lectura'}
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.usuario = crear_usuario_con_empresa()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def tearDown(self):
+        cache.clear()
+
+    def consultas(self, metodo, url, datos=None):
+        """Consultas de la petición en (default, lectura)"""
+        with CaptureQueriesContext(connections['default']) as primario, \
+                CaptureQueriesContext(connections['lectura']) as replica:
+            response = getattr(self.client, metodo)(url, datos, format='json')
+            # El contenido en streaming se genera al consumirlo
+            b''.join(getattr(response, 'streaming_content', ()))
+        self.assertLess(response.status_code, 300, getattr(response, 'data', None))
+        return len(consultas_de_datos(primario)), len(consultas_de_datos(replica))
+
+    def test_listados_y_reportes_leen_de_la_replica(self):
+        primario, replica = self.consultas('get', '/api/productos/')
+        self.assertEqual(primario, 0)
+        self.assertGreater(replica, 0)
+        self.assertEqual(self.consultas('get', '/api/reportes/ventas/?agrupar=mes')[0], 0)
+        self.assertEqual(self.consultas('get', '/api/reportes/dgii-607/?periodo=202601')[0], 0)
+        # La sincronización incremental toma el cursor del primario
+        self.assertEqual(self.consultas('get', '/api/productos/?updated_since=')[1], 0)
+
+    def test_la_empresa_lee_del_primario_despues_de_escribir(self):
+        primario, replica = self.consultas('post', '/api/productos/', {
+            'codigo': 'P1', 'nombre': 'Producto', 'descripcion': 'Caja', 'precio_compra': Decimal('10.00'),
+            'precio_venta': Decimal('15.00'),
+        })
+        self.assertEqual(replica, 0)
+        self.assertEqual(self.consultas('get', '/api/productos/')[1], 0)
+
+        # Pasada la ventana vuelve a la réplica
+        cache.clear()
+        self.assertEqual(self.consultas('get', '/api/productos/')[0], 0)
+
+    def test_sin_cache_compartida_lee_del_primario(self):
+        from django.test import override_settings
+        from .cache import revisar_cache_compartida
+
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            # Otro proceso no vería la marca de escritura
+            self.assertEqual(self.consultas('get', '/api/productos/')[1], 0)
+            self.assertEqual([aviso.id for aviso in revisar_cache_compartida(None)], ['core.W001'])
+        self.assertEqual(revisar_cache_compartida(None), [])
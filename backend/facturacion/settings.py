@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -96,13 +97,57 @@ WSGI_APPLICATION = 'facturacion.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Con WAL los lectores de SQLite no bloquean al que escribe: un reporte largo
+# no detiene la creación de facturas
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {'init_command': 'PRAGMA journal_mode=WAL'},
+    },
+    # Réplica de lectura de reportes, exportaciones y listados (ver core.replicas).
+    # Por defecto es el mismo archivo en otra conexión de solo lectura; con
+    # DB_LECTURA apunta a una copia (``copiar_replica``) o, cambiando ENGINE,
+    # a la réplica de PostgreSQL
+    'lectura': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_LECTURA', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {'init_command': 'PRAGMA journal_mode=WAL; PRAGMA query_only=ON'},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.replicas.ReplicaLecturaRouter']
+
+# Alias de DATABASES para las lecturas enrutadas; None las deja en default
+DB_LECTURA = 'lectura'
+
+# Segundos que las lecturas de una empresa quedan en el primario después de que escribe
+LECTURA_VENTANA_ESCRITURA = 5
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# La ventana de escritura de las réplicas y las alertas de series necesitan
+# una caché compartida por todos los procesos (ver core.cache). Con
+# REDIS_URL se usa Redis (requiere el paquete redis); si no, una tabla de la
+# base de datos que migrate crea
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_facturacion',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -175,3 +220,6 @@ CORS_ALLOW_HEADERS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+# Procesos del pool que renderiza los PDF de los lotes (None: uno por CPU)
+PDF_PROCESOS = None
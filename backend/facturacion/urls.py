@@ -25,4 +25,5 @@ urlpatterns = [
     path('', include('facturas.urls')),
     path('', include('productos.urls')),
     path('', include('accounts.urls')),
+    path('', include('reportes.urls')),
 ]
@@ -1,61 +1,314 @@
-from .models import Factura, DetalleFactura, Cotizacion, DetalleCotizacion
-from rest_framework import viewsets, permissions
+from contextlib import ExitStack
+from .models import Factura, DetalleFactura, Cotizacion, DetalleCotizacion, TipoDocumento
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .serializers import FacturaSerializer, DetalleFacturaSerializer, CotizacionSerializer, DetalleCotizacionSerializer
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from core.api import EmpresaViewSetMixin
+from core.async_api import AsyncReadView
+from core.pagination import KeysetPagination
+from core.sincronizacion import SincronizacionMixin
+from reportes.ventas import cambio_en_ventas
+from .lote import MAXIMO_FACTURAS, crear_facturas
+from .pdf import MAXIMO_LOTE, TIPOS, asegurar_pdf, consulta_pdf, nombre_archivo, preparar, zip_de_pdfs
+from .totales import actualizar_totales
+from .transiciones import ACTIVAR, ANULAR, MAXIMO_TRANSICION, PAGAR, TRANSICIONES, aplicar_transicion
+from .serializers import (
+    FacturaSerializer, DetalleFacturaSerializer, CotizacionSerializer, DetalleCotizacionSerializer,
+    FacturarCotizacionSerializer,
+)
 
-class FacturaViewSet(viewsets.ModelViewSet):
-    queryset=Factura.objects.all()
-    permission_classes = [permissions.AllowAny]
+
+class DocumentoPagination(KeysetPagination):
+    """Paginación por cursor de facturas y cotizaciones, de la más reciente a la más antigua"""
+    ordering = ('-fecha_emision', '-id')
+
+
+def _valor_booleano(valor, nombre):
+    if valor.lower() in ('true', '1'):
+        return True
+    if valor.lower() in ('false', '0'):
+        return False
+    raise ValidationError({nombre: 'Debe ser true o false'})
+
+
+def _empresa_del_usuario(request):
+    """Empresa en la que escribe el usuario; sin ella no se crean ni cambian documentos"""
+    empresa_id = getattr(request.user, 'empresa_id', None)
+    if empresa_id is None:
+        raise ValidationError({'id_empresa': 'No se pudo determinar la empresa del documento'})
+    return empresa_id
+
+
+def filtrar_documentos(queryset, request, campos):
+    """
+    Aplica los filtros de listado comunes a facturas y cotizaciones sobre el
+    queryset ya restringido a la empresa. ``campos`` indica qué filtros de
+    igualdad admite el modelo.
+    """
+    params = request.query_params
+    filtros = [(campo, campo, params.get(campo)) for campo in campos if params.get(campo)]
+    if params.get('fecha_desde'):
+        filtros.append(('fecha_desde', 'fecha_emision__gte', params.get('fecha_desde')))
+    if params.get('fecha_hasta'):
+        filtros.append(('fecha_hasta', 'fecha_emision__lte', params.get('fecha_hasta')))
+    if params.get('anulado'):
+        filtros.append(('anulado', 'anulado', _valor_booleano(params.get('anulado'), 'anulado')))
+
+    for nombre, lookup, valor in filtros:
+        try:
+            queryset = queryset.filter(**{lookup: valor})
+        except (ValueError, DjangoValidationError):
+            raise ValidationError({nombre: f'Valor inválido: {valor}'})
+    return queryset
+
+
+class DocumentoPdfMixin:
+    """
+    PDF de facturas y cotizaciones generados en el servidor:
+    ``GET <recurso>/{id}/pdf/`` devuelve uno y ``POST <recurso>/pdf-lote/``
+    con ``{"ids": [...]}`` devuelve un ZIP en streaming. Los PDF se guardan
+    por contenido (ver ``facturas.pdf``), así que el ETag es la huella del
+    documento y un documento sin cambios no se vuelve a renderizar.
+    """
+    tipo_pdf = None
+
+    @action(detail=True, methods=['get'])
+    def pdf(self, request, pk=None):
+        documento = get_object_or_404(consulta_pdf(self.get_queryset(), self.tipo_pdf), pk=pk)
+        plantilla_documento, datos, ruta = preparar(documento, self.tipo_pdf)
+        etag = quote_etag(ruta.rsplit('/', 1)[-1].removesuffix('.pdf'))
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            asegurar_pdf(plantilla_documento, datos, ruta)
+            response = FileResponse(
+                default_storage.open(ruta), content_type='application/pdf',
+                filename=nombre_archivo(documento, self.tipo_pdf),
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=['post'], url_path='pdf-lote')
+    def pdf_lote(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            raise ValidationError({'ids': 'Debe ser una lista de ids'})
+        if len(ids) > MAXIMO_LOTE:
+            raise ValidationError({'ids': f'Se admiten hasta {MAXIMO_LOTE} documentos por lote'})
+
+        ids = list(dict.fromkeys(ids))
+        documentos = consulta_pdf(self.get_queryset(), self.tipo_pdf).in_bulk(ids)
+        faltantes = [i for i in ids if i not in documentos]
+        if faltantes:
+            return Response({'error': 'Documentos inexistentes', 'ids': faltantes}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(
+            zip_de_pdfs([documentos[i] for i in ids], self.tipo_pdf), content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{TIPOS[self.tipo_pdf]["lote"]}"'
+        return response
+
+
+class FacturaViewSet(DocumentoPdfMixin, SincronizacionMixin, EmpresaViewSetMixin, viewsets.ModelViewSet):
+    queryset=Factura.objects.select_related('ncf_asignado__tipo_comprobante')
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = FacturaSerializer
+    pagination_class = DocumentoPagination
+    tipo_pdf = TipoDocumento.FACTURA
+
+    def get_queryset(self):
+        return filtrar_documentos(super().get_queryset(), self.request, ('estado', 'cliente', 'tipo_comprobante'))
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Crea hasta MAXIMO_FACTURAS facturas en un pedido:
+        ``{"facturas": [...], "atomico": true}``, cada una con el mismo formato
+        que en create. Responde con un resultado por factura (id, número y NCF,
+        o sus errores). Con ``atomico`` (por defecto) un error cancela todo el
+        lote; con ``false`` se crean las válidas.
+        """
+        facturas = request.data.get('facturas')
+        if not isinstance(facturas, list) or not facturas:
+            raise ValidationError({'facturas': 'Debe ser una lista de facturas'})
+        if len(facturas) > MAXIMO_FACTURAS:
+            raise ValidationError({'facturas': f'Se admiten hasta {MAXIMO_FACTURAS} facturas por lote'})
+        atomico = request.data.get('atomico', True)
+        if not isinstance(atomico, bool):
+            raise ValidationError({'atomico': 'Debe ser true o false'})
+        resultados = crear_facturas(facturas, _empresa_del_usuario(request), atomico)
+        creadas = sum(1 for resultado in resultados if 'id' in resultado)
+        return Response(
+            {'creadas': creadas, 'con_errores': len(resultados) - creadas, 'resultados': resultados},
+            status=status.HTTP_201_CREATED if creadas else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=True, methods=['post'])
+    def activar(self, request, pk=None):
+        """Borrador o Pendiente -> Activa: asigna número y NCF si no los tiene"""
+        return self._transicion(request, ACTIVAR)
+
+    @action(detail=True, methods=['post'])
+    def pagar(self, request, pk=None):
+        """Activa -> Pagada"""
+        return self._transicion(request, PAGAR)
+
+    @action(detail=True, methods=['post'])
+    def anular(self, request, pk=None):
+        """Borrador, Pendiente o Activa -> Anulada: anula el NCF emitido o libera el que no llegó a emitirse"""
+        return self._transicion(request, ANULAR)
 
-class DetalleFacturaViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def transicion(self, request):
+        """
+        Aplica una transición a varias facturas: ``{"accion": "pagar", "ids": [...]}``.
+        Cambia las que la admiten y reporta las demás.
+        """
+        accion = request.data.get('accion')
+        if accion not in TRANSICIONES:
+            raise ValidationError({'accion': f"Debe ser una de: {', '.join(TRANSICIONES)}"})
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            raise ValidationError({'ids': 'Debe ser una lista de ids'})
+        if len(ids) > MAXIMO_TRANSICION:
+            raise ValidationError({'ids': f'Se admiten hasta {MAXIMO_TRANSICION} facturas por pedido'})
+
+        empresa_id = _empresa_del_usuario(request)
+        aplicadas, rechazadas = aplicar_transicion(Factura.objects.de_empresa(empresa_id), accion, ids)
+        return Response({
+            'aplicadas': aplicadas,
+            'rechazadas': [{'id': factura_id, 'error': motivo} for factura_id, motivo in rechazadas.items()],
+        })
+
+    def _transicion(self, request, accion):
+        # Las transiciones escriben: ni siquiera un superusuario sin empresa las aplica
+        empresa_id = _empresa_del_usuario(request)
+        factura = self.get_object()
+        _, rechazadas = aplicar_transicion(Factura.objects.de_empresa(empresa_id), accion, [factura.pk])
+        if rechazadas:
+            raise ValidationError({'estado': rechazadas[factura.pk]})
+        return Response(self.get_serializer(self.get_object()).data)
+
+class DetalleFacturaViewSet(EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset=DetalleFactura.objects.all()
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = DetalleFacturaSerializer
 
     def get_queryset(self):
-        queryset = DetalleFactura.objects.all()
+        queryset = super().get_queryset()
         factura_id = self.request.query_params.get('factura')
         if factura_id:
             queryset = queryset.filter(factura_id=factura_id)
         return queryset
 
+    # Cambiar una línea cambia los totales de su factura y, si está activa, sus ventas
+    def perform_create(self, serializer):
+        factura_id = serializer.validated_data['factura'].pk
+        with cambio_en_ventas(factura_id):
+            serializer.save()
+            actualizar_totales(Factura, factura_id)
+
+    def perform_update(self, serializer):
+        # Si la línea pasa a otra factura cambian las dos
+        facturas = {serializer.instance.factura_id}
+        if 'factura' in serializer.validated_data:
+            facturas.add(serializer.validated_data['factura'].pk)
+        with ExitStack() as pila:
+            for factura_id in sorted(facturas):
+                pila.enter_context(cambio_en_ventas(factura_id))
+            serializer.save()
+            for factura_id in sorted(facturas):
+                actualizar_totales(Factura, factura_id)
+
+    def perform_destroy(self, instance):
+        with cambio_en_ventas(instance.factura_id):
+            instance.delete()
+            actualizar_totales(Factura, instance.factura_id)
+
     @action(detail=False, methods=['get'])
     def by_factura(self, request):
         factura_id = request.query_params.get('factura')
         if factura_id:
-            detalles = DetalleFactura.objects.filter(factura_id=factura_id)
+            detalles = self.get_queryset().filter(factura_id=factura_id)
             serializer = self.get_serializer(detalles, many=True)
             return Response(serializer.data)
         return Response([])
 
-class CotizacionViewSet(viewsets.ModelViewSet):
+class CotizacionViewSet(DocumentoPdfMixin, SincronizacionMixin, EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset=Cotizacion.objects.all()
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = CotizacionSerializer
+    pagination_class = DocumentoPagination
+    tipo_pdf = TipoDocumento.COTIZACION
+
+    def get_queryset(self):
+        return filtrar_documentos(super().get_queryset(), self.request, ('cliente',))
+
+    @action(detail=True, methods=['post'])
+    def facturar(self, request, pk=None):
+        """
+        Crea una factura con la cabecera y las líneas de la cotización. Recibe
+        ``tipo_comprobante`` y, opcionalmente, ``estado`` (Borrador, Pendiente
+        o Activa), ``fecha_emision`` y ``fecha_vencimiento``.
+        """
+        serializer = FacturarCotizacionSerializer(data=request.data, context={'cotizacion': self.get_object()})
+        serializer.is_valid(raise_exception=True)
+        factura = serializer.save()
+        return Response(FacturaSerializer(factura).data, status=status.HTTP_201_CREATED)
 
-class DetalleCotizacionViewSet(viewsets.ModelViewSet):
+class DetalleCotizacionViewSet(EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset=DetalleCotizacion.objects.all()
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = DetalleCotizacionSerializer
 
     def get_queryset(self):
-        queryset = DetalleCotizacion.objects.all()
+        queryset = super().get_queryset()
         cotizacion_id = self.request.query_params.get('cotizacion')
         if cotizacion_id:
             queryset = queryset.filter(cotizacion_id=cotizacion_id)
         return queryset
 
+    # Cambiar una línea cambia los totales de su cotización
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+        actualizar_totales(Cotizacion, serializer.instance.cotizacion_id)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        anterior = serializer.instance.cotizacion_id
+        serializer.save()
+        for cotizacion_id in sorted({anterior, serializer.instance.cotizacion_id}):
+            actualizar_totales(Cotizacion, cotizacion_id)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        actualizar_totales(Cotizacion, instance.cotizacion_id)
+
     @action(detail=False, methods=['get'])
     def by_cotizacion(self, request):
         cotizacion_id = request.query_params.get('cotizacion')
         if cotizacion_id:
-            detalles = DetalleCotizacion.objects.filter(cotizacion_id=cotizacion_id)
+            detalles = self.get_queryset().filter(cotizacion_id=cotizacion_id)
             serializer = self.get_serializer(detalles, many=True)
             return Response(serializer.data)
         return Response([])
 
 
+class FacturaAsyncView(AsyncReadView):
+    queryset = Factura.objects.select_related('ncf_asignado__tipo_comprobante')
+    serializer_class = FacturaSerializer
+    pagination_class = DocumentoPagination
 
-    
\ No newline at end of file
+    def filtrar(self, queryset, request):
+        return filtrar_documentos(queryset, request, ('estado', 'cliente', 'tipo_comprobante'))
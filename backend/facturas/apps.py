@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class FacturasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'facturas'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from core.catalogos import registrar_eliminacion
+
+        # Las facturas y cotizaciones eliminadas se entregan como tombstones
+        post_delete.connect(registrar_eliminacion, sender=self.get_model('Factura'))
+        post_delete.connect(registrar_eliminacion, sender=self.get_model('Cotizacion'))
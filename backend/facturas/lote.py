@@ -0,0 +1,132 @@
+from collections import defaultdict
+from decimal import InvalidOperation
+from django.db import transaction
+from rest_framework import serializers
+from clientes.models import Cliente
+from comprobantes.models import TipoComprobante, formatear_ncf
+from comprobantes.ncf import contar_disponibles, reclamar_ncfs
+from productos.models import Producto
+from reportes.ventas import registrar_facturas
+from .models import DetalleFactura, EstadoFactura, Factura, TipoDocumento
+from .numeracion import reservar_numeros
+from .serializers import SIN_NCF, FacturaLoteSerializer
+
+# Creación de muchas facturas en un solo pedido para la sincronización de
+# fin de día de las sucursales. Todo lo que FacturaViewSet.create hace por
+# factura se hace una vez por lote: se precargan clientes, tipos y productos,
+# se reservan de una vez los números de las facturas activas, se insertan
+# todas las cabeceras y todas las líneas con dos bulk_create y los NCF se
+# reclaman en bloque por tipo de comprobante.
+
+MAXIMO_FACTURAS = 500
+
+
+def crear_facturas(datos, empresa_id, atomico=True):
+    """
+    Crea las facturas de ``datos`` en la empresa y devuelve un resultado por
+    factura, en el orden recibido: ``{'indice', 'id', 'numero_factura', 'ncf'}``
+    o ``{'indice', 'errores'}``.
+
+    Con ``atomico`` cualquier error cancela el lote completo y solo se
+    devuelven los errores. Sin él se crean las válidas y se reportan las
+    demás; aun así, si otra petición agota los NCF entre la verificación y
+    el reclamo, el lote completo se revierte como en la creación individual.
+    """
+    validador = FacturaLoteSerializer(context=_precargar(datos, empresa_id))
+    resultados = {}
+    preparadas = []
+    for indice, item in enumerate(datos):
+        try:
+            preparadas.append((indice, *_preparar(validador, item, empresa_id)))
+        except serializers.ValidationError as error:
+            resultados[indice] = {'indice': indice, 'errores': error.detail}
+
+    # Las activas que no alcanzan NCF fallan antes de escribir nada
+    activas_por_tipo = defaultdict(list)
+    for indice, factura, _ in preparadas:
+        if factura.estado == EstadoFactura.ACTIVA:
+            activas_por_tipo[factura.tipo_comprobante_id].append(indice)
+    for tipo_id, indices in activas_por_tipo.items():
+        for indice in indices[contar_disponibles(tipo_id):]:
+            resultados[indice] = {'indice': indice, 'errores': {'ncf_asignado': [SIN_NCF]}}
+    preparadas = [preparada for preparada in preparadas if preparada[0] not in resultados]
+
+    if preparadas and not (atomico and resultados):
+        ncfs = _guardar(preparadas, empresa_id)
+        for indice, factura, _ in preparadas:
+            resultados[indice] = {
+                'indice': indice, 'id': factura.pk, 'numero_factura': factura.numero_factura,
+                'ncf': ncfs.get(factura.pk),
+            }
+    return [resultados[indice] for indice in sorted(resultados)]
+
+
+def _precargar(datos, empresa_id):
+    """Clientes, tipos de comprobante y productos mencionados en el lote, con una consulta cada uno"""
+    ids = defaultdict(set)
+    for item in datos:
+        if not isinstance(item, dict):
+            continue
+        for campo in ('cliente', 'tipo_comprobante'):
+            _agregar_id(ids[campo], item.get(campo))
+        detalles = item.get('detalle_facturas')
+        for detalle in detalles if isinstance(detalles, list) else ():
+            if isinstance(detalle, dict):
+                _agregar_id(ids['producto'], detalle.get('producto'))
+    return {
+        'clientes': Cliente.objects.de_empresa(empresa_id).in_bulk(ids['cliente']),
+        'tipos_comprobante': TipoComprobante.objects.de_empresa(empresa_id).in_bulk(ids['tipo_comprobante']),
+        'productos': Producto.objects.de_empresa(empresa_id).in_bulk(ids['producto']),
+    }
+
+
+def _agregar_id(ids, valor):
+    try:
+        ids.add(int(valor))
+    except (TypeError, ValueError):
+        # El serializer reporta el valor inválido
+        pass
+
+
+def _preparar(validador, item, empresa_id):
+    """Valida una factura y devuelve su cabecera y sus líneas sin guardar"""
+    validated_data = validador.run_validation(item)
+    detalles = validated_data.pop('detalle_facturas', [])
+    try:
+        totales = validador._preparar_lineas(detalles)
+        factura = Factura(**validated_data, **totales._asdict(), id_empresa_id=empresa_id)
+        lineas = validador._construir_detalles(DetalleFactura, 'factura', factura, detalles)
+    except (KeyError, TypeError, ValueError, InvalidOperation) as error:
+        raise serializers.ValidationError({'detalle_facturas': [f'Línea inválida: {error}']})
+    return factura, lineas
+
+
+def _guardar(preparadas, empresa_id):
+    """Guarda el lote en una transacción y devuelve el NCF completo de cada factura activa por id"""
+    facturas = [factura for _, factura, _ in preparadas]
+    activas = [factura for factura in facturas if factura.estado == EstadoFactura.ACTIVA]
+    with transaction.atomic():
+        if activas:
+            for factura, numero in zip(activas, reservar_numeros(empresa_id, TipoDocumento.FACTURA, len(activas))):
+                factura.numero_factura = numero
+        Factura.objects.bulk_create(facturas)
+        DetalleFactura.objects.bulk_create([linea for _, _, lineas in preparadas for linea in lineas])
+
+        ncfs = {}
+        por_tipo = defaultdict(list)
+        for factura in activas:
+            por_tipo[factura.tipo_comprobante].append(factura)
+        for tipo, del_tipo in por_tipo.items():
+            reclamados = reclamar_ncfs(tipo.pk, [(factura.pk, factura.cliente_id) for factura in del_tipo], empresa_id)
+            if len(reclamados) < len(del_tipo):
+                raise serializers.ValidationError({'ncf_asignado': SIN_NCF})
+            for factura in del_tipo:
+                reclamado = reclamados[factura.pk]
+                factura.ncf_asignado_id = reclamado.id
+                ncfs[factura.pk] = formatear_ncf(tipo.tipo_comprobante, reclamado.numero_comprobante)
+        if activas:
+            Factura.objects.bulk_update(activas, ['ncf_asignado'])
+
+        # Las que ya nacen activas o pagadas cuentan en los reportes de ventas
+        registrar_facturas([factura.pk for factura in facturas])
+    return ncfs
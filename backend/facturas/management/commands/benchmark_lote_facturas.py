@@ -0,0 +1,101 @@
+import datetime
+import json
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import Usuario
+from clientes.models import Cliente
+from comprobantes.models import SerieComprobante, TipoComprobante
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara crear facturas activas una por una con POST /api/facturas/ contra un solo '
+        'POST /api/facturas/batch/. Los datos se crean en la empresa del usuario dentro de una '
+        'transacción que se revierte al terminar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuario con cuya empresa se crean las facturas')
+        parser.add_argument('--facturas', type=int, default=200)
+        parser.add_argument('--lineas', type=int, default=5, help='Líneas por factura')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        if not usuario.empresa_id:
+            raise CommandError('El usuario debe pertenecer a una empresa')
+        cantidad = options['facturas']
+
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                facturas = self.datos(usuario.empresa_id, cantidad, options['lineas'])
+                cliente = Client()
+                cliente.cookies['access_token'] = str(AccessToken.for_user(usuario))
+
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    for factura in facturas:
+                        self.enviar(cliente, '/api/facturas/', factura)
+                    individual = time.perf_counter() - inicio
+                self.reportar('una por una', cantidad, individual, len(consultas))
+
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    self.enviar(cliente, '/api/facturas/batch/', {'facturas': facturas})
+                    lote = time.perf_counter() - inicio
+                self.reportar('batch', cantidad, lote, len(consultas))
+                self.stdout.write(f'batch es {individual / lote:.1f} veces más rápido')
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def datos(self, empresa_id, cantidad, lineas):
+        hoy = datetime.date.today()
+        base = (Cliente.objects.aggregate(maximo=Max('numero_documento'))['maximo'] or 0) + 1
+        cliente = Cliente.objects.create(
+            nombre='Cliente benchmark', tipo_documento='1', numero_documento=base, tipo_ncf=1, id_empresa_id=empresa_id,
+        )
+        tipo = TipoComprobante.objects.create(tipo_comprobante='B99', descripcion='Benchmark', id_empresa_id=empresa_id)
+        # Alcanza para las dos pasadas
+        SerieComprobante.objects.create(
+            tipo_comprobante=tipo, desde=1, hasta=2 * cantidad, numero_actual=0,
+            fecha_vencimiento=hoy + datetime.timedelta(days=30), id_empresa_id=empresa_id,
+        )
+        productos = [
+            Producto.objects.create(
+                codigo=f'BENCH{base}-{n}', nombre=f'Producto {n}', descripcion='', precio_compra=Decimal('1.00'),
+                precio_venta=Decimal('2.00'), id_empresa_id=empresa_id,
+            )
+            for n in range(lineas)
+        ]
+        return [
+            {
+                'tipo_comprobante': tipo.id, 'cliente': cliente.id, 'estado': 'Activa',
+                'fecha_emision': str(hoy), 'fecha_vencimiento': str(hoy),
+                'detalle_facturas': [
+                    {'producto': producto.id, 'cantidad': 1 + n % 3, 'precio_unitario': '2.00'} for producto in productos
+                ],
+            }
+            for n in range(cantidad)
+        ]
+
+    def enviar(self, cliente, url, datos):
+        response = cliente.post(url, json.dumps(datos), content_type='application/json')
+        if response.status_code != 201:
+            raise CommandError(f'{url} respondió {response.status_code}: {response.content[:300]!r}')
+
+    def reportar(self, modo, cantidad, segundos, consultas):
+        self.stdout.write(
+            f'{modo:<12}{cantidad:>6} facturas en {segundos:6.2f} s  '
+            f'{cantidad / segundos:8.1f} facturas/s  {consultas / cantidad:6.1f} consultas por factura'
+        )
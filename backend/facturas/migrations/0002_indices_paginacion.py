@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('comprobantes', '0002_initial'),
+        ('config', '0001_initial'),
+        ('facturas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['id_empresa', 'fecha_emision', 'id'], name='cotizacion_emp_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['id_empresa', 'cliente', 'fecha_emision', 'id'], name='cotizacion_emp_cliente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['id_empresa', 'anulado', 'fecha_emision', 'id'], name='cotizacion_emp_anulado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['id_empresa', 'fecha_emision', 'id'], name='factura_emp_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['id_empresa', 'estado', 'fecha_emision', 'id'], name='factura_emp_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['id_empresa', 'cliente', 'fecha_emision', 'id'], name='factura_emp_cliente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['id_empresa', 'tipo_comprobante', 'fecha_emision', 'id'], name='factura_emp_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['id_empresa', 'anulado', 'fecha_emision', 'id'], name='factura_emp_anulado_idx'),
+        ),
+    ]
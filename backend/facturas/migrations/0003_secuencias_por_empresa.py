@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('comprobantes', '0002_initial'),
+        ('config', '0001_initial'),
+        ('facturas', '0002_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_documento', models.CharField(choices=[('factura', 'Factura'), ('cotizacion', 'Cotizacion')], max_length=20)),
+                ('ultimo_numero', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cotizacion',
+            name='numero_cotizacion',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='factura',
+            name='numero_factura',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='cotizacion',
+            constraint=models.UniqueConstraint(fields=('id_empresa', 'numero_cotizacion'), name='cotizacion_numero_por_empresa'),
+        ),
+        migrations.AddConstraint(
+            model_name='factura',
+            constraint=models.UniqueConstraint(fields=('id_empresa', 'numero_factura'), name='factura_numero_por_empresa'),
+        ),
+        migrations.AddField(
+            model_name='secuenciadocumento',
+            name='id_empresa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='secuencias_documento', to='config.empresa'),
+        ),
+        migrations.AddConstraint(
+            model_name='secuenciadocumento',
+            constraint=models.UniqueConstraint(fields=('id_empresa', 'tipo_documento'), name='secuencia_por_empresa_tipo'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0001_initial'),
+        ('facturas', '0003_secuencias_por_empresa'),
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detallecotizacion',
+            index=models.Index(fields=['id_empresa', 'cotizacion', 'id'], name='detcotizacion_emp_cot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallefactura',
+            index=models.Index(fields=['id_empresa', 'factura', 'id'], name='detfactura_emp_factura_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:39
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def llenar_totales(apps, schema_editor):
+    # Los totales ya emitidos se conservan: el subtotal es la suma de las
+    # líneas y el ITBIS la diferencia con el total guardado
+    for documento, detalle, campo in (('Factura', 'DetalleFactura', 'factura'),
+                                      ('Cotizacion', 'DetalleCotizacion', 'cotizacion')):
+        Documento = apps.get_model('facturas', documento)
+        Detalle = apps.get_model('facturas', detalle)
+        subtotales = dict(
+            Detalle.objects.values_list(campo).annotate(suma=Sum('subtotal')).order_by().values_list(campo, 'suma')
+        )
+        filas = list(Documento.objects.only('id', 'total'))
+        for fila in filas:
+            fila.subtotal = subtotales.get(fila.id, fila.total)
+            fila.itbis = fila.total - fila.subtotal
+        Documento.objects.bulk_update(filas, ['subtotal', 'itbis'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturas', '0004_indices_por_empresa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotizacion',
+            name='itbis',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='cotizacion',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='detallecotizacion',
+            name='tasa_itbis',
+            field=models.DecimalField(decimal_places=2, default=Decimal('18.00'), max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='detallefactura',
+            name='tasa_itbis',
+            field=models.DecimalField(decimal_places=2, default=Decimal('18.00'), max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='itbis',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='cotizacion',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='factura',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(llenar_totales, migrations.RunPython.noop),
+    ]
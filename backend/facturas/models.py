@@ -1,9 +1,12 @@
+from decimal import Decimal
 from django.db import models
 from django.core.exceptions import ValidationError
 from clientes.models import Cliente
 from productos.models import Producto
 from comprobantes.models import TipoComprobante, Comprobante
+from comprobantes.ncf import hay_ncf_disponible
 from core.middleware import get_current_user
+from core.models import EmpresaManager
 
 class EstadoFactura(models.TextChoices):
     BORRADOR = 'Borrador'
@@ -13,7 +16,7 @@ class EstadoFactura(models.TextChoices):
     ANULADA = 'Anulada'
 
 class Factura(models.Model):
-    numero_factura = models.IntegerField(unique=True, null=True, blank=True)
+    numero_factura = models.IntegerField(null=True, blank=True)
     tipo_comprobante = models.ForeignKey(TipoComprobante, on_delete=models.CASCADE)
     ncf_asignado = models.ForeignKey(Comprobante, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="NCF Asignado")
     fecha_emision = models.DateField()
@@ -21,11 +24,29 @@ class Factura(models.Model):
     anulado = models.BooleanField(default=False)
     estado = models.CharField(max_length=20, choices=EstadoFactura.choices, default=EstadoFactura.PENDIENTE)
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
-    total = models.DecimalField(max_digits=10, decimal_places=2)
+    # Montos calculados en el servidor desde las líneas (ver facturas.totales)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    itbis = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='facturas', null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            # Índices para la paginación por (fecha_emision, id) y sus filtros
+            models.Index(fields=['id_empresa', 'fecha_emision', 'id'], name='factura_emp_fecha_idx'),
+            models.Index(fields=['id_empresa', 'estado', 'fecha_emision', 'id'], name='factura_emp_estado_idx'),
+            models.Index(fields=['id_empresa', 'cliente', 'fecha_emision', 'id'], name='factura_emp_cliente_idx'),
+            models.Index(fields=['id_empresa', 'tipo_comprobante', 'fecha_emision', 'id'], name='factura_emp_tipo_idx'),
+            models.Index(fields=['id_empresa', 'anulado', 'fecha_emision', 'id'], name='factura_emp_anulado_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'numero_factura'], name='factura_numero_por_empresa'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
@@ -38,11 +59,7 @@ class Factura(models.Model):
         # Validar que existan comprobantes disponibles si se está asignando un NCF
         if self.estado == 'Activa' and not self.ncf_asignado:
             # Verificar si hay comprobantes disponibles para el tipo de comprobante
-            comprobantes_disponibles = Comprobante.objects.filter(
-                tipo_comprobante=self.tipo_comprobante,
-                cliente__isnull=True,  # Comprobantes no asignados a cliente
-                factura_asignada__isnull=True  # Comprobantes no asignados a factura
-            ).exists()
+            comprobantes_disponibles = hay_ncf_disponible(self.tipo_comprobante_id, self.id_empresa_id)
             
             if not comprobantes_disponibles:
                 raise ValidationError({
@@ -61,8 +78,17 @@ class DetalleFactura(models.Model):
     cantidad = models.IntegerField()
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Porcentaje de ITBIS del producto al agregar la línea
+    tasa_itbis = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('18.00'))
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='detalles_factura', null=True, blank=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'factura', 'id'], name='detfactura_emp_factura_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
@@ -74,16 +100,31 @@ class DetalleFactura(models.Model):
         return f"Detalle de factura {self.factura.numero_factura} - {self.producto.nombre}"
     
 class Cotizacion(models.Model):
-    numero_cotizacion = models.IntegerField(unique=True, null=True, blank=True)
+    numero_cotizacion = models.IntegerField(null=True, blank=True)
     fecha_emision = models.DateField()
     fecha_vencimiento = models.DateField()
     anulado = models.BooleanField(default=False)
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
-    total = models.DecimalField(max_digits=10, decimal_places=2)
+    # Montos calculados en el servidor desde las líneas (ver facturas.totales)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    itbis = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='cotizaciones', null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'fecha_emision', 'id'], name='cotizacion_emp_fecha_idx'),
+            models.Index(fields=['id_empresa', 'cliente', 'fecha_emision', 'id'], name='cotizacion_emp_cliente_idx'),
+            models.Index(fields=['id_empresa', 'anulado', 'fecha_emision', 'id'], name='cotizacion_emp_anulado_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'numero_cotizacion'], name='cotizacion_numero_por_empresa'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
@@ -98,8 +139,17 @@ class DetalleCotizacion(models.Model):
     cantidad = models.IntegerField()
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Porcentaje de ITBIS del producto al agregar la línea
+    tasa_itbis = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('18.00'))
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='detalles_cotizacion', null=True, blank=True)
 
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'cotizacion', 'id'], name='detcotizacion_emp_cot_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
@@ -109,3 +159,23 @@ class DetalleCotizacion(models.Model):
 
     def __str__(self):
         return f"Detalle de cotizacion {self.cotizacion.numero_cotizacion} - {self.producto.nombre}"
+
+
+class TipoDocumento(models.TextChoices):
+    FACTURA = 'factura'
+    COTIZACION = 'cotizacion'
+
+
+class SecuenciaDocumento(models.Model):
+    """Contador del último número emitido por empresa y tipo de documento"""
+    id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='secuencias_documento')
+    tipo_documento = models.CharField(max_length=20, choices=TipoDocumento.choices)
+    ultimo_numero = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'tipo_documento'], name='secuencia_por_empresa_tipo'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo_documento} - {self.ultimo_numero}"
@@ -0,0 +1,80 @@
+from django.db import connection, transaction
+from django.db.models import F, Max
+from .models import Factura, Cotizacion, SecuenciaDocumento, TipoDocumento
+
+# Campo que guarda el número de cada tipo de documento, para inicializar la secuencia
+CAMPOS_NUMERO = {
+    TipoDocumento.FACTURA: (Factura, 'numero_factura'),
+    TipoDocumento.COTIZACION: (Cotizacion, 'numero_cotizacion'),
+}
+
+
+def reservar_numeros(empresa_id, tipo_documento, cantidad=1):
+    """
+    Reserva ``cantidad`` números consecutivos del documento para la empresa y
+    devuelve el ``range`` reservado.
+
+    El contador avanza con un único ``UPDATE ... RETURNING`` sobre la fila de
+    la empresa, así que dos empresas nunca se bloquean entre sí y dos
+    peticiones de la misma empresa nunca reciben el mismo número.
+    """
+    if cantidad < 1:
+        raise ValueError('La cantidad de números a reservar debe ser mayor que cero')
+
+    with transaction.atomic():
+        ultimo = _avanzar(empresa_id, tipo_documento, cantidad)
+        if ultimo is None:
+            _crear_secuencia(empresa_id, tipo_documento)
+            ultimo = _avanzar(empresa_id, tipo_documento, cantidad)
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def reservar_numero(empresa_id, tipo_documento):
+    """Reserva un solo número del documento para la empresa"""
+    return reservar_numeros(empresa_id, tipo_documento)[0]
+
+
+def _avanzar(empresa_id, tipo_documento, cantidad):
+    """Incrementa el contador y devuelve el nuevo último número, o None si no existe"""
+    if _admite_update_returning():
+        nombre = connection.ops.quote_name
+        meta = SecuenciaDocumento._meta
+        ultimo, empresa, tipo = (
+            nombre(meta.get_field(campo).column) for campo in ('ultimo_numero', 'id_empresa', 'tipo_documento')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {nombre(meta.db_table)} SET {ultimo} = {ultimo} + %s '
+                f'WHERE {empresa} = %s AND {tipo} = %s RETURNING {ultimo}',
+                [cantidad, empresa_id, tipo_documento],
+            )
+            fila = cursor.fetchone()
+        return fila[0] if fila else None
+
+    secuencia = SecuenciaDocumento.objects.filter(id_empresa_id=empresa_id, tipo_documento=tipo_documento)
+    if not secuencia.update(ultimo_numero=F('ultimo_numero') + cantidad):
+        return None
+    # La fila queda bloqueada por el UPDATE hasta el final de la transacción
+    return secuencia.values_list('ultimo_numero', flat=True).get()
+
+
+def _admite_update_returning():
+    """
+    PostgreSQL y SQLite >= 3.35 admiten UPDATE ... RETURNING. En SQLite esa
+    versión es la misma que habilita RETURNING en INSERT; MariaDB lo admite
+    en INSERT pero no en UPDATE, así que el motor se verifica por nombre.
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+
+
+def _crear_secuencia(empresa_id, tipo_documento):
+    """Crea el contador partiendo del mayor número ya emitido por la empresa"""
+    modelo, campo = CAMPOS_NUMERO[tipo_documento]
+    ultimo = modelo.objects.filter(id_empresa_id=empresa_id).aggregate(ultimo=Max(campo))['ultimo']
+    # get_or_create resuelve la carrera si dos peticiones crean la fila a la vez
+    SecuenciaDocumento.objects.get_or_create(
+        id_empresa_id=empresa_id, tipo_documento=tipo_documento,
+        defaults={'ultimo_numero': ultimo or 0},
+    )
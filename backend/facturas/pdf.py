@@ -0,0 +1,266 @@
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import zipfile
+from collections import defaultdict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from PIL import Image
+from core.pdf import Plantilla, renderizar, renderizar_lote
+from .models import DetalleCotizacion, DetalleFactura, TipoDocumento
+
+# Los PDF se guardan por contenido: el nombre es el sha256 de la plantilla
+# y de los datos del documento, así que volver a pedir un documento que no
+# cambió solo lee el archivo. Cambiar el diseño en core.pdf cambia la huella
+# de la plantilla y con ella todos los nombres.
+
+# Logo a ~150 ppp para la caja de 160x80 puntos de la cabecera
+LOGO_PIXELES = (330, 165)
+MAXIMO_LOTE = 200
+DOCUMENTOS_POR_TAREA = 8
+CARPETA = 'pdf'
+
+TIPOS = {
+    TipoDocumento.FACTURA: {
+        'titulo': 'FACTURA', 'prefijo': 'Factura', 'lote': 'facturas.zip', 'con_ncf': True,
+        'numero': 'numero_factura', 'detalle': DetalleFactura, 'lineas': 'detallefactura_set',
+    },
+    TipoDocumento.COTIZACION: {
+        'titulo': 'COTIZACIÓN', 'prefijo': 'Cotizacion', 'lote': 'cotizaciones.zip', 'con_ncf': False,
+        'numero': 'numero_cotizacion', 'detalle': DetalleCotizacion, 'lineas': 'detallecotizacion_set',
+    },
+}
+
+
+def consulta_pdf(queryset, tipo):
+    """Trae cliente, empresa, NCF y líneas con sus productos en tres consultas para cualquier cantidad de documentos"""
+    relaciones = ['cliente', 'id_empresa'] + (['ncf_asignado'] if TIPOS[tipo]['con_ncf'] else [])
+    lineas = TIPOS[tipo]['detalle'].objects.select_related('producto').order_by('id')
+    return queryset.select_related(*relaciones).prefetch_related(Prefetch(TIPOS[tipo]['lineas'], queryset=lineas))
+
+
+def plantilla(empresa, tipo):
+    if empresa is None:
+        return _compilar(tipo, '', '', '', '', '', '')
+    logo = empresa.logo.name if empresa.logo else ''
+    return _compilar(
+        tipo, empresa.nombre, empresa.rnc, empresa.telefono or '', empresa.direccion or '', logo,
+        empresa.updated_at.isoformat() if empresa.updated_at else '',
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _compilar(tipo, nombre, rnc, telefono, direccion, logo, actualizado):
+    # ``actualizado`` solo forma parte de la clave: si la empresa cambia el logo
+    # sin cambiar su nombre de archivo, se vuelve a compilar
+    empresa = {'nombre': nombre, 'rnc': rnc, 'telefono': telefono, 'direccion': direccion}
+    return Plantilla(TIPOS[tipo]['titulo'], empresa, logo_escalado(logo), con_ncf=TIPOS[tipo]['con_ncf'])
+
+
+def logo_escalado(nombre):
+    """Logo reducido a LOGO_PIXELES y convertido a JPEG, o None si no hay o no se puede leer"""
+    if not nombre:
+        return None
+    try:
+        with default_storage.open(nombre) as archivo, Image.open(archivo) as imagen:
+            imagen.thumbnail(LOGO_PIXELES)
+            if imagen.mode in ('RGBA', 'LA', 'P'):
+                # JPEG no tiene transparencia: se compone sobre fondo blanco
+                imagen = imagen.convert('RGBA')
+                fondo = Image.new('RGB', imagen.size, 'white')
+                fondo.paste(imagen, mask=imagen.getchannel('A'))
+                imagen = fondo
+            imagen = imagen.convert('RGB')
+            salida = io.BytesIO()
+            imagen.save(salida, 'JPEG', quality=85)
+            return salida.getvalue(), imagen.width, imagen.height
+    except (OSError, ValueError):
+        return None
+
+
+def datos_pdf(documento, tipo):
+    """Datos variables del documento como texto, listos para core.pdf y para la huella"""
+    lineas = []
+    tasas = set()
+    for detalle in getattr(documento, TIPOS[tipo]['lineas']).all():
+        concepto = detalle.producto.nombre
+        if detalle.descripcion:
+            concepto = f'{concepto} - {detalle.descripcion}'
+        lineas.append([concepto, str(detalle.cantidad), _monto(detalle.precio_unitario), _monto(detalle.subtotal)])
+        if detalle.tasa_itbis:
+            tasas.add(detalle.tasa_itbis)
+
+    cliente = documento.cliente
+    ncf = documento.ncf_asignado if TIPOS[tipo]['con_ncf'] else None
+    return {
+        'numero': str(getattr(documento, TIPOS[tipo]['numero']) or ''),
+        'fecha': documento.fecha_emision.strftime('%d/%m/%Y'),
+        'vencimiento': documento.fecha_vencimiento.strftime('%d/%m/%Y'),
+        'ncf': (ncf.numero_comprobante_completo or '') if ncf else '',
+        'cliente': {
+            'nombre': cliente.nombre, 'documento': str(cliente.numero_documento),
+            'direccion': cliente.direccion or '', 'telefono': cliente.telefono or '',
+        },
+        'lineas': lineas,
+        'subtotal': _monto(documento.subtotal),
+        # Con líneas de tasas distintas no se muestra un porcentaje único
+        'tasa_itbis': f'{tasas.pop():.0f}' if len(tasas) == 1 else '',
+        'itbis': _monto(documento.itbis),
+        'total': _monto(documento.total),
+    }
+
+
+def clave_pdf(plantilla_documento, datos):
+    contenido = json.dumps({'plantilla': plantilla_documento.huella, 'datos': datos}, sort_keys=True)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def ruta_pdf(clave):
+    return f'{CARPETA}/{clave[:2]}/{clave}.pdf'
+
+
+def nombre_archivo(documento, tipo):
+    numero = getattr(documento, TIPOS[tipo]['numero'])
+    prefijo = TIPOS[tipo]['prefijo']
+    return f'{prefijo}_{numero}.pdf' if numero else f'{prefijo}_borrador_{documento.pk}.pdf'
+
+
+def preparar(documento, tipo):
+    """(plantilla, datos, ruta) del documento sin renderizar nada"""
+    plantilla_documento = plantilla(documento.id_empresa, tipo)
+    datos = datos_pdf(documento, tipo)
+    return plantilla_documento, datos, ruta_pdf(clave_pdf(plantilla_documento, datos))
+
+
+def guardar(ruta, contenido):
+    if default_storage.exists(ruta):
+        return
+    nombre = default_storage.save(ruta, ContentFile(contenido))
+    if nombre != ruta:
+        # Otro pedido lo guardó primero; el contenido es el mismo
+        default_storage.delete(nombre)
+
+
+def asegurar_pdf(plantilla_documento, datos, ruta):
+    """Renderiza y guarda el PDF solo si todavía no está guardado"""
+    if not default_storage.exists(ruta):
+        guardar(ruta, renderizar(plantilla_documento, datos))
+
+
+def zip_de_pdfs(documentos, tipo, tamano_bloque=64 * 1024):
+    """
+    Genera el ZIP de los documentos en bloques para un StreamingHttpResponse.
+    Los que ya están guardados se leen del almacenamiento; los demás se
+    renderizan en el pool de procesos en tareas de DOCUMENTOS_POR_TAREA y
+    se escriben en el orden pedido a medida que terminan.
+    """
+    preparados = [
+        (documento, plantilla_documento, datos, ruta, default_storage.exists(ruta))
+        for documento in documentos
+        for plantilla_documento, datos, ruta in [preparar(documento, tipo)]
+    ]
+    renderizados = _renderizar_varios([(p, d) for _, p, d, _, guardado in preparados if not guardado])
+
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_STORED) as archivo:
+        for documento, _, _, ruta, guardado in preparados:
+            if guardado:
+                with default_storage.open(ruta) as existente:
+                    contenido = existente.read()
+            else:
+                contenido = next(renderizados)
+                guardar(ruta, contenido)
+            # Los PDF ya vienen comprimidos; volver a comprimirlos no reduce casi nada
+            archivo.writestr(nombre_archivo(documento, tipo), contenido)
+            if len(salida.buffer) >= tamano_bloque:
+                yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def _renderizar_varios(pendientes):
+    if len(pendientes) <= DOCUMENTOS_POR_TAREA:
+        for plantilla_documento, datos in pendientes:
+            yield renderizar(plantilla_documento, datos)
+        return
+
+    # La plantilla viaja una vez por tarea, así que cada tarea lleva documentos
+    # de una sola plantilla: un pedido puede mezclar empresas (un superusuario)
+    por_plantilla = defaultdict(list)
+    for indice, (plantilla_documento, _) in enumerate(pendientes):
+        por_plantilla[plantilla_documento.huella].append(indice)
+    tareas = [
+        indices[i:i + DOCUMENTOS_POR_TAREA]
+        for indices in por_plantilla.values()
+        for i in range(0, len(indices), DOCUMENTOS_POR_TAREA)
+    ]
+    futuros = [
+        pool().submit(renderizar_lote, pendientes[tarea[0]][0], [pendientes[indice][1] for indice in tarea])
+        for tarea in tareas
+    ]
+    ubicacion = {indice: (numero, posicion) for numero, tarea in enumerate(tareas) for posicion, indice in enumerate(tarea)}
+
+    # Los resultados se entregan en el orden pedido, no en el de las tareas
+    resultados = {}
+    for indice in range(len(pendientes)):
+        numero, posicion = ubicacion[indice]
+        if numero not in resultados:
+            try:
+                resultados[numero] = futuros[numero].result()
+            except (BrokenProcessPool, CancelledError):
+                # Un proceso murió: se descarta el pool y esta tarea se hace aquí
+                _reiniciar_pool()
+                resultados[numero] = [renderizar(*pendientes[i]) for i in tareas[numero]]
+        yield resultados[numero][posicion]
+        if posicion == len(tareas[numero]) - 1:
+            # La tarea ya se entregó completa
+            del resultados[numero]
+
+
+_pool = None
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        # forkserver: los procesos no heredan hilos ni conexiones del servidor
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'PDF_PROCESOS', None),
+            mp_context=multiprocessing.get_context('forkserver'),
+        )
+    return _pool
+
+
+def _reiniciar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def _monto(valor):
+    return f'{valor:,.2f}'
+
+
+class _Salida(io.RawIOBase):
+    """Destino no posicionable de zipfile que acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.buffer += datos
+        return len(datos)
+
+    def vaciar(self):
+        datos = bytes(self.buffer)
+        self.buffer.clear()
+        return datos
@@ -1,8 +1,260 @@
+from functools import cached_property
 from rest_framework import serializers
-from django.db import transaction
-from .models import Factura, DetalleFactura, Cotizacion, DetalleCotizacion
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, models, transaction
+from django.utils import timezone
+from comprobantes.models import TipoComprobante
+from comprobantes.ncf import reclamar_ncf
+from core.middleware import get_current_user
+from productos.models import Producto
+from reportes.ventas import cambio_en_ventas, registrar_factura
+from .models import Factura, DetalleFactura, Cotizacion, DetalleCotizacion, EstadoFactura, TipoDocumento
+from .numeracion import reservar_numero
+from .totales import calcular_totales, preparar_linea, recalcular_linea, subtotal_linea, tasa_de_producto
 
-class FacturaSerializer(serializers.ModelSerializer):
+# Campos de las líneas que calcula el servidor; si el cliente los envía se ignoran
+CAMPOS_CALCULADOS = ('id', 'subtotal', 'tasa_itbis')
+# Campos de las líneas que el cliente puede enviar
+CAMPOS_LINEA = ('producto', 'descripcion', 'cantidad', 'precio_unitario')
+# Campos que toda línea nueva debe traer
+CAMPOS_LINEA_REQUERIDOS = ('producto', 'cantidad', 'precio_unitario')
+SIN_NCF = ('No hay comprobantes disponibles para el tipo de comprobante seleccionado. '
+           'Debe crear una serie de comprobantes antes de activar la factura.')
+
+
+def asignar_ncf(factura):
+    """
+    Reclama atómicamente el siguiente NCF libre para la factura y avanza el
+    numero_actual de su serie.
+    """
+    reclamado = reclamar_ncf(factura.tipo_comprobante_id, factura.pk, factura.cliente_id, factura.id_empresa_id)
+    if reclamado is None:
+        raise serializers.ValidationError({'ncf_asignado': SIN_NCF})
+    # fecha_actualizacion se fija a mano porque update() no pasa por auto_now
+    Factura.objects.filter(pk=factura.pk).update(ncf_asignado_id=reclamado.id, fecha_actualizacion=timezone.now())
+    factura.ncf_asignado_id = reclamado.id
+
+
+def copiar_lineas_cotizacion(cotizacion, factura):
+    """
+    Copia las líneas de la cotización a la factura con un solo
+    INSERT ... SELECT, sin traerlas a Python, y devuelve cuántas copió
+    """
+    campos = ('producto', 'descripcion', 'cantidad', 'precio_unitario', 'subtotal', 'tasa_itbis')
+    nombre = connection.ops.quote_name
+
+    def columnas(modelo):
+        return ', '.join(nombre(modelo._meta.get_field(campo).column) for campo in campos)
+
+    origen = DetalleCotizacion._meta
+    destino = DetalleFactura._meta
+    sql = (
+        f"INSERT INTO {nombre(destino.db_table)} "
+        f"({nombre(destino.get_field('factura').column)}, {nombre(destino.get_field('id_empresa').column)}, "
+        f"{columnas(DetalleFactura)}) "
+        f"SELECT %s, %s, {columnas(DetalleCotizacion)} FROM {nombre(origen.db_table)} "
+        f"WHERE {nombre(origen.get_field('cotizacion').column)} = %s ORDER BY {nombre(origen.pk.column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [factura.pk, factura.id_empresa_id, cotizacion.pk])
+        return cursor.rowcount
+
+
+def limitar_a_empresa(fields, nombres, empresa_id):
+    """
+    Restringe a la empresa el queryset de las llaves foráneas ``nombres``,
+    así un id de otra empresa se rechaza como inexistente
+    """
+    for nombre in nombres:
+        campo = fields.get(nombre)
+        if isinstance(campo, serializers.PrimaryKeyRelatedField) and campo.queryset is not None:
+            campo.queryset = campo.queryset.model.objects.de_empresa(empresa_id)
+    return fields
+
+
+class DocumentoMixin:
+    """Lógica compartida por los serializers de facturas y cotizaciones: empresa y líneas"""
+
+    # Modelo de las líneas del documento; cada serializer define el suyo
+    modelo_linea = None
+    # Relaciones que deben ser de la misma empresa que el documento
+    relaciones_empresa = ('cliente', 'tipo_comprobante')
+
+    def get_fields(self):
+        return limitar_a_empresa(super().get_fields(), self.relaciones_empresa, self._empresa_id())
+
+    def _empresa_id(self):
+        """Empresa del documento: la del que se edita o la del usuario que lo crea"""
+        if isinstance(self.instance, models.Model):
+            return self.instance.id_empresa_id
+        return getattr(get_current_user(), 'empresa_id', None)
+
+    def _empresa_documento(self, validated_data, instance=None):
+        """
+        Determina la empresa del documento antes de guardarlo, ya que la
+        numeración es por empresa, y la deja fijada en ``validated_data``.
+        """
+        empresa = instance.id_empresa if instance else None
+        if empresa is None:
+            user = get_current_user()
+            empresa = getattr(user, 'empresa', None)
+        if empresa is None:
+            raise serializers.ValidationError({'id_empresa': 'No se pudo determinar la empresa del documento'})
+        validated_data['id_empresa'] = empresa
+        return empresa
+
+    def _resolver_productos(self, detalles, campo):
+        """
+        Reemplaza el ID de producto de cada línea por su instancia usando una
+        sola consulta, y reporta todos los productos inexistentes en un solo error.
+        """
+        self._validar_campos_lineas(detalles, campo)
+        ids = set()
+        for detalle in detalles:
+            producto = detalle.get('producto')
+            # Una línea existente puede omitir el producto si no lo cambia
+            if isinstance(producto, Producto) or ('producto' not in detalle and detalle.get('id')):
+                continue
+            try:
+                ids.add(int(producto))
+            except (TypeError, ValueError):
+                raise serializers.ValidationError({campo: f'Producto inválido: {producto}'})
+
+        productos = self._buscar_productos(ids)
+        faltantes = sorted(ids - productos.keys())
+        if faltantes:
+            raise serializers.ValidationError({
+                campo: f"Productos no encontrados: {', '.join(str(id) for id in faltantes)}"
+            })
+
+        for detalle in detalles:
+            if 'producto' in detalle and not isinstance(detalle['producto'], Producto):
+                detalle['producto'] = productos[int(detalle['producto'])]
+        return detalles
+
+    def _validar_campos_lineas(self, detalles, campo):
+        """
+        Rechaza las líneas con campos que no se pueden escribir, a las que les
+        falta un campo obligatorio o con valores inválidos, y reemplaza cada
+        valor por el que limpia el campo del modelo de la línea. Todos los
+        errores se reportan juntos, por índice de línea.
+        """
+        meta = self.modelo_linea._meta
+        errores = {}
+        for indice, detalle in enumerate(detalles):
+            errores_linea = {}
+            for nombre in sorted(detalle.keys() - set(CAMPOS_LINEA) - set(CAMPOS_CALCULADOS)):
+                errores_linea[nombre] = ['Campo desconocido.']
+            if detalle.get('id') in (None, ''):
+                for nombre in CAMPOS_LINEA_REQUERIDOS:
+                    if nombre not in detalle:
+                        errores_linea[nombre] = ['Este campo es requerido.']
+            for nombre in ('descripcion', 'cantidad', 'precio_unitario'):
+                if nombre not in detalle:
+                    continue
+                try:
+                    detalle[nombre] = meta.get_field(nombre).clean(detalle[nombre], None)
+                except DjangoValidationError as e:
+                    errores_linea[nombre] = e.messages
+            if errores_linea:
+                errores[indice] = errores_linea
+        if errores:
+            raise serializers.ValidationError({campo: errores})
+
+    def _buscar_productos(self, ids):
+        # Solo los productos de la empresa del documento
+        return Producto.objects.de_empresa(self._empresa_id()).in_bulk(ids)
+
+    def _preparar_lineas(self, detalles):
+        """Calcula subtotal y tasa de cada línea nueva y devuelve los totales del documento"""
+        for detalle in detalles:
+            preparar_linea(detalle)
+        return calcular_totales((detalle['subtotal'], detalle['tasa_itbis']) for detalle in detalles)
+
+    def _crear_detalles(self, modelo, campo_padre, padre, detalles):
+        """Inserta todas las líneas, ya preparadas, con un solo bulk_create"""
+        return modelo.objects.bulk_create(self._construir_detalles(modelo, campo_padre, padre, detalles))
+
+    def _construir_detalles(self, modelo, campo_padre, padre, detalles):
+        """Instancias sin guardar de las líneas; ``padre`` puede no tener id todavía"""
+        # bulk_create no llama a save(), así que la empresa se toma del documento
+        lineas = []
+        for detalle in detalles:
+            linea = modelo(**{campo: valor for campo, valor in detalle.items() if campo != 'id'})
+            setattr(linea, campo_padre, padre)
+            if not linea.id_empresa_id:
+                linea.id_empresa_id = padre.id_empresa_id
+            lineas.append(linea)
+        return lineas
+
+    def _sincronizar_detalles(self, modelo, campo_padre, padre, detalles, campo):
+        """
+        Compara las líneas recibidas con las existentes por ``id`` y aplica solo
+        la diferencia: un bulk_create para las nuevas, un bulk_update con los
+        campos que cambiaron y un solo DELETE ... WHERE id IN para las quitadas.
+        Devuelve los totales del documento con las líneas resultantes.
+        """
+        existentes = {linea.id: linea for linea in modelo.objects.filter(**{campo_padre: padre})}
+
+        nuevas = []
+        modificadas = []
+        campos_modificados = set()
+        conservadas = set()
+        for detalle in detalles:
+            linea_id = detalle.get('id')
+            if linea_id in (None, ''):
+                nuevas.append(detalle)
+                continue
+            try:
+                linea = existentes[int(linea_id)]
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError({campo: f'La línea {linea_id} no pertenece a este documento'})
+            conservadas.add(linea.id)
+
+            cambios = self._aplicar_cambios(linea, detalle)
+            cambios += recalcular_linea(linea, cambios)
+            if cambios:
+                modificadas.append(linea)
+                campos_modificados.update(cambios)
+
+        eliminadas = existentes.keys() - conservadas
+        if eliminadas:
+            modelo.objects.filter(id__in=eliminadas).delete()
+        if modificadas:
+            modelo.objects.bulk_update(modificadas, sorted(campos_modificados))
+        if nuevas:
+            self._preparar_lineas(nuevas)
+            self._crear_detalles(modelo, campo_padre, padre, nuevas)
+        return calcular_totales(
+            [(existentes[linea_id].subtotal, existentes[linea_id].tasa_itbis) for linea_id in conservadas] +
+            [(detalle['subtotal'], detalle['tasa_itbis']) for detalle in nuevas]
+        )
+
+    def _aplicar_cambios(self, linea, detalle):
+        """Asigna a la línea los valores recibidos y devuelve los campos que cambiaron"""
+        cambios = []
+        for nombre, valor in detalle.items():
+            if nombre in CAMPOS_CALCULADOS:
+                continue
+            field = linea._meta.get_field(nombre)
+            if field.is_relation:
+                nuevo = valor.pk if hasattr(valor, 'pk') else valor
+                if getattr(linea, field.attname) != nuevo:
+                    setattr(linea, nombre, valor)
+                    cambios.append(nombre)
+                continue
+            try:
+                nuevo = field.to_python(valor)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({nombre: e.messages})
+            if getattr(linea, nombre) != nuevo:
+                setattr(linea, nombre, nuevo)
+                cambios.append(nombre)
+        return cambios
+
+
+class FacturaSerializer(DocumentoMixin, serializers.ModelSerializer):
+    modelo_linea = DetalleFactura
     detalle_facturas = serializers.ListField(
         child=serializers.DictField(),
         write_only=True,
@@ -13,15 +265,26 @@ class FacturaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Factura
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'numero_factura']
+        # La empresa la fija el servidor: la del usuario al crear, la misma al editar
+        read_only_fields = [
+            'fecha_creacion', 'fecha_actualizacion', 'numero_factura', 'subtotal', 'itbis', 'total', 'id_empresa',
+        ]
     
+    @cached_property
+    def _comprobante_serializer(self):
+        # Una sola instancia reutilizada para todas las filas de un listado
+        from comprobantes.serializers import ComprobanteSerializer
+        return ComprobanteSerializer()
+
     def get_ncf_asignado(self, obj):
         """Incluir información completa del NCF asignado"""
-        if obj.ncf_asignado:
-            from comprobantes.serializers import ComprobanteSerializer
-            return ComprobanteSerializer(obj.ncf_asignado).data
+        if obj.ncf_asignado_id:
+            return self._comprobante_serializer.to_representation(obj.ncf_asignado)
         return None
 
+    def validate_detalle_facturas(self, value):
+        return self._resolver_productos(value, 'detalle_facturas')
+
     def create(self, validated_data):
         # Extraer detalles si están presentes
         detalle_facturas_data = validated_data.pop('detalle_facturas', [])
@@ -30,28 +293,8 @@ class FacturaSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             # Solo generar número de factura si el estado es "Activa"
             if validated_data.get('estado') == 'Activa':
-                ultima_factura = Factura.objects.select_for_update().order_by('-numero_factura').first()
-                if ultima_factura and ultima_factura.numero_factura:
-                    validated_data['numero_factura'] = ultima_factura.numero_factura + 1
-                else:
-                    validated_data['numero_factura'] = 1
-                
-                # Asignar NCF automáticamente si no está asignado
-                if not validated_data.get('ncf_asignado'):
-                    from comprobantes.models import Comprobante
-                    comprobante_disponible = Comprobante.objects.filter(
-                        tipo_comprobante=validated_data['tipo_comprobante'],
-                        cliente__isnull=True,
-                        factura_asignada__isnull=True
-                    ).first()
-                    
-                    if comprobante_disponible:
-                        validated_data['ncf_asignado'] = comprobante_disponible
-                    else:
-                        raise serializers.ValidationError({
-                            'ncf_asignado': 'No hay comprobantes disponibles para el tipo de comprobante seleccionado. '
-                                           'Debe crear una serie de comprobantes antes de activar la factura.'
-                        })
+                empresa = self._empresa_documento(validated_data)
+                validated_data['numero_factura'] = reservar_numero(empresa.pk, TipoDocumento.FACTURA)
             else:
                 # Para otros estados, no asignar número de factura
                 validated_data['numero_factura'] = None
@@ -65,36 +308,31 @@ class FacturaSerializer(serializers.ModelSerializer):
                 from comprobantes.models import TipoComprobante
                 validated_data['tipo_comprobante'] = TipoComprobante.objects.get(id=validated_data['tipo_comprobante'])
             
+            # Los montos salen de las líneas, no de lo que envía el cliente
+            validated_data.update(self._preparar_lineas(detalle_facturas_data)._asdict())
+
             # Crear la factura
             factura = super().create(validated_data)
             
-            # Si se asignó un NCF, actualizar el comprobante con la factura y cliente
-            if factura.ncf_asignado:
-                comprobante = factura.ncf_asignado
-                comprobante.factura_asignada = factura
-                comprobante.cliente = factura.cliente
-                comprobante.save()
-                
-                # Actualizar numero_actual en la serie de comprobante
-                self._actualizar_numero_actual_serie(comprobante)
+            # Las facturas activas reciben su NCF una vez que existen
+            if factura.estado == 'Activa':
+                asignar_ncf(factura)
             
             # Crear los detalles
-            for detalle_data in detalle_facturas_data:
-                detalle_data['factura'] = factura
-                # Si producto viene como ID, obtener la instancia del producto
-                if 'producto' in detalle_data and isinstance(detalle_data['producto'], int):
-                    from productos.models import Producto
-                    detalle_data['producto'] = Producto.objects.get(id=detalle_data['producto'])
-                DetalleFactura.objects.create(**detalle_data)
+            self._crear_detalles(DetalleFactura, 'factura', factura, detalle_facturas_data)
+
+            # Si ya nace activa, cuenta en los reportes de ventas
+            registrar_factura(factura.pk)
             
             return factura
     
     def update(self, instance, validated_data):
         # Extraer detalles si están presentes
-        detalle_facturas_data = validated_data.pop('detalle_facturas', [])
+        detalle_facturas_data = validated_data.pop('detalle_facturas', None)
         
-        # Usar transacción para asegurar atomicidad
-        with transaction.atomic():
+        # Usar transacción para asegurar atomicidad; los reportes de ventas
+        # reciben la diferencia entre la factura antes y después del cambio
+        with transaction.atomic(), cambio_en_ventas(instance.pk):
             # Si cliente viene como ID, obtener la instancia del cliente
             if 'cliente' in validated_data and isinstance(validated_data['cliente'], int):
                 from clientes.models import Cliente
@@ -106,84 +344,122 @@ class FacturaSerializer(serializers.ModelSerializer):
                 validated_data['tipo_comprobante'] = TipoComprobante.objects.get(id=validated_data['tipo_comprobante'])
             
             # Si se está cambiando el estado a "Activa" y no tiene número de factura, asignarlo
-            if (validated_data.get('estado') == 'Activa' and 
-                instance.estado != 'Activa' and 
-                not instance.numero_factura):
-                ultima_factura = Factura.objects.select_for_update().order_by('-numero_factura').first()
-                if ultima_factura and ultima_factura.numero_factura:
-                    validated_data['numero_factura'] = ultima_factura.numero_factura + 1
-                else:
-                    validated_data['numero_factura'] = 1
-                
-                # Asignar NCF automáticamente si no está asignado
-                if not validated_data.get('ncf_asignado') and not instance.ncf_asignado:
-                    from comprobantes.models import Comprobante
-                    comprobante_disponible = Comprobante.objects.filter(
-                        tipo_comprobante=instance.tipo_comprobante,
-                        cliente__isnull=True,
-                        factura_asignada__isnull=True
-                    ).first()
-                    
-                    if comprobante_disponible:
-                        validated_data['ncf_asignado'] = comprobante_disponible
-                    else:
-                        raise serializers.ValidationError({
-                            'ncf_asignado': 'No hay comprobantes disponibles para el tipo de comprobante seleccionado. '
-                                           'Debe crear una serie de comprobantes antes de activar la factura.'
-                        })
+            activando = (validated_data.get('estado') == 'Activa' and
+                         instance.estado != 'Activa' and
+                         not instance.numero_factura)
+            if activando:
+                empresa = self._empresa_documento(validated_data, instance)
+                validated_data['numero_factura'] = reservar_numero(empresa.pk, TipoDocumento.FACTURA)
             
+            # Si se enviaron detalles, aplicar solo las diferencias con los existentes;
+            # los totales se guardan junto con el resto de la factura
+            if detalle_facturas_data is not None:
+                validated_data.update(self._sincronizar_detalles(
+                    DetalleFactura, 'factura', instance, detalle_facturas_data, 'detalle_facturas'
+                )._asdict())
+
             # Actualizar la factura
             factura = super().update(instance, validated_data)
             
-            # Si se asignó un NCF, actualizar el comprobante con la factura y cliente
-            if factura.ncf_asignado and not factura.ncf_asignado.factura_asignada:
-                comprobante = factura.ncf_asignado
-                comprobante.factura_asignada = factura
-                comprobante.cliente = factura.cliente
-                comprobante.save()
-                
-                # Actualizar numero_actual en la serie de comprobante
-                self._actualizar_numero_actual_serie(comprobante)
-            
-            # Si hay detalles, eliminar los existentes y crear los nuevos
-            if detalle_facturas_data:
-                DetalleFactura.objects.filter(factura=factura).delete()
-                for detalle_data in detalle_facturas_data:
-                    detalle_data['factura'] = factura
-                    # Si producto viene como ID, obtener la instancia del producto
-                    if 'producto' in detalle_data and isinstance(detalle_data['producto'], int):
-                        from productos.models import Producto
-                        detalle_data['producto'] = Producto.objects.get(id=detalle_data['producto'])
-                    DetalleFactura.objects.create(**detalle_data)
+            # Asignar NCF automáticamente si no está asignado
+            if activando and not factura.ncf_asignado_id:
+                asignar_ncf(factura)
             
             return factura
-    
-    def _actualizar_numero_actual_serie(self, comprobante):
-        """
-        Actualiza el numero_actual de la serie de comprobante basándose en el número del comprobante usado.
-        """
-        from comprobantes.models import SerieComprobante
-        
-        # Buscar la serie de comprobante que contiene este comprobante
-        serie = SerieComprobante.objects.filter(
-            tipo_comprobante=comprobante.tipo_comprobante,
-            desde__lte=comprobante.numero_comprobante,
-            hasta__gte=comprobante.numero_comprobante
-        ).first()
-        
-        if serie:
-            # Actualizar numero_actual al número del comprobante usado
-            serie.numero_actual = comprobante.numero_comprobante
-            serie.save()
-        
 
-class DetalleFacturaSerializer(serializers.ModelSerializer):
+
+class RelacionPrecargada(serializers.Field):
+    """
+    Llave foránea que se resuelve contra un diccionario ``{id: instancia}``
+    del contexto en lugar de consultar la base de datos
+    """
+    default_error_messages = {
+        'does_not_exist': 'Clave primaria "{pk_value}" inválida - objeto no existe.',
+        'incorrect_type': 'Tipo incorrecto. Se esperaba valor de clave primaria y se recibió {data_type}.',
+    }
+
+    def __init__(self, clave, **kwargs):
+        self.clave = clave
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context[self.clave][int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+    def to_representation(self, value):
+        return value.pk
+
+
+class FacturaLoteSerializer(FacturaSerializer):
+    """
+    Valida cada factura de ``POST /api/facturas/batch/`` sin consultas: los
+    clientes, tipos de comprobante y productos del lote llegan precargados
+    en el contexto (ver ``facturas.lote``), ya restringidos a la empresa.
+    """
+    cliente = RelacionPrecargada('clientes')
+    tipo_comprobante = RelacionPrecargada('tipos_comprobante')
+
+    class Meta(FacturaSerializer.Meta):
+        fields = None
+        # La empresa y la numeración las fija el lote completo
+        exclude = ['id_empresa']
+        validators = []
+
+    def _buscar_productos(self, ids):
+        return self.context['productos']
+
+
+class LineaMixin:
+    """
+    Subtotal y tasa de ITBIS de las líneas que se crean o editan una por una.
+    El documento y el producto se buscan solo entre los de la empresa del
+    usuario, y la línea toma la empresa de su documento.
+    """
+    # Llave foránea al documento de la línea; cada serializer define la suya
+    campo_documento = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        usuario = get_current_user()
+        for nombre in (self.campo_documento, 'producto'):
+            campo = fields[nombre]
+            campo.queryset = campo.queryset.model.objects.del_usuario(usuario)
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.instance is None or self.campo_documento in attrs or 'producto' in attrs:
+            documento = attrs.get(self.campo_documento) or getattr(self.instance, self.campo_documento)
+            producto = attrs.get('producto') or self.instance.producto
+            if producto.id_empresa_id != documento.id_empresa_id:
+                raise serializers.ValidationError({'producto': 'El producto no pertenece a la empresa del documento'})
+            attrs['id_empresa'] = documento.id_empresa
+        if self.instance is None:
+            return preparar_linea(attrs)
+        attrs['subtotal'] = subtotal_linea(
+            attrs.get('cantidad', self.instance.cantidad), attrs.get('precio_unitario', self.instance.precio_unitario)
+        )
+        if 'producto' in attrs:
+            attrs['tasa_itbis'] = tasa_de_producto(attrs['producto'])
+        return attrs
+
+
+class DetalleFacturaSerializer(LineaMixin, serializers.ModelSerializer):
+    campo_documento = 'factura'
+
     class Meta:
         model = DetalleFactura
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
+        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'subtotal', 'tasa_itbis', 'id_empresa']
 
-class CotizacionSerializer(serializers.ModelSerializer):
+class CotizacionSerializer(DocumentoMixin, serializers.ModelSerializer):
+    modelo_linea = DetalleCotizacion
     detalle_cotizaciones = serializers.ListField(
         child=serializers.DictField(),
         write_only=True,
@@ -193,7 +469,12 @@ class CotizacionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cotizacion
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'numero_cotizacion']
+        read_only_fields = [
+            'fecha_creacion', 'fecha_actualizacion', 'numero_cotizacion', 'subtotal', 'itbis', 'total', 'id_empresa',
+        ]
+
+    def validate_detalle_cotizaciones(self, value):
+        return self._resolver_productos(value, 'detalle_cotizaciones')
     
     def create(self, validated_data):
         # Extraer detalles si están presentes
@@ -201,52 +482,101 @@ class CotizacionSerializer(serializers.ModelSerializer):
         
         # Usar transacción para asegurar atomicidad
         with transaction.atomic():
-            # Generar número de cotización automáticamente
-            ultima_cotizacion = Cotizacion.objects.select_for_update().order_by('-numero_cotizacion').first()
-            if ultima_cotizacion:
-                validated_data['numero_cotizacion'] = ultima_cotizacion.numero_cotizacion + 1
-            else:
-                validated_data['numero_cotizacion'] = 1
+            # Generar número de cotización automáticamente con la secuencia de la empresa
+            empresa = self._empresa_documento(validated_data)
+            validated_data['numero_cotizacion'] = reservar_numero(empresa.pk, TipoDocumento.COTIZACION)
             
+            # Los montos salen de las líneas, no de lo que envía el cliente
+            validated_data.update(self._preparar_lineas(detalle_cotizaciones_data)._asdict())
+
             # Crear la cotización
             cotizacion = super().create(validated_data)
             
             # Crear los detalles
-            for detalle_data in detalle_cotizaciones_data:
-                detalle_data['cotizacion'] = cotizacion
-                # Si producto viene como ID, obtener la instancia del producto
-                if 'producto' in detalle_data and isinstance(detalle_data['producto'], int):
-                    from productos.models import Producto
-                    detalle_data['producto'] = Producto.objects.get(id=detalle_data['producto'])
-                DetalleCotizacion.objects.create(**detalle_data)
+            self._crear_detalles(DetalleCotizacion, 'cotizacion', cotizacion, detalle_cotizaciones_data)
             
             return cotizacion
     
     def update(self, instance, validated_data):
         # Extraer detalles si están presentes
-        detalle_cotizaciones_data = validated_data.pop('detalle_cotizaciones', [])
+        detalle_cotizaciones_data = validated_data.pop('detalle_cotizaciones', None)
         
         # Usar transacción para asegurar atomicidad
         with transaction.atomic():
+            # Si se enviaron detalles, aplicar solo las diferencias con los existentes;
+            # los totales se guardan junto con el resto de la cotización
+            if detalle_cotizaciones_data is not None:
+                validated_data.update(self._sincronizar_detalles(
+                    DetalleCotizacion, 'cotizacion', instance, detalle_cotizaciones_data, 'detalle_cotizaciones'
+                )._asdict())
+
             # Actualizar la cotización
             cotizacion = super().update(instance, validated_data)
             
-            # Si hay detalles, eliminar los existentes y crear los nuevos
-            if detalle_cotizaciones_data:
-                DetalleCotizacion.objects.filter(cotizacion=cotizacion).delete()
-                for detalle_data in detalle_cotizaciones_data:
-                    detalle_data['cotizacion'] = cotizacion
-                    # Si producto viene como ID, obtener la instancia del producto
-                    if 'producto' in detalle_data and isinstance(detalle_data['producto'], int):
-                        from productos.models import Producto
-                        detalle_data['producto'] = Producto.objects.get(id=detalle_data['producto'])
-                    DetalleCotizacion.objects.create(**detalle_data)
-            
             return cotizacion
 
-class DetalleCotizacionSerializer(serializers.ModelSerializer):
+class FacturarCotizacionSerializer(serializers.Serializer):
+    """
+    Convierte la cotización de ``context['cotizacion']`` en una factura:
+    copia la cabecera y sus montos ya calculados, copia las líneas con
+    ``copiar_lineas_cotizacion`` y, si se pide ``estado=Activa``, numera la
+    factura y reclama su NCF, todo en una transacción y con una cantidad de
+    consultas que no depende de las líneas.
+    """
+    tipo_comprobante = serializers.PrimaryKeyRelatedField(queryset=TipoComprobante.objects.all())
+    estado = serializers.ChoiceField(
+        choices=[EstadoFactura.BORRADOR, EstadoFactura.PENDIENTE, EstadoFactura.ACTIVA],
+        default=EstadoFactura.BORRADOR,
+    )
+    fecha_emision = serializers.DateField(required=False)
+    fecha_vencimiento = serializers.DateField(required=False)
+
+    def validate_tipo_comprobante(self, value):
+        if value.id_empresa_id != self.context['cotizacion'].id_empresa_id:
+            raise serializers.ValidationError('El tipo de comprobante no pertenece a la empresa de la cotización')
+        return value
+
+    def validate(self, attrs):
+        cotizacion = self.context['cotizacion']
+        if cotizacion.anulado:
+            raise serializers.ValidationError('No se puede facturar una cotización anulada')
+        if attrs['estado'] == EstadoFactura.ACTIVA and not cotizacion.id_empresa_id:
+            raise serializers.ValidationError({'estado': 'La cotización no tiene empresa para numerar la factura'})
+        # Por defecto se emite hoy con el mismo plazo que tenía la cotización
+        attrs.setdefault('fecha_emision', timezone.localdate())
+        attrs.setdefault(
+            'fecha_vencimiento', attrs['fecha_emision'] + (cotizacion.fecha_vencimiento - cotizacion.fecha_emision)
+        )
+        if attrs['fecha_vencimiento'] < attrs['fecha_emision']:
+            raise serializers.ValidationError({'fecha_vencimiento': 'Debe ser igual o posterior a fecha_emision'})
+        return attrs
+
+    def create(self, validated_data):
+        cotizacion = self.context['cotizacion']
+        activa = validated_data['estado'] == EstadoFactura.ACTIVA
+        with transaction.atomic():
+            factura = Factura.objects.create(
+                **validated_data,
+                cliente_id=cotizacion.cliente_id,
+                id_empresa_id=cotizacion.id_empresa_id,
+                subtotal=cotizacion.subtotal,
+                itbis=cotizacion.itbis,
+                total=cotizacion.total,
+                numero_factura=reservar_numero(cotizacion.id_empresa_id, TipoDocumento.FACTURA) if activa else None,
+            )
+            copiar_lineas_cotizacion(cotizacion, factura)
+            if activa:
+                asignar_ncf(factura)
+            # Si nace activa, cuenta en los reportes de ventas
+            registrar_factura(factura.pk)
+        return factura
+
+
+class DetalleCotizacionSerializer(LineaMixin, serializers.ModelSerializer):
+    campo_documento = 'cotizacion'
+
     class Meta:
         model = DetalleCotizacion
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
+        read_only_fields = ['fecha_creacion', 'fecha_actualizacion', 'subtotal', 'tasa_itbis', 'id_empresa']
         
\ No newline at end of file
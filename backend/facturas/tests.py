@@ -1,3 +1,1000 @@
+import datetime
+from decimal import Decimal
 from django.test import TestCase
+from clientes.models import Cliente
+from comprobantes.models import TipoComprobante, Comprobante
+from core.testing import QueryBudgetMixin, crear_usuario_con_empresa
+from productos.models import Producto
+from .models import Factura, DetalleFactura, Cotizacion, DetalleCotizacion
 
-# Create your tests here.
+
+class FacturaTestMixin:
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.empresa = self.usuario.empresa
+        self.hoy = datetime.date.today()
+        self.cliente = Cliente.objects.create(
+            nombre='Cliente', tipo_documento='1', numero_documento=1, tipo_ncf=1, id_empresa=self.empresa
+        )
+        self.producto = Producto.objects.create(
+            codigo='P1', nombre='Producto', descripcion='', precio_compra=Decimal('10.00'),
+            precio_venta=Decimal('100.00'), id_empresa=self.empresa
+        )
+        self.tipo = TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='Crédito fiscal', id_empresa=self.empresa)
+        self.siguiente = 0
+
+    def crear_factura(self, **kwargs):
+        datos = {
+            'tipo_comprobante': self.tipo, 'cliente': self.cliente, 'fecha_emision': self.hoy,
+            'fecha_vencimiento': self.hoy, 'total': Decimal('100.00'), 'estado': 'Borrador',
+            'id_empresa': self.empresa,
+        }
+        datos.update(kwargs)
+        return Factura.objects.create(**datos)
+
+
+class FacturaQueryBudgetTests(FacturaTestMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.get_budget_client(self.usuario)
+
+    def crear_facturas_con_ncf(self, n):
+        for _ in range(n):
+            self.siguiente += 1
+            comprobante = Comprobante.objects.create(
+                tipo_comprobante=self.tipo, numero_comprobante=self.siguiente,
+                fecha_emision=self.hoy, fecha_vencimiento=self.hoy, id_empresa=self.empresa
+            )
+            factura = self.crear_factura(numero_factura=self.siguiente, estado='Activa', ncf_asignado=comprobante)
+            DetalleFactura.objects.create(
+                factura=factura, producto=self.producto, cantidad=1,
+                precio_unitario=Decimal('100.00'), subtotal=Decimal('100.00'), id_empresa=self.empresa
+            )
+
+    def crear_cotizaciones(self, n):
+        for _ in range(n):
+            self.siguiente += 1
+            cotizacion = Cotizacion.objects.create(
+                numero_cotizacion=self.siguiente, cliente=self.cliente, fecha_emision=self.hoy,
+                fecha_vencimiento=self.hoy, total=Decimal('100.00'), id_empresa=self.empresa
+            )
+            DetalleCotizacion.objects.create(
+                cotizacion=cotizacion, producto=self.producto, cantidad=1,
+                precio_unitario=Decimal('100.00'), subtotal=Decimal('100.00'), id_empresa=self.empresa
+            )
+
+    def test_listado_facturas(self):
+        self.assertQueryBudget(self.client, '/api/facturas/', 1, self.crear_facturas_con_ncf)
+
+    def test_listado_detalle_facturas(self):
+        self.assertQueryBudget(self.client, '/api/detalle-facturas/', 1, self.crear_facturas_con_ncf)
+
+    def test_listado_cotizaciones(self):
+        self.assertQueryBudget(self.client, '/api/cotizaciones/', 1, self.crear_cotizaciones)
+
+    def test_listado_detalle_cotizaciones(self):
+        self.assertQueryBudget(self.client, '/api/detalle-cotizaciones/', 1, self.crear_cotizaciones)
+
+
+class DetallesBulkTests(FacturaTestMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.get_budget_client(self.usuario)
+
+    def datos_factura(self, lineas, producto_id=None):
+        return {
+            'tipo_comprobante': self.tipo.id, 'cliente': self.cliente.id, 'estado': 'Borrador',
+            'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy), 'total': '100.00',
+            'detalle_facturas': [
+                {'producto': producto_id or self.producto.id, 'cantidad': 1,
+                 'precio_unitario': '100.00', 'subtotal': '100.00'}
+                for _ in range(lineas)
+            ],
+        }
+
+    def test_crear_factura_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        conteos = []
+        for lineas in (1, 50):
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post('/api/facturas/', self.datos_factura(lineas), format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            conteos.append(len(contexto.captured_queries))
+        self.assertEqual(conteos[0], conteos[1])
+        self.assertEqual(DetalleFactura.objects.filter(id_empresa=self.empresa).count(), 51)
+
+    def test_productos_inexistentes_en_un_solo_error(self):
+        datos = self.datos_factura(1)
+        datos['detalle_facturas'] += [
+            {'producto': 9998, 'cantidad': 1, 'precio_unitario': '1.00', 'subtotal': '1.00'},
+            {'producto': 9999, 'cantidad': 1, 'precio_unitario': '1.00', 'subtotal': '1.00'},
+        ]
+        response = self.client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('9998, 9999', str(response.data['detalle_facturas']))
+        self.assertFalse(Factura.objects.exists())
+
+    def test_campos_desconocidos_en_lineas(self):
+        datos = self.datos_factura(1)
+        datos['detalle_facturas'][0]['foo'] = 1
+        response = self.client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('foo', str(response.data['detalle_facturas']))
+
+        factura_id = self.client.post('/api/facturas/', self.datos_factura(1), format='json').data['id']
+        linea = DetalleFactura.objects.get(factura_id=factura_id)
+        response = self.client.patch(f'/api/facturas/{factura_id}/', {
+            'detalle_facturas': [{'id': linea.id, 'cantidad': 3, 'foo': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        linea.refresh_from_db()
+        self.assertEqual(linea.cantidad, 1)
+
+    def test_valores_invalidos_en_lineas(self):
+        datos = self.datos_factura(2)
+        datos['detalle_facturas'][0]['cantidad'] = 'abc'
+        datos['detalle_facturas'][1]['precio_unitario'] = 'xyz'
+        response = self.client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        errores = str(response.data['detalle_facturas'])
+        self.assertIn('cantidad', errores)
+        self.assertIn('precio_unitario', errores)
+
+        datos = self.datos_factura(1)
+        del datos['detalle_facturas'][0]['cantidad']
+        response = self.client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cantidad', str(response.data['detalle_facturas']))
+        self.assertFalse(Factura.objects.exists())
+
+        factura_id = self.client.post('/api/facturas/', self.datos_factura(1), format='json').data['id']
+        linea = DetalleFactura.objects.get(factura_id=factura_id)
+        response = self.client.patch(f'/api/facturas/{factura_id}/', {
+            'detalle_facturas': [{'id': linea.id, 'precio_unitario': '1e400'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_productos_de_otra_empresa(self):
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        ajeno = Producto.objects.create(
+            codigo='AJ1', nombre='Ajeno', descripcion='', precio_compra=Decimal('1.00'),
+            precio_venta=Decimal('2.00'), id_empresa=otra
+        )
+        response = self.client.post('/api/facturas/', self.datos_factura(1, ajeno.id), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(ajeno.id), str(response.data['detalle_facturas']))
+        self.assertFalse(Factura.objects.exists())
+
+    def test_actualizar_solo_aplica_diferencias(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        response = self.client.post('/api/facturas/', self.datos_factura(3), format='json')
+        factura_id = response.data['id']
+        lineas = list(DetalleFactura.objects.filter(factura_id=factura_id).order_by('id'))
+
+        datos = self.datos_factura(0)
+        datos['detalle_facturas'] = [
+            {'id': lineas[0].id, 'producto': self.producto.id, 'cantidad': 5,
+             'precio_unitario': '100.00', 'subtotal': '500.00'},
+            {'id': lineas[1].id, 'producto': self.producto.id, 'cantidad': 1,
+             'precio_unitario': '100.00', 'subtotal': '100.00'},
+            {'producto': self.producto.id, 'cantidad': 2, 'precio_unitario': '50.00', 'subtotal': '100.00'},
+        ]
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.put(f'/api/facturas/{factura_id}/', datos, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        actuales = list(DetalleFactura.objects.filter(factura_id=factura_id).order_by('id'))
+        self.assertEqual([l.id for l in actuales[:2]], [lineas[0].id, lineas[1].id])
+        self.assertEqual(actuales[0].cantidad, 5)
+        self.assertEqual(len(actuales), 3)
+        self.assertFalse(DetalleFactura.objects.filter(id=lineas[2].id).exists())
+
+        sql = [q['sql'] for q in contexto.captured_queries]
+        actualizaciones = [q for q in sql if q.startswith('UPDATE "facturas_detallefactura"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertNotIn('"descripcion"', actualizaciones[0])
+
+
+class NumeracionTests(FacturaTestMixin, TestCase):
+    def test_secuencias_independientes_por_empresa(self):
+        from .numeracion import reservar_numero, reservar_numeros
+        from .models import TipoDocumento
+
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        self.crear_factura(numero_factura=7, estado='Activa')
+
+        self.assertEqual(reservar_numero(self.empresa.pk, TipoDocumento.FACTURA), 8)
+        self.assertEqual(reservar_numero(otra.pk, TipoDocumento.FACTURA), 1)
+        self.assertEqual(list(reservar_numeros(self.empresa.pk, TipoDocumento.FACTURA, 3)), [9, 10, 11])
+        self.assertEqual(reservar_numero(self.empresa.pk, TipoDocumento.COTIZACION), 1)
+        self.assertEqual(reservar_numero(otra.pk, TipoDocumento.FACTURA), 2)
+
+    def test_otros_motores_usan_update_sin_returning(self):
+        from unittest import mock
+        from django.db import connection
+        from .numeracion import reservar_numeros
+        from .models import TipoDocumento
+
+        reservar_numeros(self.empresa.pk, TipoDocumento.FACTURA, 2)
+        # MariaDB admite RETURNING en INSERT pero no en UPDATE
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(list(reservar_numeros(self.empresa.pk, TipoDocumento.FACTURA, 2)), [3, 4])
+
+    def test_activar_asigna_numero_y_ncf(self):
+        from rest_framework.test import APIClient
+
+        comprobante = Comprobante.objects.create(
+            tipo_comprobante=self.tipo, numero_comprobante=1, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy, id_empresa=self.empresa
+        )
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        datos = {
+            'tipo_comprobante': self.tipo.id, 'cliente': self.cliente.id, 'estado': 'Activa',
+            'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy), 'total': '0.00',
+        }
+        response = client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['numero_factura'], 1)
+        self.assertEqual(response.data['ncf_asignado']['id'], comprobante.id)
+
+        response = client.post('/api/facturas/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ncf_asignado', response.data)
+
+
+class AislamientoEmpresaTests(FacturaTestMixin, TestCase):
+    def test_no_se_ven_documentos_de_otra_empresa(self):
+        from rest_framework.test import APIClient
+
+        propia = self.crear_factura(numero_factura=1)
+        otro = crear_usuario_con_empresa('otro', '101000002')
+        cliente = Cliente.objects.create(
+            nombre='Ajeno', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=otro.empresa
+        )
+        ajena = self.crear_factura(numero_factura=1, cliente=cliente, id_empresa=otro.empresa)
+        DetalleFactura.objects.create(
+            factura=ajena, producto=self.producto, cantidad=1,
+            precio_unitario=Decimal('100.00'), subtotal=Decimal('100.00'), id_empresa=otro.empresa
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        self.assertEqual([f['id'] for f in client.get('/api/facturas/').data['results']], [propia.id])
+        self.assertEqual(client.get(f'/api/facturas/{ajena.id}/').status_code, 404)
+        self.assertEqual(client.get(f'/api/detalle-facturas/by_factura/?factura={ajena.id}').data, [])
+        self.assertEqual([c['id'] for c in client.get('/api/clientes/').data], [self.cliente.id])
+
+    def test_sin_empresa_no_se_ve_nada(self):
+        from rest_framework.test import APIClient
+        from accounts.models import Usuario
+
+        self.crear_factura(numero_factura=1)
+        client = APIClient()
+        for url in ('/api/facturas/', '/api/clientes/', '/api/productos/', '/api/cotizaciones/'):
+            self.assertEqual(client.get(url).status_code, 401, url)
+
+        client.force_authenticate(Usuario.objects.create_user(username='suelto', password='clave-segura'))
+        self.assertEqual(client.get('/api/facturas/').data['results'], [])
+        self.assertEqual(client.get('/api/clientes/').data, [])
+
+        # Solo un superusuario explícito ve todas las empresas
+        client.force_authenticate(Usuario.objects.create_superuser(username='admin', password='clave-segura'))
+        self.assertEqual(len(client.get('/api/facturas/').data['results']), 1)
+
+    def test_no_se_usan_clientes_tipos_ni_empresas_ajenas(self):
+        from rest_framework.test import APIClient
+        from comprobantes.models import SerieComprobante
+
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        cliente_ajeno = Cliente.objects.create(
+            nombre='Ajeno', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=otra
+        )
+        tipo_ajeno = TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='Ajeno', id_empresa=otra)
+        SerieComprobante.objects.create(
+            tipo_comprobante=tipo_ajeno, desde=1, hasta=10, numero_actual=0,
+            fecha_vencimiento=self.hoy, id_empresa=otra
+        )
+        datos = {
+            'cliente': self.cliente.id, 'tipo_comprobante': self.tipo.id, 'fecha_emision': str(self.hoy),
+            'fecha_vencimiento': str(self.hoy), 'estado': 'Activa',
+            'detalle_facturas': [{'producto': self.producto.id, 'cantidad': 1, 'precio_unitario': '100.00'}],
+        }
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        for campo, valor in (('tipo_comprobante', tipo_ajeno.id), ('cliente', cliente_ajeno.id)):
+            response = client.post('/api/facturas/', {**datos, campo: valor}, format='json')
+            self.assertEqual(response.status_code, 400, campo)
+            self.assertIn(campo, response.data)
+        self.assertFalse(Comprobante.objects.exists())
+
+        # La empresa enviada se ignora: el documento queda en la del usuario
+        response = client.post('/api/facturas/', {**datos, 'estado': 'Borrador', 'id_empresa': otra.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        factura = Factura.objects.get(pk=response.data['id'])
+        self.assertEqual(factura.id_empresa, self.empresa)
+
+        response = client.patch(f'/api/facturas/{factura.id}/', {'tipo_comprobante': tipo_ajeno.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        # Aunque el tipo llegue sin filtrar, la serie de otra empresa no entrega NCF
+        from comprobantes.ncf import reclamar_ncf
+        self.assertIsNone(reclamar_ncf(tipo_ajeno.id, factura.id, self.cliente.id, self.empresa.id))
+        self.assertFalse(Comprobante.objects.exists())
+
+    def test_no_se_tocan_lineas_de_otra_empresa(self):
+        from rest_framework.test import APIClient
+
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        cliente_ajeno = Cliente.objects.create(
+            nombre='Ajeno', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=otra
+        )
+        producto_ajeno = Producto.objects.create(
+            codigo='AJ1', nombre='Ajeno', descripcion='', precio_compra=Decimal('1.00'),
+            precio_venta=Decimal('2.00'), id_empresa=otra
+        )
+        ajena = self.crear_factura(cliente=cliente_ajeno, id_empresa=otra)
+        linea_ajena = DetalleFactura.objects.create(
+            factura=ajena, producto=producto_ajeno, cantidad=1,
+            precio_unitario=Decimal('100.00'), subtotal=Decimal('100.00'), id_empresa=otra
+        )
+        cotizacion_ajena = Cotizacion.objects.create(
+            cliente=cliente_ajeno, fecha_emision=self.hoy, fecha_vencimiento=self.hoy, id_empresa=otra
+        )
+        propia = self.crear_factura()
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        linea = {'producto': self.producto.id, 'cantidad': 5, 'precio_unitario': '100.00'}
+        response = client.post('/api/detalle-facturas/', {**linea, 'factura': ajena.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('factura', response.data)
+        response = client.post('/api/detalle-cotizaciones/', {**linea, 'cotizacion': cotizacion_ajena.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cotizacion', response.data)
+        response = client.post(
+            '/api/detalle-facturas/', {**linea, 'factura': propia.id, 'producto': producto_ajeno.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('producto', response.data)
+
+        url = f'/api/detalle-facturas/{linea_ajena.id}/'
+        self.assertEqual(client.patch(url, {'cantidad': 5}, format='json').status_code, 404)
+        self.assertEqual(client.delete(url).status_code, 404)
+        # Una línea propia tampoco puede pasarse a la factura de otra empresa
+        response = client.post('/api/detalle-facturas/', {**linea, 'factura': propia.id}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['id_empresa'], self.empresa.id)
+        response = client.patch(
+            f"/api/detalle-facturas/{response.data['id']}/", {'factura': ajena.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        ajena.refresh_from_db()
+        self.assertEqual(ajena.total, Decimal('100.00'))
+        self.assertEqual(list(DetalleFactura.objects.filter(factura=ajena)), [linea_ajena])
+        self.assertFalse(cotizacion_ajena.detallecotizacion_set.exists())
+
+
+class LecturaAsyncTests(FacturaTestMixin, TestCase):
+    async def test_listado_y_detalle_asincronos(self):
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        def preparar():
+            otro = crear_usuario_con_empresa('otro', '101000002')
+            cliente = Cliente.objects.create(
+                nombre='Ajeno', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=otro.empresa
+            )
+            ajena = self.crear_factura(numero_factura=1, cliente=cliente, id_empresa=otro.empresa)
+            propias = [self.crear_factura(numero_factura=n) for n in (1, 2, 3)]
+            return ajena, propias, str(AccessToken.for_user(self.usuario))
+
+        ajena, propias, token = await sync_to_async(preparar)()
+        client = AsyncClient()
+        self.assertEqual((await client.get('/api/async/facturas/')).status_code, 401)
+
+        client.cookies['access_token'] = token
+        response = await client.get('/api/async/facturas/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        pagina = response.json()
+        self.assertEqual([f['id'] for f in pagina['results']], [propias[2].id, propias[1].id])
+        siguiente = await client.get(pagina['next'])
+        self.assertEqual([f['id'] for f in siguiente.json()['results']], [propias[0].id])
+
+        detalle = await client.get(f'/api/async/facturas/{propias[0].id}/')
+        self.assertEqual(detalle.json()['numero_factura'], 1)
+        self.assertEqual((await client.get(f'/api/async/facturas/{ajena.id}/')).status_code, 404)
+        self.assertEqual((await client.get('/api/async/facturas/?anulado=quizas')).status_code, 400)
+        self.assertEqual(len((await client.get('/api/async/clientes/')).json()), 1)
+
+
+class SincronizacionTests(FacturaTestMixin, TestCase):
+    def test_cambios_y_tombstones_desde_el_cursor(self):
+        import datetime as dt
+        from unittest import mock
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        # Los cambios ocurren fuera del margen de relectura alrededor del cursor
+        antes = timezone.now() - dt.timedelta(minutes=5)
+        with mock.patch('django.utils.timezone.now', return_value=antes):
+            vieja = self.crear_factura(numero_factura=1)
+            borrada = self.crear_factura(numero_factura=2)
+
+        inicial = client.get('/api/facturas/', {'updated_since': ''}).data
+        self.assertEqual({f['id'] for f in inicial['results']}, {vieja.id, borrada.id})
+        self.assertEqual(inicial['deleted'], [])
+
+        despues = timezone.now() + dt.timedelta(minutes=5)
+        with mock.patch('django.utils.timezone.now', return_value=despues):
+            nueva = self.crear_factura(numero_factura=3)
+            borrada_id = borrada.id
+            borrada.delete()
+
+        cambios = client.get('/api/facturas/', {'updated_since': inicial['cursor']}).data
+        self.assertEqual([f['id'] for f in cambios['results']], [nueva.id])
+        self.assertEqual(cambios['deleted'], [borrada_id])
+
+        self.assertEqual(client.get('/api/facturas/', {'updated_since': 'no-es-un-cursor'}).status_code, 400)
+        self.assertIn('results', client.get('/api/facturas/').data)
+
+    def test_sincronizacion_inicial_paginada(self):
+        import datetime as dt
+        from unittest import mock
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        antes = timezone.now() - dt.timedelta(minutes=5)
+        with mock.patch('django.utils.timezone.now', return_value=antes):
+            facturas = [self.crear_factura(numero_factura=n) for n in range(1, 6)]
+        esperados = [f.id for f in facturas]
+
+        pagina = client.get('/api/facturas/', {'updated_since': '', 'page_size': 2}).data
+        cursor, ids = pagina['cursor'], []
+        while True:
+            self.assertLessEqual(len(pagina['results']), 2)
+            self.assertEqual(pagina['cursor'], cursor)
+            ids += [f['id'] for f in pagina['results']]
+            if not pagina['next']:
+                break
+            if len(ids) == 2:
+                # Lo borrado mientras se recorren las páginas llega en el siguiente cambio
+                borrada = facturas[0]
+                borrada_id = borrada.id
+                with mock.patch('django.utils.timezone.now', return_value=timezone.now() + dt.timedelta(minutes=5)):
+                    borrada.delete()
+            pagina = client.get(pagina['next']).data
+        self.assertEqual(ids, esperados)
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + dt.timedelta(minutes=10)):
+            cambios = client.get('/api/facturas/', {'updated_since': cursor}).data
+        self.assertEqual(cambios['deleted'], [borrada_id])
+        self.assertIsNone(cambios['next'])
+
+        invalido = client.get('/api/facturas/', {'updated_since': '', 'inicio': 'x'})
+        self.assertEqual(invalido.status_code, 400)
+        self.assertIn('inicio', invalido.data)
+
+    def test_sin_empresa_no_recibe_tombstones(self):
+        import datetime as dt
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+        from accounts.models import Usuario
+        from core.sincronizacion import codificar_cursor
+
+        factura = self.crear_factura(numero_factura=1)
+        factura.delete()
+        client = APIClient()
+        client.force_authenticate(Usuario.objects.create_user(username='suelto', password='clave-segura'))
+        cursor = codificar_cursor(timezone.now() - dt.timedelta(minutes=5))
+        self.assertEqual(client.get('/api/facturas/', {'updated_since': cursor}).data['deleted'], [])
+
+
+class PdfTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear_con_lineas(self, numero, cantidad=1):
+        factura = self.crear_factura(numero_factura=numero)
+        DetalleFactura.objects.create(
+            factura=factura, producto=self.producto, cantidad=cantidad, descripcion='Instalación',
+            precio_unitario=Decimal('100.00'), subtotal=Decimal(100 * cantidad), id_empresa=self.empresa
+        )
+        return factura
+
+    def test_pdf_guardado_por_contenido(self):
+        from unittest import mock
+        from core import pdf
+
+        factura = self.crear_con_lineas(1)
+        url = f'/api/facturas/{factura.id}/pdf/'
+        with mock.patch('facturas.pdf.renderizar', wraps=pdf.renderizar) as renderizar:
+            primera = self.client.get(url)
+            segunda = self.client.get(url)
+        self.assertEqual(renderizar.call_count, 1)
+        contenido = b''.join(primera.streaming_content)
+        self.assertTrue(contenido.startswith(b'%PDF-1.4'))
+        self.assertEqual(contenido, b''.join(segunda.streaming_content))
+        self.assertIn('Factura_1.pdf', primera['Content-Disposition'])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 304)
+        DetalleFactura.objects.filter(factura=factura).update(cantidad=3, subtotal=Decimal('300.00'))
+        self.assertNotEqual(self.client.get(url)['ETag'], primera['ETag'])
+
+    def test_logo_escalado_en_la_plantilla(self):
+        import io
+        from django.core.files.base import ContentFile
+        from PIL import Image
+        from .pdf import LOGO_PIXELES, plantilla
+
+        imagen = io.BytesIO()
+        Image.new('RGBA', (2000, 1000), (5, 150, 105, 128)).save(imagen, 'PNG')
+        self.empresa.logo.save('logo.png', ContentFile(imagen.getvalue()))
+        cotizacion = Cotizacion.objects.create(
+            numero_cotizacion=4, cliente=self.cliente, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy, total=Decimal('0.00'), id_empresa=self.empresa
+        )
+
+        _, ancho, alto = plantilla(self.empresa, 'cotizacion').logo
+        self.assertEqual((ancho, alto), LOGO_PIXELES)
+        response = self.client.get(f'/api/cotizaciones/{cotizacion.id}/pdf/')
+        self.assertIn(b'/DCTDecode', b''.join(response.streaming_content))
+
+    def test_lote_en_zip(self):
+        import io
+        import zipfile
+        from .pdf import DOCUMENTOS_POR_TAREA
+
+        # Más de una tarea para que se rendericen en el pool de procesos
+        facturas = [self.crear_con_lineas(n, cantidad=n) for n in range(1, DOCUMENTOS_POR_TAREA + 3)]
+        guardada = facturas[0]
+        self.client.get(f'/api/facturas/{guardada.id}/pdf/')
+
+        ids = [f.id for f in reversed(facturas)]
+        response = self.client.post('/api/facturas/pdf-lote/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archivo.namelist(), [f'Factura_{f.numero_factura}.pdf' for f in reversed(facturas)])
+        individual = b''.join(self.client.get(f'/api/facturas/{facturas[1].id}/pdf/').streaming_content)
+        self.assertEqual(archivo.read('Factura_2.pdf'), individual)
+
+        otra = self.crear_factura(numero_factura=99, id_empresa=crear_usuario_con_empresa('otro', '101000002').empresa)
+        response = self.client.post('/api/facturas/pdf-lote/', {'ids': [guardada.id, otra.id]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['ids'], [otra.id])
+        self.assertEqual(self.client.post('/api/facturas/pdf-lote/', {'ids': 'todos'}, format='json').status_code, 400)
+
+    def test_lote_con_varias_empresas_usa_la_plantilla_de_cada_una(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from core.pdf import renderizar
+        from .pdf import DOCUMENTOS_POR_TAREA, _renderizar_varios, consulta_pdf, preparar
+
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        facturas = []
+        for n in range(1, DOCUMENTOS_POR_TAREA + 3):
+            factura = self.crear_con_lineas(n)
+            if n % 2:
+                Factura.objects.filter(pk=factura.pk).update(id_empresa=otra)
+            facturas.append(factura.pk)
+        documentos = consulta_pdf(Factura.objects.filter(pk__in=facturas).order_by('id'), 'factura')
+        pendientes = [preparar(documento, 'factura')[:2] for documento in documentos]
+        self.assertEqual(len({p.huella for p, _ in pendientes}), 2)
+
+        with ThreadPoolExecutor(2) as ejecutor, mock.patch('facturas.pdf.pool', return_value=ejecutor):
+            renderizados = list(_renderizar_varios(pendientes))
+        self.assertEqual(renderizados, [renderizar(p, datos) for p, datos in pendientes])
+
+
+class TotalesTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.reducido = Producto.objects.create(
+            codigo='P2', nombre='Reducido', descripcion='', precio_compra=Decimal('1.00'),
+            precio_venta=Decimal('100.00'), categoria_itbis='reducida', id_empresa=self.empresa
+        )
+        self.exento = Producto.objects.create(
+            codigo='P3', nombre='Exento', descripcion='', precio_compra=Decimal('1.00'),
+            precio_venta=Decimal('50.00'), categoria_itbis='exento', id_empresa=self.empresa
+        )
+
+    def totales(self, datos):
+        return tuple(Decimal(datos[campo]) for campo in ('subtotal', 'itbis', 'total'))
+
+    def test_calculo_por_categoria_ignora_montos_del_cliente(self):
+        response = self.client.post('/api/facturas/', {
+            'tipo_comprobante': self.tipo.id, 'cliente': self.cliente.id, 'estado': 'Borrador',
+            'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy), 'total': '1.00',
+            'detalle_facturas': [
+                {'producto': self.producto.id, 'cantidad': 3, 'precio_unitario': '33.33', 'subtotal': '1.00'},
+                {'producto': self.reducido.id, 'cantidad': 1, 'precio_unitario': '100.00'},
+                {'producto': self.exento.id, 'cantidad': 2, 'precio_unitario': '50.00'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        # 99.99 al 18% + 100 al 16% + 100 exento
+        self.assertEqual(self.totales(response.data), (Decimal('299.99'), Decimal('34.00'), Decimal('333.99')))
+        self.assertEqual(
+            sorted(DetalleFactura.objects.values_list('subtotal', 'tasa_itbis')),
+            [(Decimal('99.99'), Decimal('18.00')), (Decimal('100.00'), Decimal('0.00')),
+             (Decimal('100.00'), Decimal('16.00'))]
+        )
+
+    def test_editar_lineas_recalcula_los_totales(self):
+        response = self.client.post('/api/cotizaciones/', {
+            'cliente': self.cliente.id, 'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy),
+            'detalle_cotizaciones': [
+                {'producto': self.producto.id, 'cantidad': 1, 'precio_unitario': '100.00'},
+                {'producto': self.exento.id, 'cantidad': 1, 'precio_unitario': '50.00'},
+            ],
+        }, format='json')
+        cotizacion_id = response.data['id']
+        general, exenta = DetalleCotizacion.objects.filter(cotizacion_id=cotizacion_id).order_by('id')
+
+        # La tasa de una línea existente no cambia si luego cambia la categoría del producto
+        Producto.objects.filter(pk=self.producto.pk).update(categoria_itbis='exento')
+        response = self.client.patch(f'/api/cotizaciones/{cotizacion_id}/', {'detalle_cotizaciones': [
+            {'id': general.id, 'cantidad': 2},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.totales(response.data), (Decimal('200.00'), Decimal('36.00'), Decimal('236.00')))
+
+        response = self.client.post('/api/detalle-cotizaciones/', {
+            'cotizacion': cotizacion_id, 'producto': self.reducido.id, 'cantidad': 1,
+            'precio_unitario': '10.00', 'subtotal': '999.00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['subtotal'], '10.00')
+        cotizacion = Cotizacion.objects.get(pk=cotizacion_id)
+        self.assertEqual((cotizacion.subtotal, cotizacion.itbis, cotizacion.total),
+                         (Decimal('210.00'), Decimal('37.60'), Decimal('247.60')))
+        self.assertFalse(DetalleCotizacion.objects.filter(pk=exenta.pk).exists())
+
+
+class FacturarCotizacionTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear_cotizacion(self, lineas):
+        response = self.client.post('/api/cotizaciones/', {
+            'cliente': self.cliente.id, 'fecha_emision': str(self.hoy),
+            'fecha_vencimiento': str(self.hoy + datetime.timedelta(days=15)),
+            'detalle_cotizaciones': [
+                {'producto': self.producto.id, 'cantidad': i + 1, 'precio_unitario': '100.00', 'descripcion': f'L{i}'}
+                for i in range(lineas)
+            ],
+        }, format='json')
+        return Cotizacion.objects.get(pk=response.data['id'])
+
+    def test_copia_lineas_y_totales_en_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        conteos = []
+        for lineas in (2, 30):
+            cotizacion = self.crear_cotizacion(lineas)
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post(
+                    f'/api/cotizaciones/{cotizacion.id}/facturar/', {'tipo_comprobante': self.tipo.id}, format='json'
+                )
+            self.assertEqual(response.status_code, 201, response.data)
+            conteos.append(len(contexto.captured_queries))
+
+            factura = Factura.objects.get(pk=response.data['id'])
+            self.assertEqual((factura.subtotal, factura.itbis, factura.total),
+                             (cotizacion.subtotal, cotizacion.itbis, cotizacion.total))
+            self.assertEqual((factura.estado, factura.numero_factura), ('Borrador', None))
+            self.assertEqual(factura.fecha_vencimiento - factura.fecha_emision, datetime.timedelta(days=15))
+            self.assertEqual(
+                list(factura.detallefactura_set.order_by('id').values_list('descripcion', 'cantidad', 'subtotal', 'id_empresa')),
+                list(cotizacion.detallecotizacion_set.order_by('id').values_list('descripcion', 'cantidad', 'subtotal', 'id_empresa')),
+            )
+        self.assertEqual(conteos[0], conteos[1])
+
+    def test_activar_asigna_numero_y_ncf(self):
+        comprobante = Comprobante.objects.create(
+            tipo_comprobante=self.tipo, numero_comprobante=1, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy, id_empresa=self.empresa
+        )
+        cotizacion = self.crear_cotizacion(1)
+        response = self.client.post(f'/api/cotizaciones/{cotizacion.id}/facturar/', {
+            'tipo_comprobante': self.tipo.id, 'estado': 'Activa',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['numero_factura'], 1)
+        self.assertEqual(response.data['ncf_asignado']['id'], comprobante.id)
+
+        # Sin NCF disponible no queda ninguna factura a medias
+        response = self.client.post(f'/api/cotizaciones/{cotizacion.id}/facturar/', {
+            'tipo_comprobante': self.tipo.id, 'estado': 'Activa',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Factura.objects.count(), 1)
+
+        Cotizacion.objects.filter(pk=cotizacion.pk).update(anulado=True)
+        response = self.client.post(f'/api/cotizaciones/{cotizacion.id}/facturar/', {
+            'tipo_comprobante': self.tipo.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class LoteFacturasTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from comprobantes.models import SerieComprobante
+
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        SerieComprobante.objects.create(
+            tipo_comprobante=self.tipo, desde=1, hasta=100, numero_actual=0,
+            fecha_vencimiento=self.hoy, id_empresa=self.empresa
+        )
+
+    def factura(self, estado='Activa', lineas=2, **kwargs):
+        datos = {
+            'tipo_comprobante': self.tipo.id, 'cliente': self.cliente.id, 'estado': estado,
+            'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy),
+            'detalle_facturas': [
+                {'producto': self.producto.id, 'cantidad': 1, 'precio_unitario': '100.00'} for _ in range(lineas)
+            ],
+        }
+        datos.update(kwargs)
+        return datos
+
+    def test_resultado_por_factura_sin_atomicidad(self):
+        from reportes.models import VentaDiaria
+
+        ajeno = crear_usuario_con_empresa('otro', '101000002').empresa
+        cliente_ajeno = Cliente.objects.create(
+            nombre='Ajeno', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=ajeno
+        )
+        response = self.client.post('/api/facturas/batch/', {'atomico': False, 'facturas': [
+            self.factura(),
+            self.factura(estado='Borrador'),
+            self.factura(cliente=cliente_ajeno.id),
+            self.factura(detalle_facturas=[{'producto': self.producto.id, 'cantidad': 'x', 'precio_unitario': '1'}]),
+            self.factura(lineas=3),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['creadas'], response.data['con_errores']), (3, 2))
+        resultados = response.data['resultados']
+        self.assertEqual([r['indice'] for r in resultados], [0, 1, 2, 3, 4])
+        self.assertIn('cliente', resultados[2]['errores'])
+        self.assertIn('detalle_facturas', resultados[3]['errores'])
+        self.assertEqual(
+            [(r['numero_factura'], r['ncf']) for r in (resultados[0], resultados[1], resultados[4])],
+            [(1, 'B0100000001'), (None, None), (2, 'B0100000002')],
+        )
+
+        factura = Factura.objects.get(pk=resultados[4]['id'])
+        self.assertEqual((factura.subtotal, factura.itbis, factura.total), (Decimal('300.00'), Decimal('54.00'), Decimal('354.00')))
+        self.assertEqual(factura.ncf_asignado.factura_asignada_id, factura.id)
+        self.assertEqual(factura.detallefactura_set.filter(id_empresa=self.empresa).count(), 3)
+        dia = VentaDiaria.objects.get(id_empresa=self.empresa, fecha=self.hoy)
+        self.assertEqual((dia.facturas, dia.total), (2, Decimal('590.00')))
+
+    def test_atomico_no_crea_nada_si_alguna_falla(self):
+        from .numeracion import reservar_numero
+        from .models import TipoDocumento
+
+        response = self.client.post('/api/facturas/batch/', {'facturas': [
+            self.factura(), self.factura(tipo_comprobante=999),
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r['indice'] for r in response.data['resultados']], [1])
+        self.assertFalse(Factura.objects.exists())
+        self.assertEqual(reservar_numero(self.empresa.pk, TipoDocumento.FACTURA), 1)
+
+        # Sin NCF suficientes falla solo lo que no alcanza
+        Comprobante.objects.all().delete()
+        from comprobantes.models import SerieComprobante
+        SerieComprobante.objects.update(hasta=1)
+        response = self.client.post('/api/facturas/batch/', {'atomico': False, 'facturas': [
+            self.factura(), self.factura(),
+        ]}, format='json')
+        self.assertEqual(response.data['creadas'], 1)
+        self.assertIn('ncf_asignado', response.data['resultados'][1]['errores'])
+
+    def test_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        # La primera crea la secuencia de números y las filas de los resúmenes del día
+        self.client.post('/api/facturas/batch/', {'facturas': [self.factura()]}, format='json')
+        conteos = []
+        for cantidad in (3, 30):
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post('/api/facturas/batch/', {
+                    'facturas': [self.factura(estado='Activa' if n % 3 else 'Pendiente') for n in range(cantidad)],
+                }, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            conteos.append(len(contexto.captured_queries))
+        self.assertEqual(conteos[0], conteos[1])
+        self.assertEqual(Factura.objects.count(), 34)
+
+
+class TransicionesTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from comprobantes.models import SerieComprobante
+
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        SerieComprobante.objects.create(
+            tipo_comprobante=self.tipo, desde=1, hasta=100, numero_actual=0,
+            fecha_vencimiento=self.hoy, id_empresa=self.empresa
+        )
+
+    def test_activar_pagar_y_reportes(self):
+        from reportes.models import VentaDiaria
+
+        factura = self.crear_factura()
+        response = self.client.post(f'/api/facturas/{factura.id}/activar/')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['estado'], response.data['numero_factura']), ('Activa', 1))
+        factura.refresh_from_db()
+        self.assertEqual(factura.ncf_asignado.factura_asignada_id, factura.id)
+        dia = VentaDiaria.objects.get(id_empresa=self.empresa, fecha=self.hoy)
+        self.assertEqual((dia.facturas, dia.total), (1, Decimal('100.00')))
+
+        # Pagar no es válido dos veces ni desde Borrador
+        self.assertEqual(self.client.post(f'/api/facturas/{factura.id}/pagar/').status_code, 200)
+        response = self.client.post(f'/api/facturas/{factura.id}/pagar/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('estado', response.data)
+        dia.refresh_from_db()
+        self.assertEqual((dia.facturas, dia.total), (1, Decimal('100.00')))
+
+    def test_anular_anula_el_ncf_emitido_y_libera_el_pendiente(self):
+        from reportes.models import VentaDiaria
+
+        activa, pendiente = self.crear_factura(), self.crear_factura()
+        self.client.post(f'/api/facturas/{activa.id}/activar/')
+        ncf_pendiente = Comprobante.objects.create(
+            tipo_comprobante=self.tipo, numero_comprobante=50, fecha_emision=self.hoy, fecha_vencimiento=self.hoy,
+            factura_asignada=pendiente, cliente=self.cliente, id_empresa=self.empresa
+        )
+        Factura.objects.filter(pk=pendiente.pk).update(ncf_asignado=ncf_pendiente, estado='Pendiente')
+
+        response = self.client.post('/api/facturas/transicion/', {'accion': 'anular', 'ids': [activa.id, pendiente.id]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['aplicadas'], [activa.id, pendiente.id])
+        activa.refresh_from_db()
+        pendiente.refresh_from_db()
+        self.assertEqual((activa.estado, activa.anulado, activa.ncf_asignado.anulado), ('Anulada', True, True))
+        self.assertIsNone(pendiente.ncf_asignado)
+        ncf_pendiente.refresh_from_db()
+        self.assertEqual((ncf_pendiente.factura_asignada, ncf_pendiente.anulado), (None, False))
+        dia = VentaDiaria.objects.get(id_empresa=self.empresa, fecha=self.hoy)
+        self.assertEqual((dia.facturas, dia.total), (0, Decimal('0.00')))
+
+    def test_masiva_reporta_rechazadas_en_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        pagada = self.crear_factura(estado='Pagada')
+        # La primera crea la secuencia de números y las filas de los resúmenes del día
+        self.client.post('/api/facturas/transicion/', {'accion': 'activar', 'ids': [self.crear_factura().id]}, format='json')
+        conteos = []
+        for cantidad in (2, 20):
+            ids = [self.crear_factura().id for _ in range(cantidad)]
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post('/api/facturas/transicion/', {'accion': 'activar', 'ids': ids + [pagada.id, 0]}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            conteos.append(len(contexto.captured_queries))
+            self.assertEqual(response.data['aplicadas'], ids)
+            self.assertEqual([r['id'] for r in response.data['rechazadas']], [pagada.id, 0])
+        self.assertEqual(conteos[0], conteos[1])
+        self.assertEqual(
+            list(Factura.objects.filter(estado='Activa').order_by('numero_factura').values_list('numero_factura', flat=True)),
+            list(range(1, 24)),
+        )
+
+        response = self.client.post('/api/facturas/transicion/', {'accion': 'borrar', 'ids': [pagada.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonimos_y_otras_empresas_no_cambian_facturas(self):
+        from rest_framework.test import APIClient
+        from accounts.models import Usuario
+
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        ajena = self.crear_factura(estado='Activa', id_empresa=otra)
+        anular = {'accion': 'anular', 'ids': [ajena.id]}
+
+        anonimo = APIClient()
+        self.assertEqual(anonimo.post('/api/facturas/transicion/', anular, format='json').status_code, 401)
+        self.assertEqual(anonimo.post(f'/api/facturas/{ajena.id}/anular/').status_code, 401)
+
+        response = self.client.post('/api/facturas/transicion/', anular, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['aplicadas'], [])
+        self.assertEqual(response.data['rechazadas'], [{'id': ajena.id, 'error': 'La factura no existe'}])
+        self.assertEqual(self.client.post(f'/api/facturas/{ajena.id}/anular/').status_code, 404)
+
+        # Un superusuario ve todas las empresas, pero sin empresa propia no escribe
+        admin = APIClient()
+        admin.force_authenticate(Usuario.objects.create_superuser(username='admin', password='clave-segura'))
+        self.assertEqual(admin.post('/api/facturas/transicion/', anular, format='json').status_code, 400)
+        self.assertEqual(admin.post(f'/api/facturas/{ajena.id}/anular/').status_code, 400)
+
+        ajena.refresh_from_db()
+        self.assertEqual((ajena.estado, ajena.anulado), ('Activa', False))
+
+
+class PaginacionFiltrosTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def recorrer(self, url):
+        """ids de todas las páginas siguiendo ``next``"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [fila['id'] for fila in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_cursor_con_fechas_empatadas(self):
+        ayer = self.hoy - datetime.timedelta(days=1)
+        # Varias facturas por fecha: el id desempata sin repetir ni saltar filas
+        facturas = [self.crear_factura(fecha_emision=fecha) for fecha in (ayer, self.hoy, ayer, self.hoy, self.hoy, ayer, ayer)]
+        esperados = [f.id for f in sorted(facturas, key=lambda f: (f.fecha_emision, f.id), reverse=True)]
+        self.assertEqual(self.recorrer('/api/facturas/?page_size=2'), esperados)
+        self.assertEqual(self.recorrer('/api/facturas/?page_size=3'), esperados)
+
+    def test_cursor_invalido(self):
+        self.crear_factura()
+        for cursor in ('basura', 'W10=', 'WyJ4IiwxXQ=='):  # no base64, [] y ["x",1]
+            self.assertEqual(self.client.get('/api/facturas/', {'cursor': cursor}).status_code, 404)
+
+    def test_filtros_de_fecha_y_cliente(self):
+        otro = Cliente.objects.create(
+            nombre='Otro', tipo_documento='1', numero_documento=2, tipo_ncf=1, id_empresa=self.empresa
+        )
+        antigua = self.crear_factura(fecha_emision=self.hoy - datetime.timedelta(days=10))
+        reciente = self.crear_factura()
+        del_otro = self.crear_factura(cliente=otro)
+
+        desde = str(self.hoy - datetime.timedelta(days=1))
+        self.assertEqual(sorted(self.recorrer(f'/api/facturas/?fecha_desde={desde}')), [reciente.id, del_otro.id])
+        self.assertEqual(self.recorrer(f'/api/facturas/?fecha_hasta={desde}'), [antigua.id])
+        self.assertEqual(self.recorrer(f'/api/facturas/?cliente={otro.id}'), [del_otro.id])
+        self.assertEqual(self.client.get('/api/facturas/', {'fecha_desde': 'ayer'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/facturas/', {'cliente': 'x'}).status_code, 400)
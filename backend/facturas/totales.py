@@ -0,0 +1,87 @@
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+from django.utils import timezone
+from productos.models import TASAS_ITBIS
+from .models import Cotizacion, DetalleCotizacion, DetalleFactura, Factura
+
+# Motor de totales de facturas y cotizaciones. El servidor es la única fuente
+# de los montos: el subtotal de cada línea es cantidad x precio, el ITBIS se
+# calcula por tasa sobre la suma de las líneas con esa tasa (igual que
+# calcularTotales en el frontend cuando todas son del 18%) y el documento
+# guarda subtotal, itbis y total para que listados y reportes solo los sumen.
+
+CENTAVO = Decimal('0.01')
+CERO = Decimal('0.00')
+
+# Documento -> (modelo de sus líneas, campo de la línea que apunta al documento)
+LINEAS = {
+    Factura: (DetalleFactura, 'factura'),
+    Cotizacion: (DetalleCotizacion, 'cotizacion'),
+}
+
+
+class Totales(NamedTuple):
+    subtotal: Decimal
+    itbis: Decimal
+    total: Decimal
+
+
+def redondear(valor):
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def subtotal_linea(cantidad, precio_unitario):
+    return redondear(Decimal(cantidad) * Decimal(precio_unitario))
+
+
+def tasa_de_producto(producto):
+    return TASAS_ITBIS[producto.categoria_itbis]
+
+
+def calcular_totales(lineas):
+    """``lineas`` son pares ``(subtotal, tasa_itbis)``; se recorren una sola vez"""
+    bases = defaultdict(Decimal)
+    for subtotal, tasa in lineas:
+        bases[tasa] += subtotal
+    subtotal = sum(bases.values(), CERO)
+    itbis = sum((redondear(base * tasa / 100) for tasa, base in bases.items()), CERO)
+    return Totales(subtotal, itbis, subtotal + itbis)
+
+
+def preparar_linea(detalle):
+    """
+    Completa los datos validados de una línea nueva con su subtotal y la
+    tasa del producto, descartando los que haya enviado el cliente
+    """
+    detalle['subtotal'] = subtotal_linea(detalle.get('cantidad') or 0, detalle.get('precio_unitario') or 0)
+    detalle['tasa_itbis'] = tasa_de_producto(detalle['producto'])
+    return detalle
+
+
+def recalcular_linea(linea, cambios):
+    """
+    Vuelve a calcular los campos derivados de una línea existente después de
+    asignarle ``cambios`` y devuelve los que además cambiaron
+    """
+    derivados = []
+    subtotal = subtotal_linea(linea.cantidad, linea.precio_unitario)
+    if linea.subtotal != subtotal:
+        linea.subtotal = subtotal
+        derivados.append('subtotal')
+    # La tasa se fija al elegir el producto; cambiar la categoría después no altera lo facturado
+    if 'producto' in cambios:
+        tasa = tasa_de_producto(linea.producto)
+        if linea.tasa_itbis != tasa:
+            linea.tasa_itbis = tasa
+            derivados.append('tasa_itbis')
+    return derivados
+
+
+def actualizar_totales(modelo, documento_id):
+    """Recalcula y guarda los totales de un documento leyendo solo sus líneas"""
+    detalle, campo = LINEAS[modelo]
+    totales = calcular_totales(detalle.objects.filter(**{campo: documento_id}).values_list('subtotal', 'tasa_itbis'))
+    # fecha_actualizacion a mano porque update() no pasa por auto_now
+    modelo.objects.filter(pk=documento_id).update(**totales._asdict(), fecha_actualizacion=timezone.now())
+    return totales
@@ -0,0 +1,151 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+from comprobantes.alertas import invalidar_alertas
+from comprobantes.models import Comprobante
+from comprobantes.ncf import reclamar_ncfs
+from reportes.ventas import cambio_en_ventas_de
+from .models import EstadoFactura, Factura, TipoDocumento
+from .numeracion import reservar_numeros
+from .serializers import SIN_NCF
+
+# Cambios de estado de las facturas sin pasar por FacturaSerializer.update.
+# Una transición bloquea las facturas, las cambia todas con un UPDATE que
+# vuelve a exigir el estado de origen y escribe solo estado y lo que la
+# transición implica (número, NCF, anulado), y luego ajusta los NCF y los
+# reportes de ventas. Las acciones de una factura y la masiva comparten
+# este camino.
+
+ACTIVAR = 'activar'
+PAGAR = 'pagar'
+ANULAR = 'anular'
+
+# Acción -> (estados de origen, estado de destino)
+TRANSICIONES = {
+    ACTIVAR: ((EstadoFactura.BORRADOR, EstadoFactura.PENDIENTE), EstadoFactura.ACTIVA),
+    PAGAR: ((EstadoFactura.ACTIVA,), EstadoFactura.PAGADA),
+    # Una factura pagada se revierte con una nota de crédito, no anulándola
+    ANULAR: ((EstadoFactura.BORRADOR, EstadoFactura.PENDIENTE, EstadoFactura.ACTIVA), EstadoFactura.ANULADA),
+}
+MAXIMO_TRANSICION = 500
+
+# Estados en los que el NCF ya se entregó al cliente: al anular la factura
+# el comprobante queda anulado; en los demás vuelve a estar libre
+ESTADOS_EMITIDOS = (EstadoFactura.ACTIVA, EstadoFactura.PAGADA)
+
+
+def aplicar_transicion(queryset, accion, ids):
+    """
+    Aplica ``accion`` a las facturas ``ids`` de ``queryset``, que ya debe
+    estar restringido a la empresa. Devuelve ``(aplicadas, rechazadas)``:
+    los ids que cambiaron y ``{id: motivo}`` de los que no existen o no
+    admiten la transición. Si no alcanzan los NCF para activar, no cambia
+    ninguna.
+    """
+    origenes, _ = TRANSICIONES[accion]
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        filas = {
+            fila['id']: fila
+            for fila in queryset.select_related(None).select_for_update().filter(pk__in=ids).values(
+                'id', 'estado', 'anulado', 'numero_factura', 'ncf_asignado_id', 'tipo_comprobante_id',
+                'cliente_id', 'id_empresa_id',
+            )
+        }
+        rechazadas = {}
+        for factura_id in ids:
+            fila = filas.get(factura_id)
+            if fila is None:
+                rechazadas[factura_id] = 'La factura no existe'
+            elif fila['anulado']:
+                rechazadas[factura_id] = 'La factura ya está anulada'
+            elif fila['estado'] not in origenes:
+                rechazadas[factura_id] = f"No se puede {accion} una factura en estado {fila['estado']}"
+            elif accion == ACTIVAR and not fila['id_empresa_id']:
+                rechazadas[factura_id] = 'La factura no tiene empresa para numerarla'
+
+        validas = [filas[factura_id] for factura_id in ids if factura_id not in rechazadas]
+        if validas:
+            with cambio_en_ventas_de([fila['id'] for fila in validas]):
+                _APLICAR[accion](validas)
+    return [fila['id'] for fila in validas], rechazadas
+
+
+def _actualizar(filas, accion, **campos):
+    """UPDATE de todas las facturas que solo afecta a las que siguen en un estado de origen"""
+    origenes, destino = TRANSICIONES[accion]
+    actualizadas = Factura.objects.filter(
+        pk__in=[fila['id'] for fila in filas], estado__in=origenes, anulado=False,
+    ).update(estado=destino, fecha_actualizacion=timezone.now(), **campos)
+    if actualizadas != len(filas):
+        raise serializers.ValidationError({'estado': 'Otra operación cambió las facturas; intente de nuevo'})
+
+
+def _activar(filas):
+    # Solo se numeran las que nunca tuvieron número
+    sin_numero = defaultdict(list)
+    for fila in filas:
+        if fila['numero_factura'] is None:
+            sin_numero[fila['id_empresa_id']].append(fila['id'])
+    numeros = {}
+    for empresa_id, factura_ids in sin_numero.items():
+        numeros.update(zip(factura_ids, reservar_numeros(empresa_id, TipoDocumento.FACTURA, len(factura_ids))))
+    campos = {}
+    if numeros:
+        campos['numero_factura'] = _por_factura(numeros, 'numero_factura')
+    _actualizar(filas, ACTIVAR, **campos)
+
+    # Cada factura toma el NCF de su propia empresa
+    por_tipo = defaultdict(list)
+    for fila in filas:
+        if not fila['ncf_asignado_id']:
+            por_tipo[fila['tipo_comprobante_id'], fila['id_empresa_id']].append((fila['id'], fila['cliente_id']))
+    asignados = {}
+    for (tipo_id, empresa_id), asignaciones in por_tipo.items():
+        reclamados = reclamar_ncfs(tipo_id, asignaciones, empresa_id)
+        if len(reclamados) < len(asignaciones):
+            raise serializers.ValidationError({'ncf_asignado': SIN_NCF})
+        asignados.update((factura_id, reclamado.id) for factura_id, reclamado in reclamados.items())
+    if asignados:
+        Factura.objects.filter(pk__in=list(asignados)).update(
+            ncf_asignado_id=_por_factura(asignados, 'ncf_asignado_id'),
+        )
+
+
+def _pagar(filas):
+    _actualizar(filas, PAGAR)
+
+
+def _anular(filas):
+    emitidos = [fila['ncf_asignado_id'] for fila in filas if fila['ncf_asignado_id'] and fila['estado'] in ESTADOS_EMITIDOS]
+    liberados = [fila for fila in filas if fila['ncf_asignado_id'] and fila['estado'] not in ESTADOS_EMITIDOS]
+    campos = {'anulado': True}
+    if liberados:
+        campos['ncf_asignado_id'] = Case(
+            When(pk__in=[fila['id'] for fila in liberados], then=Value(None)),
+            default=F('ncf_asignado_id'), output_field=Factura._meta.get_field('ncf_asignado'),
+        )
+    _actualizar(filas, ANULAR, **campos)
+
+    if emitidos:
+        Comprobante.objects.filter(pk__in=emitidos).update(anulado=True)
+    if liberados:
+        Comprobante.objects.filter(pk__in=[fila['ncf_asignado_id'] for fila in liberados]).update(
+            factura_asignada=None, cliente=None,
+        )
+        # Los disponibles de la serie cambiaron
+        for empresa_id in {fila['id_empresa_id'] for fila in liberados}:
+            invalidar_alertas(empresa_id)
+
+
+def _por_factura(valores, campo):
+    """Expresión que asigna a cada factura su valor de ``valores`` y deja el resto igual"""
+    return Case(
+        *[When(pk=factura_id, then=Value(valor)) for factura_id, valor in valores.items()],
+        default=F(campo), output_field=Factura._meta.get_field(campo),
+    )
+
+
+_APLICAR = {ACTIVAR: _activar, PAGAR: _pagar, ANULAR: _anular}
@@ -1,5 +1,6 @@
+from django.urls import path
 from rest_framework import routers
-from .api import FacturaViewSet, DetalleFacturaViewSet, CotizacionViewSet, DetalleCotizacionViewSet
+from .api import FacturaViewSet, DetalleFacturaViewSet, CotizacionViewSet, DetalleCotizacionViewSet, FacturaAsyncView
 
 router = routers.DefaultRouter()
 
@@ -8,5 +9,9 @@ router.register('api/detalle-facturas', DetalleFacturaViewSet, 'detalle-facturas
 router.register('api/cotizaciones', CotizacionViewSet, 'cotizaciones')
 router.register('api/detalle-cotizaciones', DetalleCotizacionViewSet, 'detalle-cotizaciones')
 
-urlpatterns = router.urls
+# Lectura asíncrona nativa para servir bajo ASGI
+urlpatterns = router.urls + [
+    path('api/async/facturas/', FacturaAsyncView.as_view(), name='facturas-async-list'),
+    path('api/async/facturas/<int:pk>/', FacturaAsyncView.as_view(), name='facturas-async-detail'),
+]
 
@@ -1,11 +1,17 @@
 from .models import Producto
 from rest_framework import viewsets, permissions
-from .serializers import ProductoSerializer
+from core.api import BusquedaMixin, CatalogoCondicionalMixin, EmpresaViewSetMixin, ImportacionMixin
+from core.async_api import AsyncReadView
+from core.sincronizacion import SincronizacionMixin
+from .serializers import ProductoSerializer, ProductoImportacionSerializer
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(ImportacionMixin, BusquedaMixin, CatalogoCondicionalMixin, SincronizacionMixin, EmpresaViewSetMixin, viewsets.ModelViewSet):
     queryset=Producto.objects.all()
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProductoSerializer
+    serializer_importacion = ProductoImportacionSerializer
 
 
-    
\ No newline at end of file
+class ProductoAsyncView(AsyncReadView):
+    queryset = Producto.objects.all()
+    serializer_class = ProductoSerializer
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ProductosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productos'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from core.catalogos import registrar_eliminacion
+
+        # El ETag del catálogo debe cambiar también cuando se eliminan filas
+        post_delete.connect(registrar_eliminacion, sender=self.get_model('Producto'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:56
+
+from django.db import migrations, models
+from core.busqueda import borrar_indice_busqueda, crear_indice_busqueda, compactar, texto_busqueda
+
+TABLA = 'productos_producto'
+
+
+def llenar_busqueda(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    filas = list(Producto.objects.all())
+    for fila in filas:
+        fila.busqueda = texto_busqueda(fila.codigo, compactar(fila.codigo), fila.nombre)
+    Producto.objects.bulk_update(filas, ['busqueda'], batch_size=1000)
+
+
+def crear_indice(apps, schema_editor):
+    crear_indice_busqueda(schema_editor, TABLA)
+
+
+def borrar_indice(apps, schema_editor):
+    borrar_indice_busqueda(schema_editor, TABLA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_indice_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(llenar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:39
+
+from django.db import migrations, models
+from core.busqueda import restaurar_indice_busqueda
+
+
+def restaurar_indice(apps, schema_editor):
+    restaurar_indice_busqueda(schema_editor, 'productos_producto')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='categoria_itbis',
+            field=models.CharField(choices=[('general', 'ITBIS 18%'), ('reducida', 'ITBIS 16%'), ('exento', 'Exento')], default='general', max_length=10),
+        ),
+        # En SQLite la tabla se copia para agregar la columna y se pierden los triggers de búsqueda
+        migrations.RunPython(restaurar_indice, restaurar_indice),
+    ]
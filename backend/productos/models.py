@@ -1,5 +1,22 @@
+from decimal import Decimal
 from django.db import models
 from core.middleware import get_current_user
+from core.busqueda import compactar, texto_busqueda
+from core.models import EmpresaManager
+
+
+class CategoriaItbis(models.TextChoices):
+    GENERAL = 'general', 'ITBIS 18%'
+    REDUCIDA = 'reducida', 'ITBIS 16%'
+    EXENTO = 'exento', 'Exento'
+
+
+# Porcentaje de ITBIS de cada categoría; las líneas guardan el que tenía el producto al facturarse
+TASAS_ITBIS = {
+    CategoriaItbis.GENERAL: Decimal('18.00'),
+    CategoriaItbis.REDUCIDA: Decimal('16.00'),
+    CategoriaItbis.EXENTO: Decimal('0.00'),
+}
 
 
 class Producto(models.Model):
@@ -8,16 +25,33 @@ class Producto(models.Model):
     descripcion = models.TextField()
     precio_compra = models.DecimalField(max_digits=10, decimal_places=2)
     precio_venta = models.DecimalField(max_digits=10, decimal_places=2)
+    categoria_itbis = models.CharField(max_length=10, choices=CategoriaItbis.choices, default=CategoriaItbis.GENERAL)
     id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='productos', null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Campos normalizados para /search/; se indexan con crear_indice_busqueda
+    busqueda = models.TextField(blank=True, default='', editable=False)
+
+    objects = EmpresaManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empresa', 'nombre'], name='producto_emp_nombre_idx'),
+            models.Index(fields=['id_empresa', 'codigo'], name='producto_emp_codigo_idx'),
+            models.Index(fields=['id_empresa', 'fecha_actualizacion'], name='producto_emp_act_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.id_empresa_id:
             user = get_current_user()
             if user and hasattr(user, 'empresa') and user.empresa:
                 self.id_empresa = user.empresa
+        self.busqueda = self.calcular_busqueda()
         super().save(*args, **kwargs)
 
+    def calcular_busqueda(self):
+        # También la usa la importación masiva, que no pasa por save()
+        return texto_busqueda(self.codigo, compactar(self.codigo), self.nombre)
+
     def __str__(self):
         return self.nombre
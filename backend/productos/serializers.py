@@ -4,7 +4,16 @@ from .models import Producto
 class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
-        fields = '__all__'
+        exclude = ['busqueda']
         read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
 
-        
\ No newline at end of file
+
+class ProductoImportacionSerializer(ProductoSerializer):
+    """Reglas de ProductoSerializer para core.importacion, que inserta o actualiza por codigo"""
+    clave = 'codigo'
+
+    class Meta(ProductoSerializer.Meta):
+        # La empresa la fija la importación
+        exclude = ['busqueda', 'id_empresa']
+        # Un código existente se actualiza en lugar de rechazarse
+        extra_kwargs = {'codigo': {'validators': []}}
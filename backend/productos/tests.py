@@ -1,3 +1,233 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from core.busqueda import asegurar_indices_busqueda, tabla_fts
+from core.testing import QueryBudgetMixin, crear_usuario_con_empresa
+from .models import Producto
 
-# Create your tests here.
+
+class ProductoQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.client = self.get_budget_client(self.usuario)
+        self.siguiente = 0
+
+    def crear_productos(self, n):
+        for _ in range(n):
+            self.siguiente += 1
+            Producto.objects.create(
+                codigo=f'P{self.siguiente}', nombre=f'Producto {self.siguiente}', descripcion='',
+                precio_compra=Decimal('10.00'), precio_venta=Decimal('15.00'),
+                id_empresa=self.usuario.empresa
+            )
+
+    def test_listado_productos(self):
+        # Dos agregaciones para el ETag del catálogo y una para el listado
+        self.assertQueryBudget(self.client, '/api/productos/', 3, self.crear_productos)
+
+
+class BusquedaProductosTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.client = self.get_budget_client(self.usuario)
+        for codigo, nombre in (('AB-0012', 'Cable eléctrico'), ('CD-0100', 'Cámara de seguridad')):
+            Producto.objects.create(
+                codigo=codigo, nombre=nombre, descripcion='', precio_compra=Decimal('10.00'),
+                precio_venta=Decimal('15.00'), id_empresa=self.usuario.empresa
+            )
+
+    def test_busqueda_por_codigo_y_nombre(self):
+        def buscar(q):
+            return [p['codigo'] for p in self.client.get('/api/productos/search/', {'q': q}).json()]
+
+        self.assertEqual(buscar('ab00'), ['AB-0012'])
+        self.assertEqual(buscar('ab 0012'), ['AB-0012'])
+        self.assertEqual(buscar('camara'), ['CD-0100'])
+        self.assertEqual(buscar('ELECTRICO'), ['AB-0012'])
+
+    def test_busqueda_sin_fts(self):
+        from types import SimpleNamespace
+        from unittest import mock
+
+        def buscar(q):
+            return [p['codigo'] for p in self.client.get('/api/productos/search/', {'q': q}).json()]
+
+        # Fuera de SQLite se compara por prefijo de palabra, como FTS5
+        with mock.patch('core.busqueda.connection', SimpleNamespace(vendor='postgresql')):
+            self.assertEqual(buscar('ELECTRICO'), ['AB-0012'])
+            self.assertEqual(buscar('ab 0012'), ['AB-0012'])
+            self.assertEqual(buscar('seg'), ['CD-0100'])
+            self.assertEqual(buscar('lectrico'), [])
+
+    def test_coincidencia_antigua_no_queda_fuera(self):
+        # Más coincidencias recientes que candidatos se toman del índice
+        for n in range(80):
+            Producto.objects.create(
+                codigo=f'CB-{n:04}', nombre=f'Cable eléctrico de cobre calibre {n} para exteriores',
+                descripcion='', precio_compra=Decimal('10.00'), precio_venta=Decimal('15.00'),
+                id_empresa=self.usuario.empresa,
+            )
+        codigos = [p['codigo'] for p in self.client.get('/api/productos/search/', {'q': 'cable'}).json()]
+        self.assertEqual(codigos[0], 'AB-0012')
+
+
+class IndiceBusquedaTests(TransactionTestCase):
+    # El editor de esquema de SQLite no puede usarse dentro de la transacción de TestCase
+
+    def test_post_migrate_restaura_los_triggers(self):
+        usuario = crear_usuario_con_empresa()
+        fts = tabla_fts(Producto._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {fts}_ai')
+        asegurar_indices_busqueda(using=connection.alias)
+
+        Producto.objects.create(
+            codigo='AB-0012', nombre='Cable eléctrico', descripcion='', precio_compra=Decimal('10.00'),
+            precio_venta=Decimal('15.00'), id_empresa=usuario.empresa
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '{fts}_%'"
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
+        client = APIClient()
+        client.force_authenticate(usuario)
+        respuesta = client.get('/api/productos/search/', {'q': 'cable'})
+        self.assertEqual([p['codigo'] for p in respuesta.json()], ['AB-0012'])
+
+
+class ImportacionProductosTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario_con_empresa()
+        self.client = self.get_budget_client(self.usuario)
+        self.existente = Producto.objects.create(
+            codigo='AB-0012', nombre='Cable', descripcion='', precio_compra=Decimal('10.00'),
+            precio_venta=Decimal('15.00'), id_empresa=self.usuario.empresa
+        )
+        otra = crear_usuario_con_empresa('otro', '101000002').empresa
+        self.ajeno = Producto.objects.create(
+            codigo='ZZ-1', nombre='Ajeno', descripcion='', precio_compra=Decimal('1.00'),
+            precio_venta=Decimal('2.00'), id_empresa=otra
+        )
+
+    def test_inserta_actualiza_y_reporta_por_fila(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        contenido = (
+            'Codigo;Nombre;Descripcion;Precio_Compra;Precio_Venta;Categoria_Itbis\n'
+            'AB-0012;Cable eléctrico;Rollo;12.00;20.00;general\n'
+            'CD-0100;Cámara de seguridad;IP;50.00;80.00;exento\n'
+            'EF-1;Sin precio;x;abc;5.00;general\n'
+            'ZZ-1;Robado;x;1.00;1.00;general\n'
+        ).encode('utf-8-sig')
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.csv', contenido, content_type='text/csv'),
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        informe = response.json()
+        self.assertEqual((informe['creados'], informe['actualizados'], informe['con_errores']), (1, 1, 2))
+        self.assertEqual([e['fila'] for e in informe['errores']], [4, 5])
+        self.assertIn('precio_compra', informe['errores'][0]['errores'])
+
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nombre, self.existente.precio_venta), ('Cable eléctrico', Decimal('20.00')))
+        nuevo = Producto.objects.get(codigo='CD-0100')
+        self.assertEqual((nuevo.id_empresa, nuevo.categoria_itbis), (self.usuario.empresa, 'exento'))
+        self.ajeno.refresh_from_db()
+        self.assertEqual(self.ajeno.nombre, 'Ajeno')
+        # Las filas importadas entran al índice de búsqueda
+        self.assertEqual(
+            [p['codigo'] for p in self.client.get('/api/productos/search/', {'q': 'camara'}).json()], ['CD-0100']
+        )
+
+    def archivo(self, contenido):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        encabezado = 'Codigo;Nombre;Descripcion;Precio_Compra;Precio_Venta;Categoria_Itbis\n'
+        return SimpleUploadedFile('productos.csv', (encabezado + contenido).encode('utf-8'), content_type='text/csv')
+
+    def test_requiere_usuario_con_empresa(self):
+        from accounts.models import Usuario
+
+        fila = 'NN-1;Nuevo;x;1.00;2.00;general\n'
+        client = APIClient()
+        self.assertEqual(client.post('/api/productos/importar/', {'archivo': self.archivo(fila)}).status_code, 401)
+        client.force_authenticate(Usuario.objects.create_user(username='suelto', password='clave-segura'))
+        self.assertEqual(client.post('/api/productos/importar/', {'archivo': self.archivo(fila)}).status_code, 403)
+        self.assertFalse(Producto.objects.filter(codigo='NN-1').exists())
+
+    def test_clave_insertada_por_otra_empresa_durante_la_importacion(self):
+        from unittest import mock
+        from django.db import transaction
+
+        # Otra empresa inserta la clave entre la consulta de existentes y el upsert
+        savepoint = transaction.savepoint
+        intercalada = []
+
+        def insertar_y_seguir(*args, **kwargs):
+            if not intercalada:
+                intercalada.append(Producto.objects.create(
+                    codigo='NN-1', nombre='De la otra', descripcion='', precio_compra=Decimal('1.00'),
+                    precio_venta=Decimal('2.00'), id_empresa=self.ajeno.id_empresa
+                ))
+            return savepoint(*args, **kwargs)
+
+        with mock.patch('core.importacion.transaction.savepoint', insertar_y_seguir):
+            response = self.client.post('/api/productos/importar/', {
+                'archivo': self.archivo('NN-1;Robado;x;1.00;1.00;general\nNN-2;Nuevo;x;1.00;2.00;general\n'),
+            })
+        informe = response.json()
+        self.assertEqual((informe['creados'], informe['actualizados'], informe['con_errores']), (1, 0, 1))
+        self.assertEqual(informe['errores'][0]['fila'], 2)
+        intercalada[0].refresh_from_db()
+        self.assertEqual(intercalada[0].nombre, 'De la otra')
+        self.assertEqual(Producto.objects.get(codigo='NN-2').id_empresa, self.usuario.empresa)
+
+    def test_columnas_ausentes_no_se_sobrescriben(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        Producto.objects.filter(pk=self.existente.pk).update(categoria_itbis='exento')
+        contenido = 'Codigo;Nombre;Descripcion;Precio_Compra;Precio_Venta\nAB-0012;Cable;Rollo;12.00;20.00\n'
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.csv', contenido.encode('utf-8'), content_type='text/csv'),
+        })
+        self.assertEqual(response.json()['actualizados'], 1)
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.precio_venta, self.existente.categoria_itbis), (Decimal('20.00'), 'exento'))
+
+    def test_archivo_ilegible_a_la_mitad_devuelve_lo_importado(self):
+        from unittest import mock
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        contenido = (
+            'Codigo;Nombre;Descripcion;Precio_Compra;Precio_Venta\n'
+            'N-1;Uno;x;1.00;2.00\nN-2;Dos;x;1.00;2.00\nN-3;Tres;x;1.00;2.00\n'
+        ).encode('utf-8') + b'N-4;Cuatro \xff;x;1.00;2.00\nN-5;Cinco;x;1.00;2.00\n'
+        with mock.patch('core.importacion.TAMANO_BLOQUE', 2):
+            response = self.client.post('/api/productos/importar/', {
+                'archivo': SimpleUploadedFile('productos.csv', contenido, content_type='text/csv'),
+            })
+        self.assertEqual(response.status_code, 200, response.content)
+        informe = response.json()
+        self.assertEqual(informe['creados'], 3)
+        self.assertEqual(informe['error_archivo']['fila'], 5)
+        self.assertIn('archivo', informe['error_archivo']['errores'])
+        self.assertEqual(
+            sorted(Producto.objects.filter(codigo__startswith='N-').values_list('codigo', flat=True)),
+            ['N-1', 'N-2', 'N-3'],
+        )
+
+        # Ilegible desde el encabezado: no hay nada que informar
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.csv', b'\xff\xfe;x\n', content_type='text/csv'),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_formato_no_soportado(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        response = self.client.post('/api/productos/importar/', {
+            'archivo': SimpleUploadedFile('productos.txt', b'codigo\n1\n'),
+        })
+        self.assertEqual(response.status_code, 400)
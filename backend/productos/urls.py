@@ -1,9 +1,14 @@
+from django.urls import path
 from rest_framework import routers
-from .api import ProductoViewSet
+from .api import ProductoViewSet, ProductoAsyncView
 
 router = routers.DefaultRouter()
 
 router.register('api/productos', ProductoViewSet, 'productos')
 
-urlpatterns = router.urls
+# Lectura asíncrona nativa para servir bajo ASGI
+urlpatterns = router.urls + [
+    path('api/async/productos/', ProductoAsyncView.as_view(), name='productos-async-list'),
+    path('api/async/productos/<int:pk>/', ProductoAsyncView.as_view(), name='productos-async-detail'),
+]
 
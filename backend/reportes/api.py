@@ -0,0 +1,164 @@
+import datetime
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from core.api import ReplicaLecturaMixin
+from core.replicas import en_replica
+from .dgii import FORMATOS, generar_607, nombre_archivo_607
+from .models import VentaDiaria, VentaDiariaCliente, VentaDiariaProducto, VentaDiariaTipoComprobante
+
+AGRUPACIONES = {
+    'dia': None,
+    'mes': TruncMonth,
+    'anio': TruncYear,
+}
+LIMITE_RANKING = 10
+MAXIMO_RANKING = 100
+
+
+def _fecha(request, nombre, por_defecto):
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return por_defecto
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({nombre: 'Debe ser una fecha AAAA-MM-DD'})
+
+
+def _periodo(valor):
+    """'202609' -> (2026, 9)"""
+    try:
+        anio, mes = int(valor[:4]), int(valor[4:])
+    except (TypeError, ValueError):
+        raise ValidationError({'periodo': 'Debe tener el formato AAAAMM'})
+    if len(valor) != 6 or not 1 <= mes <= 12:
+        raise ValidationError({'periodo': 'Debe tener el formato AAAAMM'})
+    return anio, mes
+
+
+def _rango(request):
+    """Rango de fechas de la consulta; por defecto, el año en curso hasta hoy"""
+    hasta = _fecha(request, 'hasta', timezone.localdate())
+    desde = _fecha(request, 'desde', hasta.replace(month=1, day=1))
+    if desde > hasta:
+        raise ValidationError({'desde': 'Debe ser anterior o igual a hasta'})
+    return desde, hasta
+
+
+class ReportesViewSet(ReplicaLecturaMixin, viewsets.ViewSet):
+    """
+    Reportes de ventas de la empresa del usuario. Solo leen los resúmenes
+    diarios de ``reportes.models``, así que un año completo son a lo sumo
+    365 filas por dimensión sin tocar facturas ni líneas. Todos se leen de
+    la réplica.
+    """
+    acciones_replica = '__all__'
+
+    def _resumenes(self, modelo, desde, hasta):
+        return modelo.objects.del_usuario(self.request.user).filter(fecha__gte=desde, fecha__lte=hasta)
+
+    def _limite(self):
+        try:
+            limite = int(self.request.query_params.get('limite', LIMITE_RANKING))
+        except ValueError:
+            raise ValidationError({'limite': 'Debe ser un número entero'})
+        if not 1 <= limite <= MAXIMO_RANKING:
+            raise ValidationError({'limite': f'Debe estar entre 1 y {MAXIMO_RANKING}'})
+        return limite
+
+    @action(detail=False, methods=['get'])
+    def ventas(self, request):
+        """Facturas y total vendido por día, mes o año (``?agrupar=dia|mes|anio``)"""
+        agrupar = request.query_params.get('agrupar', 'dia')
+        if agrupar not in AGRUPACIONES:
+            return Response(
+                {'error': 'agrupar debe ser dia, mes o anio'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        desde, hasta = _rango(request)
+
+        resumenes = self._resumenes(VentaDiaria, desde, hasta)
+        truncar = AGRUPACIONES[agrupar]
+        periodo = truncar('fecha') if truncar else 'fecha'
+        serie = list(
+            resumenes.annotate(periodo=periodo).values('periodo')
+            .annotate(facturas=Sum('facturas'), subtotal=Sum('subtotal'), itbis=Sum('itbis'), total=Sum('total'))
+            .order_by('periodo')
+        )
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'agrupar': agrupar,
+            'facturas': sum(fila['facturas'] for fila in serie),
+            'subtotal': sum(fila['subtotal'] for fila in serie),
+            'itbis': sum(fila['itbis'] for fila in serie),
+            'total': sum(fila['total'] for fila in serie),
+            'resultados': serie,
+        })
+
+    @action(detail=False, methods=['get'])
+    def clientes(self, request):
+        """Clientes con más ventas en el rango"""
+        desde, hasta = _rango(request)
+        filas = self._resumenes(VentaDiariaCliente, desde, hasta).values('cliente_id', 'cliente__nombre').annotate(
+            facturas=Sum('facturas'), total=Sum('total'),
+        ).order_by('-total', 'cliente_id')[:self._limite()]
+        return Response([
+            {'cliente': fila['cliente_id'], 'nombre': fila['cliente__nombre'],
+             'facturas': fila['facturas'], 'total': fila['total']}
+            for fila in filas
+        ])
+
+    @action(detail=False, methods=['get'])
+    def productos(self, request):
+        """Productos con más ventas en el rango"""
+        desde, hasta = _rango(request)
+        filas = self._resumenes(VentaDiariaProducto, desde, hasta).values(
+            'producto_id', 'producto__codigo', 'producto__nombre',
+        ).annotate(cantidad=Sum('cantidad'), subtotal=Sum('subtotal')).order_by('-subtotal', 'producto_id')[:self._limite()]
+        return Response([
+            {'producto': fila['producto_id'], 'codigo': fila['producto__codigo'], 'nombre': fila['producto__nombre'],
+             'cantidad': fila['cantidad'], 'subtotal': fila['subtotal']}
+            for fila in filas
+        ])
+
+    @action(detail=False, methods=['get'], url_path='tipos-comprobante')
+    def tipos_comprobante(self, request):
+        """Ventas por tipo de comprobante en el rango"""
+        desde, hasta = _rango(request)
+        filas = self._resumenes(VentaDiariaTipoComprobante, desde, hasta).values(
+            'tipo_comprobante_id', 'tipo_comprobante__tipo_comprobante',
+        ).annotate(facturas=Sum('facturas'), total=Sum('total')).order_by('-total', 'tipo_comprobante_id')
+        return Response([
+            {'tipo_comprobante': fila['tipo_comprobante_id'], 'nombre': fila['tipo_comprobante__tipo_comprobante'],
+             'facturas': fila['facturas'], 'total': fila['total']}
+            for fila in filas
+        ])
+
+    @action(detail=False, methods=['get'], url_path='dgii-607')
+    def dgii_607(self, request):
+        """
+        Formato 607 de ventas del período ``?periodo=AAAAMM`` en TXT (por
+        defecto) o ``?formato=csv``. Se envía en streaming a medida que se
+        leen las facturas.
+        """
+        empresa = request.user.empresa
+        if empresa is None:
+            return Response({'error': 'El usuario no pertenece a una empresa'}, status=status.HTTP_400_BAD_REQUEST)
+        anio, mes = _periodo(request.query_params.get('periodo'))
+        formato = request.query_params.get('formato', 'txt')
+        if formato not in FORMATOS:
+            return Response({'error': 'formato debe ser txt o csv'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            en_replica(generar_607(empresa, anio, mes, formato)),
+            content_type='text/csv; charset=utf-8' if formato == 'csv' else 'text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo_607(empresa, anio, mes, formato)}"'
+        return response
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reportes'
+
+    def ready(self):
+        from django.db.models.signals import pre_delete
+        from facturas.models import Factura
+        from .ventas import descontar_factura
+
+        # pre_delete porque las líneas todavía existen y su aporte se puede calcular
+        pre_delete.connect(descontar_factura, sender=Factura)
@@ -0,0 +1,120 @@
+import csv
+import datetime
+from facturas.models import EstadoFactura, Factura
+from .ventas import ESTADOS_VENTA
+
+# Formato 607 de la DGII (envío de ventas de bienes y servicios). La salida
+# depende solo de los datos: orden fijo, montos con dos decimales y saltos de
+# línea \n, así que dos generaciones del mismo período dan los mismos bytes.
+
+COLUMNAS_607 = (
+    'RNC/Cédula o Pasaporte',
+    'Tipo Identificación',
+    'Número Comprobante Fiscal',
+    'Número Comprobante Fiscal Modificado',
+    'Tipo de Ingreso',
+    'Fecha Comprobante',
+    'Fecha de Retención',
+    'Monto Facturado',
+    'ITBIS Facturado',
+    'ITBIS Retenido por Terceros',
+    'ITBIS Percibido',
+    'Retención Renta por Terceros',
+    'ISR Percibido',
+    'Impuesto Selectivo al Consumo',
+    'Otros Impuestos/Tasas',
+    'Monto Propina Legal',
+    'Efectivo',
+    'Cheque/Transferencia/Depósito',
+    'Tarjeta Débito/Crédito',
+    'Venta a Crédito',
+    'Bonos o Certificados de Regalo',
+    'Permuta',
+    'Otras Formas de Ventas',
+)
+
+# Ingresos por operaciones (no financieros)
+TIPO_INGRESO = '01'
+CERO = '0.00'
+
+# tipo_documento del cliente -> (tipo de identificación DGII, largo del documento)
+RNC, CEDULA, PASAPORTE = ('1', 9), ('2', 11), ('3', None)
+TIPOS_IDENTIFICACION = {
+    'RNC': RNC, 'CEDULA': CEDULA, 'PASAPORTE': PASAPORTE,
+    # Códigos del formulario rápido de clientes
+    '1': CEDULA, '2': PASAPORTE, '3': RNC,
+}
+FORMATOS = ('txt', 'csv')
+TAMANO_LOTE = 2000
+
+
+def facturas_607(empresa_id, anio, mes):
+    """Facturas con NCF del período que se reportan como ventas, en orden fijo"""
+    inicio = datetime.date(anio, mes, 1)
+    fin = datetime.date(anio + mes // 12, mes % 12 + 1, 1)
+    return Factura.objects.filter(
+        id_empresa_id=empresa_id,
+        fecha_emision__gte=inicio,
+        fecha_emision__lt=fin,
+        estado__in=ESTADOS_VENTA,
+        anulado=False,
+        ncf_asignado__isnull=False,
+    ).order_by('fecha_emision', 'ncf_asignado__numero_comprobante_completo', 'id')
+
+
+def generar_607(empresa, anio, mes, formato='txt', tamano_lote=TAMANO_LOTE):
+    """
+    Genera el 607 línea por línea. Las facturas se leen en lotes con
+    ``iterator`` y solo con las columnas necesarias, así que la memoria no
+    crece con la cantidad de facturas del período.
+    """
+    facturas = facturas_607(empresa.id, anio, mes)
+    filas = facturas.values_list(
+        'cliente__numero_documento', 'cliente__tipo_documento', 'ncf_asignado__numero_comprobante_completo',
+        'fecha_emision', 'subtotal', 'itbis', 'total', 'estado',
+    ).iterator(chunk_size=tamano_lote)
+
+    if formato == 'csv':
+        salida = _Linea()
+        escritor = csv.writer(salida, lineterminator='\n')
+        yield escritor.writerow(COLUMNAS_607)
+        for fila in filas:
+            yield escritor.writerow(_campos(*fila))
+    else:
+        rnc = ''.join(c for c in empresa.rnc if c.isdigit())
+        yield f'607|{rnc}|{anio:04d}{mes:02d}|{facturas.count()}\n'
+        for fila in filas:
+            yield '|'.join(_campos(*fila)) + '\n'
+
+
+def nombre_archivo_607(empresa, anio, mes, formato='txt'):
+    rnc = ''.join(c for c in empresa.rnc if c.isdigit())
+    return f'DGII_F_607_{rnc}_{anio:04d}{mes:02d}.{formato.upper()}'
+
+
+def _campos(documento, tipo_documento, ncf, fecha, subtotal, itbis, total, estado):
+    tipo, largo = TIPOS_IDENTIFICACION.get(str(tipo_documento).strip().upper(), (None, None))
+    documento = str(documento)
+    if tipo is None:
+        # Sin tipo reconocible se deduce por el largo: 9 dígitos RNC, 11 cédula
+        tipo, largo = RNC if len(documento) <= RNC[1] else CEDULA
+    if largo:
+        # numero_documento es entero y pierde los ceros a la izquierda
+        documento = documento.zfill(largo)
+
+    # Las facturas activas todavía no se cobran; las pagadas no tienen forma de pago registrada
+    monto = f'{total:.2f}'
+    credito, otras = (monto, CERO) if estado == EstadoFactura.ACTIVA else (CERO, monto)
+    # El monto facturado no incluye el ITBIS; las formas de pago suman el total
+    return (
+        documento, tipo, ncf, '', TIPO_INGRESO, fecha.strftime('%Y%m%d'), '',
+        f'{subtotal:.2f}', f'{itbis:.2f}', '', '', '', '', '', '', '',
+        CERO, CERO, CERO, credito, CERO, CERO, otras,
+    )
+
+
+class _Linea:
+    """Destino de csv.writer que devuelve la línea escrita en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
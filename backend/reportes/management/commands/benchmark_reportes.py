@@ -0,0 +1,128 @@
+import datetime
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth
+from accounts.models import Usuario
+from clientes.models import Cliente
+from comprobantes.models import TipoComprobante
+from facturas.models import DetalleFactura, EstadoFactura, Factura
+from productos.models import Producto
+from reportes.models import VentaDiaria, VentaDiariaProducto
+from reportes.ventas import ESTADOS_VENTA, reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara los reportes leídos desde los resúmenes diarios con la agregación directa sobre '
+        'facturas y líneas. Los datos sintéticos se crean en la empresa del usuario dentro de '
+        'una transacción que se revierte al terminar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Usuario con cuya empresa se generan los datos')
+        parser.add_argument('--lineas', type=int, default=1000000, help='Líneas de factura a generar')
+        parser.add_argument('--lineas-por-factura', type=int, default=4)
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--productos', type=int, default=500)
+        parser.add_argument('--dias', type=int, default=365, help='Días hacia atrás en que se reparten las facturas')
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+        if not usuario.empresa_id:
+            raise CommandError('El usuario debe pertenecer a una empresa')
+        empresa_id = usuario.empresa_id
+        azar = random.Random(options['semilla'])
+        hoy = datetime.date.today()
+        desde = hoy - datetime.timedelta(days=options['dias'] - 1)
+
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            self.crear_datos(empresa_id, options, azar, hoy)
+            self.stdout.write(f'Datos generados en {time.perf_counter() - inicio:.1f} s')
+
+            inicio = time.perf_counter()
+            reconstruir(empresa_id)
+            self.stdout.write(f'reconstruir_reportes en {time.perf_counter() - inicio:.1f} s')
+
+            facturas = Factura.objects.filter(
+                id_empresa_id=empresa_id, estado__in=ESTADOS_VENTA, anulado=False,
+                fecha_emision__gte=desde, fecha_emision__lte=hoy,
+            )
+            casos = [
+                ('ventas por mes', 'resúmenes', lambda: list(
+                    VentaDiaria.objects.filter(id_empresa_id=empresa_id, fecha__gte=desde, fecha__lte=hoy)
+                    .annotate(periodo=TruncMonth('fecha')).values('periodo')
+                    .annotate(facturas=Sum('facturas'), total=Sum('total')).order_by('periodo')
+                )),
+                ('ventas por mes', 'facturas', lambda: list(
+                    facturas.annotate(periodo=TruncMonth('fecha_emision')).values('periodo')
+                    .annotate(facturas=Count('id'), total=Sum('total')).order_by('periodo')
+                )),
+                ('top 10 productos', 'resúmenes', lambda: list(
+                    VentaDiariaProducto.objects.filter(id_empresa_id=empresa_id, fecha__gte=desde, fecha__lte=hoy)
+                    .values('producto_id').annotate(cantidad=Sum('cantidad'), subtotal=Sum('subtotal'))
+                    .order_by('-subtotal')[:10]
+                )),
+                ('top 10 productos', 'líneas', lambda: list(
+                    DetalleFactura.objects.filter(factura__in=facturas)
+                    .values('producto_id').annotate(cantidad=Sum('cantidad'), subtotal=Sum('subtotal'))
+                    .order_by('-subtotal')[:10]
+                )),
+            ]
+            self.stdout.write(f"{'reporte':<18}{'fuente':<11}{'p50 ms':>10}{'máx ms':>10}")
+            for reporte, fuente, consulta in casos:
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    consulta()
+                    tiempos.append(time.perf_counter() - inicio)
+                self.stdout.write(
+                    f'{reporte:<18}{fuente:<11}{statistics.median(tiempos) * 1000:>10.1f}{max(tiempos) * 1000:>10.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def crear_datos(self, empresa_id, options, azar, hoy):
+        base = (Cliente.objects.aggregate(maximo=Max('numero_documento'))['maximo'] or 0) + 1
+        clientes = Cliente.objects.bulk_create([
+            Cliente(nombre=f'Cliente {n}', tipo_documento='1', numero_documento=base + n, tipo_ncf=1,
+                    id_empresa_id=empresa_id)
+            for n in range(options['clientes'])
+        ], batch_size=1000)
+        productos = Producto.objects.bulk_create([
+            Producto(codigo=f'BENCH{base}-{n}', nombre=f'Producto {n}', descripcion='',
+                     precio_compra=Decimal('1.00'), precio_venta=Decimal('10.00'), id_empresa_id=empresa_id)
+            for n in range(options['productos'])
+        ], batch_size=1000)
+        tipo = TipoComprobante.objects.create(tipo_comprobante='B01', descripcion='Benchmark', id_empresa_id=empresa_id)
+
+        por_factura = options['lineas_por_factura']
+        estados = [EstadoFactura.ACTIVA, EstadoFactura.PAGADA, EstadoFactura.PAGADA, EstadoFactura.BORRADOR]
+        cantidad_facturas = options['lineas'] // por_factura
+        lote = 2000
+        for inicio in range(0, cantidad_facturas, lote):
+            facturas = Factura.objects.bulk_create([
+                Factura(
+                    tipo_comprobante=tipo, cliente=azar.choice(clientes), estado=azar.choice(estados),
+                    fecha_emision=hoy - datetime.timedelta(days=azar.randrange(options['dias'])),
+                    fecha_vencimiento=hoy, total=Decimal(10 * por_factura), id_empresa_id=empresa_id,
+                )
+                for _ in range(min(lote, cantidad_facturas - inicio))
+            ])
+            DetalleFactura.objects.bulk_create([
+                DetalleFactura(
+                    factura=factura, producto=azar.choice(productos), cantidad=1,
+                    precio_unitario=Decimal('10.00'), subtotal=Decimal('10.00'), id_empresa_id=empresa_id,
+                )
+                for factura in facturas
+                for _ in range(por_factura)
+            ], batch_size=5000)
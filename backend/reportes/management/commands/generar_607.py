@@ -0,0 +1,45 @@
+import hashlib
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from config.models import Empresa
+from reportes.dgii import FORMATOS, generar_607, nombre_archivo_607
+
+
+class Command(BaseCommand):
+    help = 'Genera el formato 607 de ventas de la DGII para una empresa y un período AAAAMM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('empresa', type=int, help='ID de la empresa')
+        parser.add_argument('periodo', help='Período AAAAMM')
+        parser.add_argument('--formato', choices=FORMATOS, default='txt')
+        parser.add_argument(
+            '--salida',
+            help="Archivo de salida; '-' para la salida estándar. Por defecto, el nombre oficial del archivo",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(pk=options['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f"No existe la empresa {options['empresa']}")
+        periodo = options['periodo']
+        if len(periodo) != 6 or not periodo.isdigit() or not 1 <= int(periodo[4:]) <= 12:
+            raise CommandError('El período debe tener el formato AAAAMM')
+        anio, mes = int(periodo[:4]), int(periodo[4:])
+        formato = options['formato']
+
+        salida = options['salida'] or nombre_archivo_607(empresa, anio, mes, formato)
+        destino = sys.stdout.buffer if salida == '-' else open(salida, 'wb')
+        suma = hashlib.sha256()
+        # La primera línea es el encabezado
+        lineas = -1
+        try:
+            for linea in generar_607(empresa, anio, mes, formato):
+                datos = linea.encode('utf-8')
+                suma.update(datos)
+                destino.write(datos)
+                lineas += 1
+        finally:
+            if destino is not sys.stdout.buffer:
+                destino.close()
+        self.stderr.write(f'{salida}: {max(lineas, 0)} registros, sha256 {suma.hexdigest()}')
@@ -0,0 +1,27 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from reportes.ventas import reconstruir
+
+
+def _fecha(valor):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor}; use AAAA-MM-DD')
+
+
+class Command(BaseCommand):
+    help = (
+        'Vuelve a calcular los resúmenes diarios de ventas desde las facturas, para cargar '
+        'los datos existentes o corregir diferencias'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='Solo la empresa indicada')
+        parser.add_argument('--desde', type=_fecha, help='Primer día a reconstruir (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=_fecha, help='Último día a reconstruir (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        creadas = reconstruir(options['empresa'], options['desde'], options['hasta'])
+        for modelo, cantidad in creadas.items():
+            self.stdout.write(f'{modelo}: {cantidad} filas')
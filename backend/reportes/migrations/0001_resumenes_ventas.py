@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('clientes', '0004_busqueda'),
+        ('comprobantes', '0006_tipocomprobante_fechas'),
+        ('config', '0001_initial'),
+        ('productos', '0004_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('facturas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='config.empresa')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_empresa', 'fecha'), name='venta_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('facturas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente')),
+                ('id_empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='config.empresa')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_empresa', 'fecha', 'cliente'), name='venta_diaria_cliente_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='config.empresa')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_empresa', 'fecha', 'producto'), name='venta_diaria_producto_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaTipoComprobante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('facturas', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('id_empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='config.empresa')),
+                ('tipo_comprobante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='comprobantes.tipocomprobante')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_empresa', 'fecha', 'tipo_comprobante'), name='venta_diaria_tipo_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def llenar_montos(apps, schema_editor):
+    Factura = apps.get_model('facturas', 'Factura')
+    VentaDiaria = apps.get_model('reportes', 'VentaDiaria')
+    sumas = {
+        (fila['id_empresa_id'], fila['fecha_emision']): fila
+        for fila in Factura.objects.filter(
+            estado__in=('Activa', 'Pagada'), anulado=False, id_empresa__isnull=False,
+        ).values('id_empresa_id', 'fecha_emision').annotate(subtotal=Sum('subtotal'), itbis=Sum('itbis')).order_by()
+    }
+    filas = list(VentaDiaria.objects.all())
+    for fila in filas:
+        montos = sumas.get((fila.id_empresa_id, fila.fecha), {})
+        fila.subtotal = montos.get('subtotal') or 0
+        fila.itbis = montos.get('itbis') or 0
+    VentaDiaria.objects.bulk_update(filas, ['subtotal', 'itbis'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_resumenes_ventas'),
+        ('facturas', '0005_totales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventadiaria',
+            name='itbis',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='ventadiaria',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(llenar_montos, migrations.RunPython.noop),
+    ]
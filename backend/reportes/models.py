@@ -1,3 +1,65 @@
 from django.db import models
+from core.models import EmpresaManager
 
-# Create your models here.
+
+class ResumenDiario(models.Model):
+    """
+    Base de los resúmenes de ventas por día. Solo cuentan las facturas
+    activas o pagadas que no están anuladas; ``reportes.ventas`` los mantiene
+    con incrementos al cambiar cada factura y ``reconstruir_reportes`` los
+    vuelve a calcular desde las facturas.
+    """
+    id_empresa = models.ForeignKey('config.Empresa', on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateField()
+
+    objects = EmpresaManager()
+
+    class Meta:
+        abstract = True
+
+
+class VentaDiaria(ResumenDiario):
+    facturas = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    itbis = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'fecha'], name='venta_diaria_unica'),
+        ]
+
+
+class VentaDiariaCliente(ResumenDiario):
+    cliente = models.ForeignKey('clientes.Cliente', on_delete=models.CASCADE, related_name='+')
+    facturas = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'fecha', 'cliente'], name='venta_diaria_cliente_unica'),
+        ]
+
+
+class VentaDiariaTipoComprobante(ResumenDiario):
+    tipo_comprobante = models.ForeignKey('comprobantes.TipoComprobante', on_delete=models.CASCADE, related_name='+')
+    facturas = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_empresa', 'fecha', 'tipo_comprobante'], name='venta_diaria_tipo_unica'
+            ),
+        ]
+
+
+class VentaDiariaProducto(ResumenDiario):
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='+')
+    cantidad = models.IntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_empresa', 'fecha', 'producto'], name='venta_diaria_producto_unica'),
+        ]
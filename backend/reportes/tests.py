@@ -1,3 +1,151 @@
+import datetime
+from decimal import Decimal
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from comprobantes.models import Comprobante, SerieComprobante
+from facturas.models import DetalleFactura, Factura
+from facturas.tests import FacturaTestMixin
+from .models import VentaDiaria, VentaDiariaCliente, VentaDiariaProducto, VentaDiariaTipoComprobante
+from .ventas import reconstruir
 
-# Create your tests here.
+
+class ResumenesVentasTests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        SerieComprobante.objects.create(
+            tipo_comprobante=self.tipo, desde=1, hasta=100, numero_actual=0,
+            fecha_vencimiento=self.hoy + datetime.timedelta(days=30), id_empresa=self.empresa
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear(self, estado, cantidad=2):
+        response = self.client.post('/api/facturas/', {
+            'tipo_comprobante': self.tipo.id, 'cliente': self.cliente.id, 'estado': estado,
+            'fecha_emision': str(self.hoy), 'fecha_vencimiento': str(self.hoy), 'total': str(100 * cantidad),
+            'detalle_facturas': [{'producto': self.producto.id, 'cantidad': cantidad,
+                                  'precio_unitario': '100.00', 'subtotal': str(100 * cantidad)}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def cambiar(self, factura_id, **datos):
+        response = self.client.patch(f'/api/facturas/{factura_id}/', datos, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def resumen(self):
+        dia = VentaDiaria.objects.filter(id_empresa=self.empresa, fecha=self.hoy).values('facturas', 'total').first()
+        producto = VentaDiariaProducto.objects.get(id_empresa=self.empresa, fecha=self.hoy, producto=self.producto)
+        return dia['facturas'], dia['total'], producto.cantidad
+
+    def test_activar_pagar_y_anular(self):
+        borrador = self.crear('Borrador')
+        self.assertFalse(VentaDiaria.objects.exists())
+
+        self.cambiar(borrador, estado='Activa')
+        self.crear('Activa', cantidad=3)
+        self.assertEqual(self.resumen(), (2, Decimal('590.00'), 5))
+
+        # Pagar no cambia las ventas; anular las descuenta
+        self.cambiar(borrador, estado='Pagada')
+        self.assertEqual(self.resumen(), (2, Decimal('590.00'), 5))
+        self.cambiar(borrador, estado='Anulada')
+        self.assertEqual(self.resumen(), (1, Decimal('354.00'), 3))
+
+        self.assertEqual(VentaDiariaCliente.objects.get(cliente=self.cliente).facturas, 1)
+        self.assertEqual(VentaDiariaTipoComprobante.objects.get(tipo_comprobante=self.tipo).total, Decimal('354.00'))
+
+    def test_lineas_y_eliminacion(self):
+        factura_id = self.crear('Activa')
+        linea = DetalleFactura.objects.get(factura_id=factura_id)
+
+        response = self.client.patch(f'/api/detalle-facturas/{linea.id}/', {'cantidad': 7}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.resumen(), (1, Decimal('826.00'), 7))
+
+        Factura.objects.get(pk=factura_id).delete()
+        self.assertEqual(self.resumen(), (0, Decimal('0.00'), 0))
+
+    def test_reconstruir_coincide_con_los_incrementos(self):
+        self.cambiar(self.crear('Borrador'), estado='Activa')
+        self.crear('Activa', cantidad=4)
+        self.cambiar(self.crear('Activa'), estado='Anulada')
+        incrementales = self.resumen()
+
+        reconstruir(self.empresa.id)
+        self.assertEqual(self.resumen(), incrementales)
+        self.assertEqual(VentaDiariaProducto.objects.count(), 1)
+
+    def test_reportes_leen_solo_los_resumenes(self):
+        self.crear('Activa')
+        self.crear('Activa', cantidad=3)
+
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get('/api/reportes/ventas/', {'agrupar': 'mes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['facturas'], 2)
+        self.assertEqual(response.data['subtotal'], Decimal('500.00'))
+        self.assertEqual(response.data['itbis'], Decimal('90.00'))
+        self.assertEqual(response.data['total'], Decimal('590.00'))
+        self.assertEqual(response.data['resultados'][0]['periodo'], self.hoy.replace(day=1))
+        self.assertNotIn('facturas_', ' '.join(q['sql'] for q in contexto.captured_queries))
+
+        response = self.client.get('/api/reportes/productos/')
+        self.assertEqual(response.data[0]['cantidad'], 5)
+        response = self.client.get('/api/reportes/clientes/')
+        self.assertEqual(response.data[0]['nombre'], 'Cliente')
+
+        self.assertEqual(self.client.get('/api/reportes/ventas/', {'agrupar': 'semana'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reportes/ventas/', {'desde': '2026-13-01'}).status_code, 400)
+
+
+class Dgii607Tests(FacturaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.cliente.numero_documento = 1234567
+        self.cliente.tipo_documento = 'CEDULA'
+        self.cliente.save()
+        for numero, estado in ((2, 'Pagada'), (1, 'Activa'), (3, 'Borrador')):
+            ncf = Comprobante.objects.create(
+                tipo_comprobante=self.tipo, numero_comprobante=numero, numero_comprobante_completo=f'B010000000{numero}',
+                fecha_emision=datetime.date(2026, 9, 5), fecha_vencimiento=datetime.date(2026, 12, 31),
+                id_empresa=self.empresa
+            )
+            self.crear_factura(
+                estado=estado, ncf_asignado=ncf, fecha_emision=datetime.date(2026, 9, 5),
+                subtotal=Decimal('1000.00'), itbis=Decimal('180.00'), total=Decimal('1180.00')
+            )
+        # Fuera del período
+        self.crear_factura(estado='Activa', ncf_asignado=ncf, fecha_emision=datetime.date(2026, 10, 1))
+
+    def descargar(self, **params):
+        response = self.client.get('/api/reportes/dgii-607/', {'periodo': '202609', **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_txt_ordenado_y_reproducible(self):
+        contenido = self.descargar()
+        lineas = contenido.decode('utf-8').splitlines()
+        self.assertEqual(lineas[0], f'607|{self.empresa.rnc}|202609|2')
+        self.assertEqual(
+            lineas[1],
+            '00001234567|2|B0100000001||01|20260905||1000.00|180.00||||||||0.00|0.00|0.00|1180.00|0.00|0.00|0.00'
+        )
+        self.assertTrue(lineas[2].endswith('|0.00|0.00|1180.00'))
+        self.assertEqual(len(lineas), 3)
+        self.assertEqual(contenido, self.descargar())
+
+    def test_csv_y_validaciones(self):
+        lineas = self.descargar(formato='csv').decode('utf-8').splitlines()
+        self.assertTrue(lineas[0].startswith('RNC/Cédula o Pasaporte,Tipo Identificación'))
+        self.assertEqual(len(lineas), 3)
+
+        self.assertEqual(self.client.get('/api/reportes/dgii-607/', {'periodo': '202613'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/reportes/dgii-607/', {'periodo': '202609', 'formato': 'xls'}).status_code, 400
+        )
@@ -0,0 +1,8 @@
+from rest_framework import routers
+from .api import ReportesViewSet
+
+router = routers.DefaultRouter()
+
+router.register('api/reportes', ReportesViewSet, 'reportes')
+
+urlpatterns = router.urls
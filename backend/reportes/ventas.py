@@ -0,0 +1,211 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from facturas.models import DetalleFactura, EstadoFactura, Factura
+from .models import VentaDiaria, VentaDiariaCliente, VentaDiariaProducto, VentaDiariaTipoComprobante
+
+# Los resúmenes guardan el aporte de cada factura que cuenta como venta. Al
+# cambiar una factura se calcula su aporte antes y después y se suma la
+# diferencia con UPDATE ... SET campo = campo + delta, así que dos cambios
+# concurrentes sobre el mismo día nunca se pisan.
+
+ESTADOS_VENTA = (EstadoFactura.ACTIVA, EstadoFactura.PAGADA)
+
+# Resúmenes que se alimentan de la cabecera de la factura, su dimensión y
+# los montos guardados de la factura que suman además de ``total``
+RESUMENES_FACTURA = (
+    (VentaDiaria, None, ('subtotal', 'itbis')),
+    (VentaDiariaCliente, 'cliente', ()),
+    (VentaDiariaTipoComprobante, 'tipo_comprobante', ()),
+)
+
+
+def ventas_de_factura(factura_id):
+    """
+    Aporte de la factura a los resúmenes como ``{(modelo, clave): medidas}``;
+    vacío si la factura no cuenta como venta. Bloquea la fila de la factura
+    para que dos cambios simultáneos no partan del mismo aporte.
+    """
+    factura = Factura.objects.select_for_update().filter(pk=factura_id).values(
+        'id_empresa_id', 'fecha_emision', 'cliente_id', 'tipo_comprobante_id', 'subtotal', 'itbis', 'total',
+        'estado', 'anulado',
+    ).first()
+    if not factura or factura['estado'] not in ESTADOS_VENTA or factura['anulado'] or not factura['id_empresa_id']:
+        return {}
+
+    base = (('id_empresa_id', factura['id_empresa_id']), ('fecha', factura['fecha_emision']))
+    aporte = {}
+    for modelo, dimension, montos in RESUMENES_FACTURA:
+        clave = base + ((f'{dimension}_id', factura[f'{dimension}_id']),) if dimension else base
+        aporte[modelo, clave] = {'facturas': 1, 'total': factura['total'], **{m: factura[m] for m in montos}}
+
+    lineas = DetalleFactura.objects.filter(factura_id=factura_id).values('producto_id').annotate(
+        cantidad=Sum('cantidad'), subtotal=Sum('subtotal'),
+    ).order_by()
+    for linea in lineas:
+        clave = base + (('producto_id', linea['producto_id']),)
+        aporte[VentaDiariaProducto, clave] = {'cantidad': linea['cantidad'], 'subtotal': linea['subtotal']}
+    return aporte
+
+
+def diferencia(despues, antes):
+    """Lo que hay que sumar a los resúmenes para pasar del aporte ``antes`` a ``despues``"""
+    cambios = {}
+    for llave in despues.keys() | antes.keys():
+        nuevas = despues.get(llave, {})
+        viejas = antes.get(llave, {})
+        medidas = {campo: nuevas.get(campo, 0) - viejas.get(campo, 0) for campo in nuevas.keys() | viejas.keys()}
+        if any(medidas.values()):
+            cambios[llave] = medidas
+    return cambios
+
+
+def aplicar_cambios(cambios):
+    """Suma cada diferencia a su fila de resumen, creándola si todavía no existe"""
+    for (modelo, clave), medidas in cambios.items():
+        filtro = dict(clave)
+        incrementos = {campo: F(campo) + valor for campo, valor in medidas.items()}
+        if modelo.objects.filter(**filtro).update(**incrementos):
+            continue
+        # Una fila que no existe no tiene nada que descontar
+        if all(valor <= 0 for valor in medidas.values()):
+            continue
+        try:
+            with transaction.atomic():
+                modelo.objects.create(**filtro, **medidas)
+        except IntegrityError:
+            # Otra transacción la creó primero
+            modelo.objects.filter(**filtro).update(**incrementos)
+
+
+@contextmanager
+def cambio_en_ventas(factura_id):
+    """Actualiza los resúmenes con lo que cambie la factura dentro del bloque"""
+    with transaction.atomic():
+        antes = ventas_de_factura(factura_id)
+        yield
+        aplicar_cambios(diferencia(ventas_de_factura(factura_id), antes))
+
+
+def registrar_factura(factura_id):
+    """Suma a los resúmenes una factura recién creada"""
+    aplicar_cambios(ventas_de_factura(factura_id))
+
+
+def ventas_de_facturas(factura_ids):
+    """
+    Aporte conjunto de varias facturas a los resúmenes, con dos consultas.
+    A diferencia de ventas_de_factura no bloquea las facturas: lo hace quien
+    las cambia.
+    """
+    facturas = Factura.objects.filter(
+        pk__in=factura_ids, estado__in=ESTADOS_VENTA, anulado=False, id_empresa__isnull=False,
+    )
+    aporte = defaultdict(lambda: defaultdict(int))
+    for factura in facturas.values(
+        'id_empresa_id', 'fecha_emision', 'cliente_id', 'tipo_comprobante_id', 'subtotal', 'itbis', 'total',
+    ):
+        base = (('id_empresa_id', factura['id_empresa_id']), ('fecha', factura['fecha_emision']))
+        for modelo, dimension, montos in RESUMENES_FACTURA:
+            clave = base + ((f'{dimension}_id', factura[f'{dimension}_id']),) if dimension else base
+            medidas = aporte[modelo, clave]
+            medidas['facturas'] += 1
+            for monto in ('total',) + montos:
+                medidas[monto] += factura[monto]
+
+    lineas = DetalleFactura.objects.filter(factura__in=facturas).values(
+        'factura__id_empresa_id', 'factura__fecha_emision', 'producto_id',
+    ).annotate(cantidad=Sum('cantidad'), subtotal=Sum('subtotal')).order_by()
+    for linea in lineas:
+        clave = (
+            ('id_empresa_id', linea['factura__id_empresa_id']), ('fecha', linea['factura__fecha_emision']),
+            ('producto_id', linea['producto_id']),
+        )
+        aporte[VentaDiariaProducto, clave] = {'cantidad': linea['cantidad'], 'subtotal': linea['subtotal']}
+    return aporte
+
+
+@contextmanager
+def cambio_en_ventas_de(factura_ids):
+    """
+    Como cambio_en_ventas para varias facturas ya bloqueadas: la diferencia
+    se aplica con un UPDATE por fila de resumen afectada, no por factura
+    """
+    with transaction.atomic():
+        antes = ventas_de_facturas(factura_ids)
+        yield
+        aplicar_cambios(diferencia(ventas_de_facturas(factura_ids), antes))
+
+
+def registrar_facturas(factura_ids):
+    """Suma a los resúmenes varias facturas recién creadas"""
+    aplicar_cambios(ventas_de_facturas(factura_ids))
+
+
+def descontar_factura(sender, instance, **kwargs):
+    """Receptor de pre_delete: quita la factura de los resúmenes antes de borrar sus líneas"""
+    aplicar_cambios(diferencia({}, ventas_de_factura(instance.pk)))
+
+
+def reconstruir(empresa_id=None, desde=None, hasta=None):
+    """
+    Vuelve a calcular los resúmenes desde las facturas, para cargar datos
+    existentes o corregir diferencias. Reemplaza solo los días del rango y,
+    si se indica, la empresa.
+    """
+    facturas = Factura.objects.filter(estado__in=ESTADOS_VENTA, anulado=False, id_empresa__isnull=False)
+    resumenes = {}
+    if empresa_id is not None:
+        facturas = facturas.filter(id_empresa_id=empresa_id)
+        resumenes['id_empresa_id'] = empresa_id
+    if desde is not None:
+        facturas = facturas.filter(fecha_emision__gte=desde)
+        resumenes['fecha__gte'] = desde
+    if hasta is not None:
+        facturas = facturas.filter(fecha_emision__lte=hasta)
+        resumenes['fecha__lte'] = hasta
+
+    creadas = {}
+    with transaction.atomic():
+        for modelo, dimension, montos in RESUMENES_FACTURA:
+            modelo.objects.filter(**resumenes).delete()
+            campos = ['id_empresa_id', 'fecha_emision'] + ([f'{dimension}_id'] if dimension else [])
+            sumas = {f'suma_{monto}': Sum(monto) for monto in ('total',) + montos}
+            filas = facturas.values(*campos).annotate(n=Count('id'), **sumas).order_by()
+            creadas[modelo.__name__] = _insertar(modelo, (
+                modelo(
+                    fecha=fila['fecha_emision'], facturas=fila['n'],
+                    **{monto: fila[f'suma_{monto}'] for monto in ('total',) + montos},
+                    **{campo: fila[campo] for campo in campos if campo != 'fecha_emision'},
+                )
+                for fila in filas.iterator()
+            ))
+
+        VentaDiariaProducto.objects.filter(**resumenes).delete()
+        lineas = DetalleFactura.objects.filter(factura__in=facturas).values(
+            'factura__id_empresa_id', 'factura__fecha_emision', 'producto_id',
+        ).annotate(n=Sum('cantidad'), suma=Sum('subtotal')).order_by()
+        creadas[VentaDiariaProducto.__name__] = _insertar(VentaDiariaProducto, (
+            VentaDiariaProducto(
+                id_empresa_id=fila['factura__id_empresa_id'], fecha=fila['factura__fecha_emision'],
+                producto_id=fila['producto_id'], cantidad=fila['n'], subtotal=fila['suma'],
+            )
+            for fila in lineas.iterator()
+        ))
+    return creadas
+
+
+def _insertar(modelo, filas, lote=1000):
+    total = 0
+    pendientes = []
+    for fila in filas:
+        pendientes.append(fila)
+        if len(pendientes) == lote:
+            modelo.objects.bulk_create(pendientes)
+            total += len(pendientes)
+            pendientes = []
+    if pendientes:
+        modelo.objects.bulk_create(pendientes)
+        total += len(pendientes)
+    return total
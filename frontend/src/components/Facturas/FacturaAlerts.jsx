@@ -43,7 +43,7 @@ const FacturaAlerts = ({
           </div>
           <p className="text-sm mt-1">
             {ncfDisponible 
-              ? `Al guardar esta factura, se asignará automáticamente el NCF: ${ncfDisponible.numero_comprobante_completo} (${ncfDisponible.tipo_comprobante?.tipo_comprobante || 'N/A'})`
+              ? `Al guardar esta factura, se asignará automáticamente el NCF: ${ncfDisponible.numero_comprobante_completo}`
               : factura.tipo_comprobante 
                 ? 'No hay NCF disponibles para el tipo de comprobante seleccionado. Debe crear un rango de comprobantes antes de activar la factura.'
                 : 'Seleccione un tipo de comprobante para verificar la disponibilidad de NCF.'
@@ -2,8 +2,16 @@ import { Card, CardContent, CardHeader } from "../ui/card";
 import { Label } from "../ui/label";
 import { Input } from "../ui/input";
 import { Textarea } from "../ui/textarea";
+import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../ui/select";
 import { formatDisplayNumber } from "../../utils/numberFormatter";
 
+// Categorías de ITBIS del backend; la tasa se aplica al facturar el producto
+const CATEGORIAS_ITBIS = [
+  { value: 'general', label: '18% - ITBIS general' },
+  { value: 'reducida', label: '16% - ITBIS reducido' },
+  { value: 'exento', label: 'Exento' }
+];
+
 /**
  * Card con el formulario del producto
  */
@@ -107,6 +115,28 @@ const ProductoFormCard = ({ producto, onInputChange }) => {
           </div>
         </div>
 
+        {/* Categoría de ITBIS */}
+        <div className="space-y-2">
+          <Label htmlFor="categoria_itbis" className="text-sm font-medium text-gray-700">
+            ITBIS
+          </Label>
+          <Select
+            value={producto.categoria_itbis || 'general'}
+            onValueChange={(value) => onInputChange('categoria_itbis', value)}
+          >
+            <SelectTrigger id="categoria_itbis" className="bg-white border divider-border hover:bg-gray-50">
+              <SelectValue placeholder="Seleccionar ITBIS" />
+            </SelectTrigger>
+            <SelectContent className="bg-white border divider-border shadow-lg">
+              {CATEGORIAS_ITBIS.map((categoria) => (
+                <SelectItem key={categoria.value} value={categoria.value} className="hover:bg-gray-50">
+                  {categoria.label}
+                </SelectItem>
+              ))}
+            </SelectContent>
+          </Select>
+        </div>
+
         {/* Margen de ganancia calculado */}
         {producto.precio_compra > 0 && producto.precio_venta > 0 && (
           <div className="bg-gray-50 p-4 rounded-lg">
@@ -9,6 +9,8 @@ import {
   SelectTrigger, 
   SelectValue 
 } from './ui/select';
+import ClientesApi from '@/services/clientes.api';
+import { useBusqueda } from '@/hooks/useBusqueda';
 
 const SearchSelectCliente = ({ 
   value, 
@@ -23,29 +25,21 @@ const SearchSelectCliente = ({
   const [isOpen, setIsOpen] = useState(false);
   const [dropdownPosition, setDropdownPosition] = useState({ top: 0, left: 0, width: 0 });
   const inputRef = useRef(null);
+  // La búsqueda se resuelve en el servidor con su índice por nombre y documento
+  const { resultados } = useBusqueda(ClientesApi.search, searchTerm, topLimit);
 
-  // Lógica de filtrado y top 10
+  // Lógica de top 10 sin búsqueda
   const clientesParaMostrar = useMemo(() => {
-    let clientesFiltrados;
-    
-    if (!searchTerm.trim()) {
-      // Sin búsqueda: mostrar top 10 (por orden de ID o nombre)
-      clientesFiltrados = clientes
-        .sort((a, b) => (a.nombre || '').localeCompare(b.nombre || ''))
-        .slice(0, topLimit);
-    } else {
-      // Con búsqueda: filtrar por nombre, documento o tipo
-      clientesFiltrados = clientes.filter(cliente => 
-        (cliente.nombre && cliente.nombre.toLowerCase().includes(searchTerm.toLowerCase())) ||
-        (cliente.numero_documento && String(cliente.numero_documento).toLowerCase().includes(searchTerm.toLowerCase())) ||
-        (cliente.tipo_documento && cliente.tipo_documento.toLowerCase().includes(searchTerm.toLowerCase()))
-      );
+    if (searchTerm.trim()) {
+      return resultados;
     }
-    
-    return clientesFiltrados;
-  }, [clientes, searchTerm, topLimit]);
+    // Sin búsqueda: mostrar top 10 (por orden de nombre)
+    return [...clientes]
+      .sort((a, b) => (a.nombre || '').localeCompare(b.nombre || ''))
+      .slice(0, topLimit);
+  }, [clientes, resultados, searchTerm, topLimit]);
 
-  const clienteSeleccionado = clientes.find(c => c.id === value);
+  const clienteSeleccionado = clientes.find(c => c.id === value) || resultados.find(c => c.id === value);
 
   // Recalcular posición cuando cambia el tamaño de ventana o scroll
   useEffect(() => {
@@ -2,6 +2,8 @@ import { useState, useMemo, useRef, useEffect } from 'react';
 import { Search, Package, ChevronDown, Plus } from 'lucide-react';
 import { Input } from './ui/input';
 import { Button } from './ui/button';
+import ProductosApi from '@/services/productos.api';
+import { useBusqueda } from '@/hooks/useBusqueda';
 
 const SearchSelectProducto = ({ 
   value, 
@@ -17,33 +19,21 @@ const SearchSelectProducto = ({
   const [isOpen, setIsOpen] = useState(false);
   const [dropdownPosition, setDropdownPosition] = useState({ top: 0, left: 0, width: 0 });
   const inputRef = useRef(null);
+  // La búsqueda se resuelve en el servidor con su índice por código y nombre
+  const { resultados } = useBusqueda(ProductosApi.search, searchTerm, topLimit);
 
-  // Lógica de filtrado y top 10
+  // Lógica de top 10 sin búsqueda
   const productosParaMostrar = useMemo(() => {
-    console.log('SearchSelectProducto - Productos recibidos:', productos.length);
-    console.log('SearchSelectProducto - SearchTerm:', searchTerm);
-    
-    let productosFiltrados;
-    
-    if (!searchTerm.trim()) {
-      // Sin búsqueda: mostrar top 10 (ordenados por nombre)
-      productosFiltrados = productos
-        .sort((a, b) => a.nombre.localeCompare(b.nombre))
-        .slice(0, topLimit);
-    } else {
-      // Con búsqueda: filtrar por nombre, código o descripción
-      productosFiltrados = productos.filter(producto => 
-        producto.nombre.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        (producto.codigo && producto.codigo.toLowerCase().includes(searchTerm.toLowerCase())) ||
-        (producto.descripcion && producto.descripcion.toLowerCase().includes(searchTerm.toLowerCase()))
-      );
+    if (searchTerm.trim()) {
+      return resultados;
     }
-    
-    console.log('SearchSelectProducto - Productos filtrados:', productosFiltrados.length);
-    return productosFiltrados;
-  }, [productos, searchTerm, topLimit]);
+    // Sin búsqueda: mostrar top 10 (ordenados por nombre)
+    return [...productos]
+      .sort((a, b) => a.nombre.localeCompare(b.nombre))
+      .slice(0, topLimit);
+  }, [productos, resultados, searchTerm, topLimit]);
 
-  const productoSeleccionado = productos.find(p => p.id === value);
+  const productoSeleccionado = productos.find(p => p.id === value) || resultados.find(p => p.id === value);
 
   // Recalcular posición cuando cambia el tamaño de ventana o scroll
   useEffect(() => {
@@ -103,7 +93,7 @@ const SearchSelectProducto = ({
     
     // Si hay callback y se seleccionó un producto, enviarlo
     if (onProductoSelect && selectedValue) {
-      const producto = productos.find(p => p.id === parseInt(selectedValue));
+      const producto = productosParaMostrar.find(p => p.id === parseInt(selectedValue));
       if (producto) {
         onProductoSelect(producto);
       }
@@ -0,0 +1,40 @@
+import { useState, useEffect } from 'react';
+
+/**
+ * Resultados de una búsqueda en el servidor para un término que el usuario
+ * escribe; espera a que deje de teclear y descarta respuestas de términos viejos
+ */
+export const useBusqueda = (buscar, termino, limite = 10, espera = 200) => {
+  const [resultados, setResultados] = useState([]);
+  const [isBuscando, setIsBuscando] = useState(false);
+
+  useEffect(() => {
+    const texto = termino.trim();
+    if (!texto) {
+      setResultados([]);
+      setIsBuscando(false);
+      return;
+    }
+
+    let vigente = true;
+    setIsBuscando(true);
+    const temporizador = setTimeout(async () => {
+      try {
+        const data = await buscar(texto, limite);
+        if (vigente) setResultados(data);
+      } catch (error) {
+        console.error('Error al buscar:', error);
+        if (vigente) setResultados([]);
+      } finally {
+        if (vigente) setIsBuscando(false);
+      }
+    }, espera);
+
+    return () => {
+      vigente = false;
+      clearTimeout(temporizador);
+    };
+  }, [buscar, termino, limite, espera]);
+
+  return { resultados, isBuscando };
+};
@@ -33,6 +33,7 @@ export const useCotizacionDetalles = (id, isEditMode) => {
   const handleAddDetalle = () => {
     const nuevoDetalle = {
       id: Date.now(), // ID temporal
+      esNuevo: true, // Aún no existe en el backend
       producto: '',
       descripcion: '',
       cantidad: 1,
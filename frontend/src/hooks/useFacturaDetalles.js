@@ -39,6 +39,7 @@ export const useFacturaDetalles = (id, isEditMode) => {
   const handleAddDetalle = () => {
     const nuevoDetalle = {
       id: Date.now(), // ID temporal
+      esNuevo: true, // Aún no existe en el backend
       producto: '',
       descripcion: '',
       cantidad: 1,
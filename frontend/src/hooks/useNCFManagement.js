@@ -25,7 +25,8 @@ export const useNCFManagement = (tipoComprobanteId, estado, ncfAsignado) => {
 
     try {
       setIsLoadingNCF(true);
-      const data = await ComprobantesApi.getDisponibles(tipoId);
+      // Solo se necesita el próximo NCF que se asignaría
+      const data = await ComprobantesApi.getSiguientes(tipoId, 1);
       if (data.length > 0) {
         setNcfDisponible(data[0]); // Tomar el primer NCF disponible
       } else {
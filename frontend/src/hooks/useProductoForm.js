@@ -10,7 +10,8 @@ export const useProductoForm = (id, isEditMode) => {
     nombre: '',
     descripcion: '',
     precio_compra: 0,
-    precio_venta: 0
+    precio_venta: 0,
+    categoria_itbis: 'general'
   });
 
   const [isLoading, setIsLoading] = useState(true);
@@ -2,13 +2,17 @@ import { useEffect, useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import CotizacionesApi from '../../services/cotizaciones.api'
 import ClientesApi from '../../services/clientes.api'
+import { getNextCursor } from '../../services/api'
 import AdvancedTable from '../../components/AdvancedTable'
 import { formatDisplayNumber } from '../../utils/numberFormatter'
 import Toast from '../../components/ui/toast'
+import { Button } from '../../components/ui/button'
 
 const CotizacionesList = () => {
   const navigate = useNavigate()
   const [cotizaciones, setCotizaciones] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [clientes, setClientes] = useState([])
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState(null)
@@ -30,11 +34,12 @@ const CotizacionesList = () => {
         
         // Cargar cotizaciones y clientes en paralelo
         const [cotizacionesData, clientesData] = await Promise.all([
-          CotizacionesApi.getAll(),
+          CotizacionesApi.getPage(),
           ClientesApi.getAll()
         ])
         
-        setCotizaciones(cotizacionesData)
+        setCotizaciones(cotizacionesData.results)
+        setNextCursor(getNextCursor(cotizacionesData.next))
         setClientes(clientesData)
       } catch (error) {
         console.error('Error al cargar datos:', error)
@@ -83,6 +88,21 @@ const CotizacionesList = () => {
     }
   }
 
+  // Cargar la siguiente página de cotizaciones
+  const handleLoadMore = async () => {
+    try {
+      setIsLoadingMore(true)
+      const page = await CotizacionesApi.getPage({ cursor: nextCursor })
+      setCotizaciones(prev => [...prev, ...page.results])
+      setNextCursor(getNextCursor(page.next))
+    } catch (error) {
+      console.error('Error al cargar más cotizaciones:', error)
+      showToast('error', 'Error al cargar más cotizaciones')
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const handleAddCotizacion = () => {
     navigate('/cotizaciones/nueva')
   }
@@ -134,6 +154,14 @@ const CotizacionesList = () => {
           searchPlaceholder="Buscar cotizaciones..."
           confirmDeleteMessage="¿Estás seguro de que deseas eliminar esta cotización? Esta acción no se puede deshacer."
         />
+
+        {nextCursor && (
+          <div className="flex justify-center mt-4">
+            <Button variant="outline" onClick={handleLoadMore} disabled={isLoadingMore}>
+              {isLoadingMore ? 'Cargando...' : 'Cargar más cotizaciones'}
+            </Button>
+          </div>
+        )}
         
         {/* Toast notifications */}
         <Toast
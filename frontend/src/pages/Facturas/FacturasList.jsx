@@ -1,8 +1,8 @@
 import { useEffect, useState } from 'react'
 import { useNavigate } from 'react-router-dom'
-import FacturasApi, { ProductosApi, DetalleFacturaApi } from '../../services/facturas.api'
-import ClientesApi from '../../services/clientes.api'
-import { TipoComprobantesApi } from '../../services/comprobantes.api'
+import FacturasApi, { DetalleFacturaApi } from '../../services/facturas.api'
+import BootstrapApi from '../../services/bootstrap.api'
+import { getNextCursor } from '../../services/api'
 import AdvancedTable from '../../components/AdvancedTable'
 import { generateFacturaPDF } from '../../utils/pdfGenerator'
 import { formatDisplayNumber } from '../../utils/numberFormatter'
@@ -15,6 +15,8 @@ const FacturasList = () => {
   const navigate = useNavigate()
 
   const [facturas, setFacturas] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [clientes, setClientes] = useState([])
   const [productos, setProductos] = useState([])
   const [tiposComprobante, setTiposComprobante] = useState([])
@@ -37,18 +39,21 @@ const FacturasList = () => {
         setIsLoading(true)
         setError(null)
         
-        // Cargar facturas, clientes, productos y tipos de comprobante en paralelo
-        const [facturasData, clientesData, productosData, tiposComprobanteData] = await Promise.all([
-          FacturasApi.getAll(),
-          ClientesApi.getAll(),
-          ProductosApi.getAll(),
-          TipoComprobantesApi.getAll()
+        // Los tipos de comprobante y las versiones de los catálogos llegan en
+        // /bootstrap/; clientes y productos solo se piden si cambiaron
+        const facturasPromise = FacturasApi.getPage()
+        const bootstrap = await BootstrapApi.get()
+        const [facturasData, clientesData, productosData] = await Promise.all([
+          facturasPromise,
+          BootstrapApi.getCatalogo('clientes', bootstrap.catalogos.clientes.version),
+          BootstrapApi.getCatalogo('productos', bootstrap.catalogos.productos.version)
         ])
         
-        setFacturas(facturasData)
+        setFacturas(facturasData.results)
+        setNextCursor(getNextCursor(facturasData.next))
         setClientes(clientesData)
         setProductos(productosData)
-        setTiposComprobante(tiposComprobanteData)
+        setTiposComprobante(bootstrap.tipos_comprobante)
       } catch (error) {
         console.error('Error al cargar datos:', error)
         setError('Error al cargar los datos')
@@ -60,6 +65,21 @@ const FacturasList = () => {
     fetchData()
   }, [])
 
+  // Cargar la siguiente página de facturas
+  const handleLoadMore = async () => {
+    try {
+      setIsLoadingMore(true)
+      const page = await FacturasApi.getPage({ cursor: nextCursor })
+      setFacturas(prev => [...prev, ...page.results])
+      setNextCursor(getNextCursor(page.next))
+    } catch (error) {
+      console.error('Error al cargar más facturas:', error)
+      showToast('error', 'Error al cargar más facturas')
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   // Función para generar PDF de una factura específica
   const handleGeneratePDF = async (facturaId) => {
     try {
@@ -196,6 +216,14 @@ const FacturasList = () => {
           searchPlaceholder="Buscar facturas..."
           confirmDeleteMessage="¿Estás seguro de que deseas eliminar esta factura? Esta acción no se puede deshacer."
         />
+
+        {nextCursor && (
+          <div className="flex justify-center mt-4">
+            <Button variant="outline" onClick={handleLoadMore} disabled={isLoadingMore}>
+              {isLoadingMore ? 'Cargando...' : 'Cargar más facturas'}
+            </Button>
+          </div>
+        )}
         
         {/* Toast notifications */}
         <Toast
@@ -58,5 +58,35 @@ api.interceptors.response.use(
   }
 );
 
+// Extrae el cursor de la URL `next` que devuelven los listados paginados
+export const getNextCursor = (nextUrl) => {
+  if (!nextUrl) return null;
+  return new URL(nextUrl).searchParams.get('cursor');
+};
+
+// Pide los cambios desde el cursor siguiendo las páginas `next` y los junta en una sola respuesta
+export const obtenerCambios = async (url, cursor = '') => {
+  let { data } = await api.get(url, { params: { updated_since: cursor } });
+  const cambios = { cursor: data.cursor, results: [...data.results], deleted: data.deleted };
+  while (data.next) {
+    ({ data } = await api.get(data.next));
+    cambios.results.push(...data.results);
+  }
+  return cambios;
+};
+
+// Aplica una respuesta de ?updated_since= sobre una colección ya cargada
+export const aplicarCambios = (filas, { results, deleted }) => {
+  const eliminados = new Set(deleted);
+  const cambiados = new Map(results.map(fila => [fila.id, fila]));
+  const actualizadas = filas
+    .filter(fila => !eliminados.has(fila.id))
+    .map(fila => {
+      const cambiada = cambiados.get(fila.id);
+      cambiados.delete(fila.id);
+      return cambiada || fila;
+    });
+  return [...actualizadas, ...cambiados.values()];
+};
 
   export default api;
\ No newline at end of file
@@ -0,0 +1,46 @@
+import api, { aplicarCambios } from './api'
+import ClientesApi from './clientes.api'
+import ProductosApi from './productos.api'
+
+// Copias en memoria de los catálogos, válidas mientras su versión no cambie
+const catalogos = {}
+
+const cargadores = {
+    clientes: (cursor) => ClientesApi.getCambios(cursor),
+    productos: (cursor) => ProductosApi.getCambios(cursor)
+}
+
+// Pide solo lo cambiado desde el cursor; si expiró, vuelve a cargar todo
+const sincronizar = async (nombre, guardado) => {
+    if (!guardado) {
+        const cambios = await cargadores[nombre]('')
+        return { datos: cambios.results, cursor: cambios.cursor }
+    }
+    try {
+        const cambios = await cargadores[nombre](guardado.cursor)
+        return { datos: aplicarCambios(guardado.datos, cambios), cursor: cambios.cursor }
+    } catch (error) {
+        if (error.response?.status !== 410) throw error
+        return sincronizar(nombre, null)
+    }
+}
+
+const BootstrapApi = {
+    // El navegador revalida la respuesta con su ETag y recibe un 304 si no cambió
+    get: async () => {
+        const response = await api.get('/bootstrap/')
+        return response.data
+    },
+    // Devuelve el catálogo guardado si la versión anunciada por /bootstrap/ coincide
+    getCatalogo: async (nombre, version) => {
+        const guardado = catalogos[nombre]
+        if (guardado && guardado.version === version) {
+            return guardado.datos
+        }
+        const { datos, cursor } = await sincronizar(nombre, guardado)
+        catalogos[nombre] = { version, datos, cursor }
+        return datos
+    }
+}
+
+export default BootstrapApi
@@ -1,4 +1,4 @@
-import api from './api'
+import api, { obtenerCambios } from './api'
 
 
 const ClientesApi = {
@@ -6,6 +6,23 @@ const ClientesApi = {
         const response = await api.get('/clientes/')
         return response.data
     },
+    // Cambios desde el cursor; con cursor vacío devuelve todo y el cursor inicial
+    getCambios: async (cursor = '') => {
+        return obtenerCambios('/clientes/', cursor)
+    },
+    // Los primeros resultados del índice de búsqueda del servidor
+    search: async (q, limit = 10) => {
+        const response = await api.get('/clientes/search/', { params: { q, limit } })
+        return response.data
+    },
+    // Importa un CSV o XLSX; devuelve { creados, actualizados, con_errores, errores: [{ fila, errores }] }
+    // y, si el archivo dejó de poder leerse a la mitad, error_archivo: { fila, errores }
+    importar: async (archivo) => {
+        const datos = new FormData()
+        datos.append('archivo', archivo)
+        const response = await api.post('/clientes/importar/', datos, { headers: { 'Content-Type': 'multipart/form-data' } })
+        return response.data
+    },
     getById: async (id) => {
         const response = await api.get(`/clientes/${id}/`)
         return response.data
@@ -24,6 +24,18 @@ const ComprobantesApi = {
     getDisponibles: async (tipoComprobanteId) => {
         const response = await api.get(`/comprobantes/disponibles/?tipo_comprobante=${tipoComprobanteId}`)
         return response.data
+    },
+    contarDisponibles: async (tipoComprobanteId) => {
+        const response = await api.get('/comprobantes/disponibles/', {
+            params: { tipo_comprobante: tipoComprobanteId, mode: 'count' }
+        })
+        return response.data.disponibles
+    },
+    getSiguientes: async (tipoComprobanteId, n = 1) => {
+        const response = await api.get('/comprobantes/disponibles/', {
+            params: { tipo_comprobante: tipoComprobanteId, mode: 'next', n }
+        })
+        return response.data
     }
 }
 
@@ -79,8 +91,14 @@ const SerieComprobantesApi = {
         const response = await api.post(`/seriecomprobantes/${id}/anular/`)
         return response.data
     },
-    getAlertas: async (limite = 5) => {
-        const response = await api.get(`/seriecomprobantes/alertas/?limite=${limite}`)
+    getAlertas: async (limite = 5, dias = null) => {
+        const params = { limite }
+        if (dias !== null) params.dias = dias
+        const response = await api.get('/seriecomprobantes/alertas/', { params })
+        return response.data
+    },
+    getResumen: async (limite = 5, dias = 30) => {
+        const response = await api.get('/seriecomprobantes/resumen/', { params: { limite, dias } })
         return response.data
     }
 }
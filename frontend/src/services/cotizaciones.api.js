@@ -1,9 +1,10 @@
 import api from './api';
 // API para Cotizaciones
 const CotizacionesApi = {
-  getAll: async () => {
+  // Devuelve una página { next, results }; `cursor` sale del campo `next` de la página anterior
+  getPage: async ({ cursor, ...filtros } = {}) => {
     try {
-      const response = await api.get(`/cotizaciones/`);
+      const response = await api.get(`/cotizaciones/`, { params: { cursor, ...filtros } });
       return response.data;
     } catch (error) {
       console.error('Error al obtener cotizaciones:', error);
@@ -49,6 +50,39 @@ const CotizacionesApi = {
       console.error('Error al eliminar cotización:', error);
       throw error;
     }
+  },
+
+  // PDF generado en el servidor (Blob)
+  getPdf: async (id) => {
+    try {
+      const response = await api.get(`/cotizaciones/${id}/pdf/`, { responseType: 'blob' });
+      return response.data;
+    } catch (error) {
+      console.error('Error al obtener el PDF de la cotización:', error);
+      throw error;
+    }
+  },
+
+  // ZIP con los PDF de varias cotizaciones (Blob)
+  getPdfLote: async (ids) => {
+    try {
+      const response = await api.post('/cotizaciones/pdf-lote/', { ids }, { responseType: 'blob' });
+      return response.data;
+    } catch (error) {
+      console.error('Error al obtener el lote de PDF de cotizaciones:', error);
+      throw error;
+    }
+  },
+
+  // Crea la factura de una cotización en el servidor; datos: { tipo_comprobante, estado?, fecha_emision?, fecha_vencimiento? }
+  facturar: async (id, datos) => {
+    try {
+      const response = await api.post(`/cotizaciones/${id}/facturar/`, datos);
+      return response.data;
+    } catch (error) {
+      console.error('Error al facturar la cotización:', error);
+      throw error;
+    }
   }
 };
 
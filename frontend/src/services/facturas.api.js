@@ -1,8 +1,9 @@
 import api from './api'
 
 const FacturasApi = {
-    getAll: async () => {
-        const response = await api.get('/facturas/')
+    // Devuelve una página { next, results }; `cursor` sale del campo `next` de la página anterior
+    getPage: async ({ cursor, ...filtros } = {}) => {
+        const response = await api.get('/facturas/', { params: { cursor, ...filtros } })
         return response.data
     },
     getById: async (id) => {
@@ -20,6 +21,38 @@ const FacturasApi = {
     delete: async (id) => {
         const response = await api.delete(`/facturas/${id}/`)
         return response.data
+    },
+    // PDF generado en el servidor (Blob)
+    getPdf: async (id) => {
+        const response = await api.get(`/facturas/${id}/pdf/`, { responseType: 'blob' })
+        return response.data
+    },
+    // ZIP con los PDF de varias facturas (Blob)
+    getPdfLote: async (ids) => {
+        const response = await api.post('/facturas/pdf-lote/', { ids }, { responseType: 'blob' })
+        return response.data
+    },
+    // Hasta 500 facturas en un pedido; con atomico=false se crean las válidas y se reportan las demás
+    createBatch: async (facturas, atomico = true) => {
+        const response = await api.post('/facturas/batch/', { facturas, atomico })
+        return response.data
+    },
+    activar: async (id) => {
+        const response = await api.post(`/facturas/${id}/activar/`)
+        return response.data
+    },
+    pagar: async (id) => {
+        const response = await api.post(`/facturas/${id}/pagar/`)
+        return response.data
+    },
+    anular: async (id) => {
+        const response = await api.post(`/facturas/${id}/anular/`)
+        return response.data
+    },
+    // accion: 'activar', 'pagar' o 'anular'; devuelve { aplicadas, rechazadas }
+    transicion: async (accion, ids) => {
+        const response = await api.post('/facturas/transicion/', { accion, ids })
+        return response.data
     }
 }
 
@@ -29,6 +62,10 @@ const ProductosApi = {
         const response = await api.get('/productos/')
         return response.data
     },
+    search: async (q, limit = 10) => {
+        const response = await api.get('/productos/search/', { params: { q, limit } })
+        return response.data
+    },
     getById: async (id) => {
         const response = await api.get(`/productos/${id}`)
         return response.data
@@ -1,10 +1,27 @@
-import api from './api'
+import api, { obtenerCambios } from './api'
 
 const ProductosApi = {
     getAll: async () => {
         const response = await api.get('/productos/')
         return response.data
     },
+    // Cambios desde el cursor; con cursor vacío devuelve todo y el cursor inicial
+    getCambios: async (cursor = '') => {
+        return obtenerCambios('/productos/', cursor)
+    },
+    // Los primeros resultados del índice de búsqueda del servidor
+    search: async (q, limit = 10) => {
+        const response = await api.get('/productos/search/', { params: { q, limit } })
+        return response.data
+    },
+    // Importa un CSV o XLSX; devuelve { creados, actualizados, con_errores, errores: [{ fila, errores }] }
+    // y, si el archivo dejó de poder leerse a la mitad, error_archivo: { fila, errores }
+    importar: async (archivo) => {
+        const datos = new FormData()
+        datos.append('archivo', archivo)
+        const response = await api.post('/productos/importar/', datos, { headers: { 'Content-Type': 'multipart/form-data' } })
+        return response.data
+    },
     getById: async (id) => {
         const response = await api.get(`/productos/${id}/`)
         return response.data
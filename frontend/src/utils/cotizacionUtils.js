@@ -27,6 +27,8 @@ export const calcularTotales = (detalles, itbisRate) => {
  */
 export const prepararCotizacionData = (cotizacion, detalles, totales, isEditMode) => {
   const detalle_cotizaciones = detalles.map(detalle => ({
+    // Las líneas existentes conservan su id para que el backend solo actualice lo que cambió
+    ...(detalle.esNuevo ? {} : { id: detalle.id }),
     producto: parseInt(detalle.producto),
     descripcion: detalle.descripcion || '',
     cantidad: detalle.cantidad,
@@ -27,6 +27,8 @@ export const calcularTotales = (detalles, itbisRate) => {
  */
 export const prepararFacturaData = (factura, detalles, totales, isEditMode) => {
   const detalle_facturas = detalles.map(detalle => ({
+    // Las líneas existentes conservan su id para que el backend solo actualice lo que cambió
+    ...(detalle.esNuevo ? {} : { id: detalle.id }),
     producto: parseInt(detalle.producto) || detalle.producto,
     descripcion: detalle.descripcion || '',
     cantidad: detalle.cantidad,